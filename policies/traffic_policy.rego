@@ -45,6 +45,7 @@ allow := {
   input.token == input.expected_user_token
   risk := lower(input.plan.risk_level)
   risk == "medium"
+  input.plan.approval.human_token != input.expected_human_token
 }
 
 allow := {
@@ -68,3 +69,7 @@ allow := {
 } if {
   input.token != input.expected_user_token
 }
+
+# Batch form of `allow`: input.items is a list of `allow` inputs, and the
+# result is the list of their decisions, in order.
+allow_batch := [decision | some item in input.items; decision := allow with input as item]
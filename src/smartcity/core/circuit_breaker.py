@@ -0,0 +1,153 @@
+"""Circuit breaker for calls to an external dependency (used for OPA)."""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from enum import Enum
+from typing import Any, Callable, Dict, Optional
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of attempting a call while the breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after `failure_threshold` consecutive failures. While open,
+    calls fail fast with CircuitOpenError. After `cooldown_seconds`, or as soon
+    as the background health probe succeeds, one trial call is let through
+    (half-open): success closes the breaker, failure re-opens it. Callers pass
+    the value of `before_call` to `release` in a `finally`, so a trial that
+    ends any other way (an error that is not an outage, cancellation) frees
+    the half-open slot for the next call.
+
+    State changes are written to the given logger (the JSON trace log).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int,
+        cooldown_seconds: float,
+        logger: logging.Logger,
+        health_check: Optional[Callable[[], bool]] = None,
+        probe_interval_seconds: float = 5.0,
+    ):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown_seconds = cooldown_seconds
+        self.health_check = health_check
+        self.probe_interval_seconds = probe_interval_seconds
+        self._logger = logger
+        self._lock = threading.Lock()
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._probe: Optional[threading.Thread] = None
+
+    @property
+    def state(self) -> CircuitState:
+        return self._state
+
+    def before_call(self) -> bool:
+        """
+        Raise CircuitOpenError unless a call may be attempted now. Returns
+        True when the call is the half-open trial.
+        """
+        with self._lock:
+            if self._state == CircuitState.CLOSED:
+                return False
+            if self._state == CircuitState.OPEN:
+                if time.monotonic() - self._opened_at < self.cooldown_seconds:
+                    raise CircuitOpenError(f"{self.name} circuit is open")
+                self._transition(CircuitState.HALF_OPEN, "cooldown elapsed")
+            if self._trial_in_flight:
+                raise CircuitOpenError(f"{self.name} circuit is half-open")
+            self._trial_in_flight = True
+            return True
+
+    def release(self, trial: bool) -> None:
+        """End a call; frees the half-open trial slot if `trial` held it."""
+        if trial:
+            with self._lock:
+                self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._trial_in_flight = False
+            if self._state != CircuitState.CLOSED:
+                self._transition(CircuitState.CLOSED, "call succeeded")
+
+    def record_failure(self, error: str = "") -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == CircuitState.HALF_OPEN or (
+                self._state == CircuitState.CLOSED
+                and self._failures >= self.failure_threshold
+            ):
+                self._opened_at = time.monotonic()
+                self._transition(CircuitState.OPEN, error or "call failed")
+                self._start_probe()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "name": self.name,
+                "state": self._state.value,
+                "consecutive_failures": self._failures,
+                "failure_threshold": self.failure_threshold,
+                "cooldown_seconds": self.cooldown_seconds,
+            }
+
+    def _transition(self, new_state: CircuitState, reason: str) -> None:
+        # Caller holds the lock.
+        old_state = self._state
+        self._state = new_state
+        self._logger.warning(
+            "Circuit breaker state changed",
+            extra={
+                "extra_fields": {
+                    "breaker": self.name,
+                    "from_state": old_state.value,
+                    "to_state": new_state.value,
+                    "consecutive_failures": self._failures,
+                    "reason": reason,
+                }
+            },
+        )
+
+    def _start_probe(self) -> None:
+        # Caller holds the lock.
+        if self.health_check is None or (self._probe and self._probe.is_alive()):
+            return
+        self._probe = threading.Thread(
+            target=self._probe_loop, name=f"{self.name}-health-probe", daemon=True
+        )
+        self._probe.start()
+
+    def _probe_loop(self) -> None:
+        while True:
+            time.sleep(self.probe_interval_seconds)
+            with self._lock:
+                if self._state != CircuitState.OPEN:
+                    return
+            try:
+                healthy = bool(self.health_check())
+            except Exception:
+                healthy = False
+            if healthy:
+                with self._lock:
+                    if self._state == CircuitState.OPEN:
+                        self._transition(CircuitState.HALF_OPEN, "health probe passed")
+                return
@@ -0,0 +1,155 @@
+"""Per-entity coalescing of monitor events arriving within a short window."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set
+
+from .models import MonitorEvent
+
+Dispatch = Callable[[MonitorEvent, List[str]], Awaitable[Any]]
+
+# Crowd levels from least to most severe; unknown values count as "normal".
+_CROWD_SEVERITY = ("low", "normal", "high", "dense")
+
+
+def _crowd_rank(level: str) -> int:
+    level = level.lower()
+    return (
+        _CROWD_SEVERITY.index(level)
+        if level in _CROWD_SEVERITY
+        else _CROWD_SEVERITY.index("normal")
+    )
+
+
+def merge_events(events: Sequence[MonitorEvent]) -> MonitorEvent:
+    """
+    One event carrying the most severe flags of `events`: any ambulance, rain
+    or flood flag, the densest crowd and every corridor signal. Location comes
+    from the latest event and notes from the latest event that has them; the
+    event type is kept if all events agree.
+    """
+    if len(events) == 1:
+        return events[0]
+    latest = events[-1]
+    event_types = {event.event_type for event in events}
+    notes = [event.notes for event in events if event.notes]
+    corridor_signals = list(
+        dict.fromkeys(
+            signal for event in events for signal in event.corridor_signals or []
+        )
+    )
+    return latest.model_copy(
+        update={
+            "event_type": latest.event_type if len(event_types) == 1 else "combined",
+            "ambulance_detected": any(event.ambulance_detected for event in events),
+            "heavy_rain": any(event.heavy_rain for event in events),
+            "flood_risk": any(event.flood_risk for event in events),
+            "crowd_level": max(
+                (event.crowd_level for event in events), key=_crowd_rank
+            ),
+            "notes": notes[-1] if notes else None,
+            "corridor_signals": corridor_signals or None,
+        }
+    )
+
+
+class _Window:
+    def __init__(self, future: "asyncio.Future[Any]", handle: asyncio.TimerHandle):
+        self.events: List[MonitorEvent] = []
+        self.trace_ids: List[str] = []
+        self.future = future
+        self.handle = handle
+
+
+class EventCoalescer:
+    """
+    Collects events per key (the entity id) for `window_ms` after the first
+    one arrives, then hands the merged event and all their trace ids to
+    `dispatch`. `add` returns a future for the window's dispatch result, shared
+    by every event merged into it. Must be used from one event loop.
+    """
+
+    def __init__(self, window_ms: float, dispatch: Dispatch, logger: logging.Logger):
+        self.window_ms = window_ms
+        self._dispatch = dispatch
+        self._logger = logger
+        self._windows: Dict[str, _Window] = {}
+        self._tasks: Set["asyncio.Task[None]"] = set()
+        self.events = 0
+        self.dispatched_events = 0
+        self.dispatched = 0
+
+    def add(
+        self, key: str, event: MonitorEvent, trace_id: str
+    ) -> "asyncio.Future[Any]":
+        window = self._windows.get(key)
+        if window is None:
+            loop = asyncio.get_running_loop()
+            window = _Window(
+                loop.create_future(),
+                loop.call_later(self.window_ms / 1000, self._flush, key),
+            )
+            self._windows[key] = window
+        window.events.append(event)
+        window.trace_ids.append(trace_id)
+        self.events += 1
+        return window.future
+
+    def window_events(self, key: str) -> List[MonitorEvent]:
+        """The events waiting in `key`'s open window (empty when none is open)."""
+        window = self._windows.get(key)
+        return list(window.events) if window is not None else []
+
+    def _flush(self, key: str) -> None:
+        window = self._windows.pop(key)
+        window.handle.cancel()
+        self.dispatched += 1
+        self.dispatched_events += len(window.events)
+        self._logger.info(
+            "Monitor events coalesced",
+            extra={
+                "traceId": window.trace_ids[0],
+                "extra_fields": {
+                    "entity_id": key,
+                    "events": len(window.events),
+                    "coalesced_trace_ids": window.trace_ids[1:],
+                    "window_ms": self.window_ms,
+                    "coalescing_ratio": self._ratio(),
+                },
+            },
+        )
+        task = asyncio.get_running_loop().create_task(self._run(window))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, window: _Window) -> None:
+        try:
+            result = await self._dispatch(merge_events(window.events), window.trace_ids)
+        except Exception as exc:
+            window.future.set_exception(exc)
+        else:
+            window.future.set_result(result)
+
+    async def flush_all(self) -> None:
+        """Dispatch every open window now and wait for the dispatches."""
+        for key in list(self._windows):
+            self._flush(key)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _ratio(self) -> Optional[float]:
+        """Events per dispatch over all flushed windows."""
+        if not self.dispatched:
+            return None
+        return round(self.dispatched_events / self.dispatched, 3)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "window_ms": self.window_ms,
+            "events": self.events,
+            "dispatched": self.dispatched,
+            "open_windows": len(self._windows),
+            "coalescing_ratio": self._ratio(),
+        }
@@ -1,79 +1,291 @@
 from __future__ import annotations
 
+import asyncio
+import json
 import os
-from typing import List
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Sequence, Set
 
-import requests
 from dotenv import load_dotenv
 
 from ..infra.logging_utils import configure_logger
-from .models import CandidatePlan, ExecutionReport, StepResult
-from .policy_engine import USER_TOKEN, evaluate_plan
+from .mcp_transport import build_transport, render_body
+from .models import (
+    CandidatePlan,
+    ExecutionReport,
+    PlanStep,
+    PolicyDecision,
+    StepResult,
+)
+from .policy_engine import (
+    USER_TOKEN,
+    aevaluate_plan,
+    aevaluate_plans,
+    evaluate_plan,
+    evaluate_plans,
+)
 
 load_dotenv()
 
 logger = configure_logger("executor")
 
-MCP_SERVER_URL = os.getenv("MCP_SERVER_URL", "http://localhost:8000/mcp")
+# "step": one MCP call per plan step; "batch": the whole plan in one batch call.
+MCP_CALL_MODE = os.getenv("MCP_CALL_MODE", "step").lower()
+# Upper bound on steps in flight when a plan declares step dependencies.
+EXECUTOR_MAX_CONCURRENCY = int(os.getenv("EXECUTOR_MAX_CONCURRENCY", "4"))
 
+# HTTP or in-process, selected by MCP_TRANSPORT.
+transport = build_transport()
 
-def execute_candidate_plan(plan: CandidatePlan) -> ExecutionReport:
+# Runs the steps of plans that declare dependencies, shared by all plans.
+_step_pool = ThreadPoolExecutor(
+    max_workers=EXECUTOR_MAX_CONCURRENCY, thread_name_prefix="plan-steps"
+)
+
+
+class McpStepError(RuntimeError):
+    """A plan step failed; execution stopped there."""
+
+    def __init__(self, step_id: str, status_code: int):
+        super().__init__(f"{status_code} error on MCP step '{step_id}'")
+        self.step_id = step_id
+        self.status_code = status_code
+
+
+def _blocked_report(plan: CandidatePlan, decision: PolicyDecision) -> ExecutionReport:
     trace_id = plan.telemetry.trace_id
-    decision = evaluate_plan(
-        plan=plan.to_wire_dict(),
-        provided_token=USER_TOKEN,
+    logger.warning(
+        "Plan blocked before execution",
+        extra={
+            "traceId": trace_id,
+            "extra_fields": {
+                "plan_id": plan.plan_id,
+                "reason": decision.reason,
+                "mode": decision.approval_mode.value,
+            },
+        },
+    )
+    return ExecutionReport(
+        plan_id=plan.plan_id,
         trace_id=trace_id,
+        policy=decision,
+        executed=False,
     )
 
-    if not decision.allowed:
+
+def _call_payload(step: PlanStep, trace_id: str) -> Dict[str, Any]:
+    return {
+        "method": step.action.value,
+        "params": step.params,
+        "traceId": trace_id,
+        "token": USER_TOKEN,
+    }
+
+
+async def aobserve_entities(entities: List[Dict[str, Any]], trace_id: str) -> None:
+    """
+    Hand notified entity state to the knowledge base of the process running
+    the MCP tools (this one with the in-process transport). A failure is
+    logged; reads then go to Orion.
+    """
+    if not entities:
+        return
+    payload = {
+        "method": "observeEntities",
+        "params": {"entities": entities},
+        "traceId": trace_id,
+        "token": USER_TOKEN,
+    }
+    status_code: Optional[int] = None
+    try:
+        status_code, body = await transport.acall(payload)
+    except Exception as exc:
+        body = str(exc)
+    if status_code is None or status_code >= 400:
         logger.warning(
-            "Plan blocked before execution",
+            "Notified state not forwarded to the knowledge base",
             extra={
                 "traceId": trace_id,
-                "extra_fields": {
-                    "plan_id": plan.plan_id,
-                    "reason": decision.reason,
-                    "mode": decision.approval_mode.value,
-                },
+                "extra_fields": {"status": status_code, "error": body},
             },
         )
-        return ExecutionReport(
-            plan_id=plan.plan_id,
-            trace_id=trace_id,
-            policy=decision,
-            executed=False,
-        )
 
-    results: List[StepResult] = []
-    for step in plan.steps:
-        call_payload = {
-            "method": step.action.value,
-            "params": step.params,
+
+def _skipped(status_code: int, body: str) -> bool:
+    """Whether the tool reported the call as a skipped no-op write."""
+    if status_code >= 400 or '"skipped"' not in body:
+        return False
+    try:
+        result = json.loads(body).get("result")
+    except (ValueError, AttributeError):
+        return False
+    return isinstance(result, dict) and result.get("skipped") is True
+
+
+def _step_result(
+    step: PlanStep, trace_id: str, status_code: int, body: str
+) -> StepResult:
+    skipped = _skipped(status_code, body)
+    logger.info(
+        "Step executed",
+        extra={
             "traceId": trace_id,
-            "token": USER_TOKEN,
-        }
-        response = requests.post(MCP_SERVER_URL, json=call_payload, timeout=10)
-        body = response.text
-        results.append(
-            StepResult(
-                step_id=step.id,
-                action=step.action,
-                status_code=response.status_code,
-                response_body=body,
+            "extra_fields": {
+                "step": step.id,
+                "action": step.action.value,
+                "status": status_code,
+                "skipped": skipped,
+            },
+        },
+    )
+    return StepResult(
+        step_id=step.id,
+        action=step.action,
+        status_code=status_code,
+        response_body=body,
+        skipped=skipped,
+    )
+
+
+def _batch_payload(plan: CandidatePlan, trace_id: str) -> Dict[str, Any]:
+    return {
+        "calls": [
+            {"method": step.action.value, "params": step.params} for step in plan.steps
+        ],
+        "traceId": trace_id,
+        "token": USER_TOKEN,
+    }
+
+
+def _raise_for_step(result: StepResult) -> StepResult:
+    if result.status_code >= 400:
+        raise McpStepError(result.step_id, result.status_code)
+    return result
+
+
+def _batch_step_results(
+    plan: CandidatePlan, trace_id: str, entries: List[Dict[str, Any]]
+) -> List[StepResult]:
+    """Map batch entries back onto the plan's steps, raising at the failed one."""
+    return [
+        _raise_for_step(
+            _step_result(
+                step, trace_id, entry["status_code"], render_body(entry["body"])
             )
         )
-        logger.info(
-            "Step executed",
-            extra={
-                "traceId": trace_id,
-                "extra_fields": {
-                    "step": step.id,
-                    "action": step.action.value,
-                    "status": response.status_code,
-                },
-            },
+        for step, entry in zip(plan.steps, entries)
+    ]
+
+
+def _run_step(step: PlanStep, trace_id: str) -> StepResult:
+    status_code, body = transport.call(_call_payload(step, trace_id))
+    return _raise_for_step(_step_result(step, trace_id, status_code, body))
+
+
+def _step_dependencies(plan: CandidatePlan) -> Optional[Dict[str, Set[str]]]:
+    """Dependency sets per step id, or None when the plan declares none."""
+    if all(step.depends_on is None for step in plan.steps):
+        return None
+    return {step.id: set(step.depends_on or []) for step in plan.steps}
+
+
+def _ready_steps(
+    pending: List[PlanStep], dependencies: Dict[str, Set[str]], done: Set[str]
+) -> List[PlanStep]:
+    return [step for step in pending if dependencies[step.id] <= done]
+
+
+def _execute_steps(plan: CandidatePlan, trace_id: str) -> List[StepResult]:
+    dependencies = _step_dependencies(plan)
+    if dependencies is None:
+        return [_run_step(step, trace_id) for step in plan.steps]
+
+    # Launch every step whose prerequisites succeeded and stop at the first
+    # failure: queued steps are cancelled, and a step already running on the
+    # pool cannot be interrupted, so its result is dropped.
+    results: Dict[str, StepResult] = {}
+    pending = list(plan.steps)
+    running: Dict[Future, PlanStep] = {}
+    try:
+        while running or pending:
+            for step in _ready_steps(pending, dependencies, set(results)):
+                pending.remove(step)
+                running[_step_pool.submit(_run_step, step, trace_id)] = step
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                results[running.pop(future).id] = future.result()
+    finally:
+        for future in running:
+            future.cancel()
+    return [results[step.id] for step in plan.steps]
+
+
+def _execute_batch(plan: CandidatePlan, trace_id: str) -> List[StepResult]:
+    entries = transport.call_batch(_batch_payload(plan, trace_id))
+    return _batch_step_results(plan, trace_id, entries)
+
+
+async def _arun_step(step: PlanStep, trace_id: str) -> StepResult:
+    status_code, body = await transport.acall(_call_payload(step, trace_id))
+    return _raise_for_step(_step_result(step, trace_id, status_code, body))
+
+
+async def _aexecute_steps(plan: CandidatePlan, trace_id: str) -> List[StepResult]:
+    dependencies = _step_dependencies(plan)
+    if dependencies is None:
+        return [await _arun_step(step, trace_id) for step in plan.steps]
+
+    semaphore = asyncio.Semaphore(EXECUTOR_MAX_CONCURRENCY)
+
+    async def _bounded(step: PlanStep) -> StepResult:
+        async with semaphore:
+            return await _arun_step(step, trace_id)
+
+    # Stop at the first failure, cancelling the steps still in flight.
+    results: Dict[str, StepResult] = {}
+    pending = list(plan.steps)
+    running: Dict[asyncio.Task, PlanStep] = {}
+    try:
+        while running or pending:
+            for step in _ready_steps(pending, dependencies, set(results)):
+                pending.remove(step)
+                running[asyncio.create_task(_bounded(step))] = step
+            finished, _ = await asyncio.wait(
+                running, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in finished:
+                results[running.pop(task).id] = task.result()
+    finally:
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+    return [results[step.id] for step in plan.steps]
+
+
+async def _aexecute_batch(plan: CandidatePlan, trace_id: str) -> List[StepResult]:
+    entries = await transport.acall_batch(_batch_payload(plan, trace_id))
+    return _batch_step_results(plan, trace_id, entries)
+
+
+def execute_candidate_plan(
+    plan: CandidatePlan, decision: Optional[PolicyDecision] = None
+) -> ExecutionReport:
+    """Check the plan against policy (unless `decision` is given) and run it."""
+    trace_id = plan.telemetry.trace_id
+    if decision is None:
+        decision = evaluate_plan(
+            plan=plan,
+            provided_token=USER_TOKEN,
+            trace_id=trace_id,
         )
-        response.raise_for_status()
+
+    if not decision.allowed:
+        return _blocked_report(plan, decision)
+
+    if MCP_CALL_MODE == "batch":
+        results = _execute_batch(plan, trace_id)
+    else:
+        results = _execute_steps(plan, trace_id)
 
     return ExecutionReport(
         plan_id=plan.plan_id,
@@ -82,3 +294,121 @@ def execute_candidate_plan(plan: CandidatePlan) -> ExecutionReport:
         executed=True,
         step_results=results,
     )
+
+
+async def aexecute_candidate_plan(
+    plan: CandidatePlan, decision: Optional[PolicyDecision] = None
+) -> ExecutionReport:
+    """Async `execute_candidate_plan`: policy and MCP calls run on the event loop."""
+    trace_id = plan.telemetry.trace_id
+    if decision is None:
+        decision = await aevaluate_plan(
+            plan=plan,
+            provided_token=USER_TOKEN,
+            trace_id=trace_id,
+        )
+
+    if not decision.allowed:
+        return _blocked_report(plan, decision)
+
+    if MCP_CALL_MODE == "batch":
+        results = await _aexecute_batch(plan, trace_id)
+    else:
+        results = await _aexecute_steps(plan, trace_id)
+
+    return ExecutionReport(
+        plan_id=plan.plan_id,
+        trace_id=trace_id,
+        policy=decision,
+        executed=True,
+        step_results=results,
+    )
+
+
+def _ordered_groups(
+    plans: Sequence[CandidatePlan], order_keys: Optional[Sequence[str]]
+) -> List[List[int]]:
+    """Plan indexes per order key, in input order; no keys = one group per plan."""
+    if order_keys is None:
+        return [[index] for index in range(len(plans))]
+    if len(order_keys) != len(plans):
+        raise ValueError("execute_candidate_plans needs one order key per plan")
+    groups: Dict[str, List[int]] = {}
+    for index, key in enumerate(order_keys):
+        groups.setdefault(key, []).append(index)
+    return list(groups.values())
+
+
+def _failed_report(
+    plan: CandidatePlan, decision: PolicyDecision, exc: Exception
+) -> ExecutionReport:
+    trace_id = plan.telemetry.trace_id
+    logger.error(
+        "Plan execution failed",
+        extra={
+            "traceId": trace_id,
+            "extra_fields": {"plan_id": plan.plan_id, "error": str(exc)},
+        },
+    )
+    return ExecutionReport(
+        plan_id=plan.plan_id,
+        trace_id=trace_id,
+        policy=decision,
+        executed=False,
+        error=str(exc),
+    )
+
+
+def execute_candidate_plans(
+    plans: Sequence[CandidatePlan], order_keys: Optional[Sequence[str]] = None
+) -> List[ExecutionReport]:
+    """
+    Evaluate the plans with one batched policy query, then execute them
+    concurrently. Plans that share an order key (e.g. the entity they act on)
+    run one after another in input order. A failing plan does not stop the
+    others: its report has `executed=False` and the error.
+    """
+    groups = _ordered_groups(plans, order_keys)
+    decisions = evaluate_plans(
+        plans, USER_TOKEN, [plan.telemetry.trace_id for plan in plans]
+    )
+    reports: List[Optional[ExecutionReport]] = [None] * len(plans)
+
+    def _run_group(indexes: List[int]) -> None:
+        for index in indexes:
+            try:
+                reports[index] = execute_candidate_plan(plans[index], decisions[index])
+            except Exception as exc:
+                reports[index] = _failed_report(plans[index], decisions[index], exc)
+
+    if len(groups) <= 1:
+        for indexes in groups:
+            _run_group(indexes)
+    else:
+        workers = min(EXECUTOR_MAX_CONCURRENCY, len(groups))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(_run_group, groups))
+    return [report for report in reports if report is not None]
+
+
+async def aexecute_candidate_plans(
+    plans: Sequence[CandidatePlan], order_keys: Optional[Sequence[str]] = None
+) -> List[ExecutionReport]:
+    """Async `execute_candidate_plans`; every order-key group runs concurrently."""
+    groups = _ordered_groups(plans, order_keys)
+    decisions = await aevaluate_plans(
+        plans, USER_TOKEN, [plan.telemetry.trace_id for plan in plans]
+    )
+    reports: List[Optional[ExecutionReport]] = [None] * len(plans)
+
+    async def _run_group(indexes: List[int]) -> None:
+        for index in indexes:
+            try:
+                reports[index] = await aexecute_candidate_plan(
+                    plans[index], decisions[index]
+                )
+            except Exception as exc:
+                reports[index] = _failed_report(plans[index], decisions[index], exc)
+
+    await asyncio.gather(*(_run_group(indexes) for indexes in groups))
+    return [report for report in reports if report is not None]
@@ -0,0 +1,317 @@
+"""
+Local stand-in for the chat model, for running the LLM planner offline.
+
+`FakeChatModel` has the slice of the LangChain chat-model interface the
+planner uses (`invoke`/`ainvoke`, `batch`/`abatch`, `stream`/`astream`). It
+reads the event back out of the plan prompt and answers with a schema-valid
+plan for it after a simulated latency. A configurable share of calls fail
+(FakeLLMError) or return malformed output. All draws come from one seeded
+generator, so a sequential run is reproducible.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from .models import ActionType, RiskLevel
+
+load_dotenv()
+
+TRAFFIC_SIGNAL_ID = os.getenv("TRAFFIC_SIGNAL_ID", "TrafficSignal:001")
+# Latency is log-normal: FAKE_LLM_LATENCY_MS is the median, the sigma sets the tail.
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "400"))
+FAKE_LLM_LATENCY_SIGMA = float(os.getenv("FAKE_LLM_LATENCY_SIGMA", "0.5"))
+FAKE_LLM_MALFORMED_RATE = float(os.getenv("FAKE_LLM_MALFORMED_RATE", "0"))
+FAKE_LLM_FAILURE_RATE = float(os.getenv("FAKE_LLM_FAILURE_RATE", "0"))
+FAKE_LLM_CHUNK_CHARS = int(os.getenv("FAKE_LLM_CHUNK_CHARS", "16"))
+FAKE_LLM_SEED = int(os.getenv("FAKE_LLM_SEED", "0"))
+
+FAKE_MODEL_NAME = "fake-planner"
+
+_EVENT_START = "## Event Data\n"
+_EVENT_END = "\n\n## Output"
+
+# Ways a fake response can be malformed; one is drawn per malformed call.
+MALFORMED_KINDS = ("truncated", "prose", "invalid-step")
+
+_AUTONOMY_LEVELS = {RiskLevel.LOW: 1, RiskLevel.MEDIUM: 2, RiskLevel.HIGH: 3}
+
+
+class FakeLLMError(RuntimeError):
+    """Simulated provider failure (timeout, rate limit, 5xx)."""
+
+
+class FakeMessage:
+    """Response or stream chunk; chunks concatenate with `+` like LangChain's."""
+
+    def __init__(self, content: str, usage_metadata: Optional[Dict[str, int]] = None):
+        self.content = content
+        self.usage_metadata = usage_metadata or {}
+        self.response_metadata = {"model_name": FAKE_MODEL_NAME}
+
+    def __add__(self, other: "FakeMessage") -> "FakeMessage":
+        usage = dict(self.usage_metadata)
+        for name, count in other.usage_metadata.items():
+            usage[name] = usage.get(name, 0) + count
+        return FakeMessage(self.content + other.content, usage)
+
+
+def _event_from_prompt(prompt: str) -> Optional[Dict[str, Any]]:
+    start = prompt.find(_EVENT_START)
+    end = prompt.find(_EVENT_END, start)
+    if start < 0 or end < 0:
+        return None
+    try:
+        return json.loads(prompt[start + len(_EVENT_START) : end])
+    except json.JSONDecodeError:
+        return None
+
+
+def plan_for_event(event: Dict[str, Any]) -> Dict[str, Any]:
+    """The plan the prompt's instructions ask for, as the model would write it."""
+    ambulance = bool(event.get("ambulance_detected"))
+    weather = bool(event.get("heavy_rain") or event.get("flood_risk"))
+    crowded = str(event.get("crowd_level", "")).lower() in {"high", "dense"}
+
+    if ambulance or event.get("flood_risk"):
+        risk_level = RiskLevel.HIGH
+    elif event.get("heavy_rain") or crowded:
+        risk_level = RiskLevel.MEDIUM
+    else:
+        risk_level = RiskLevel.LOW
+
+    if ambulance and weather:
+        goal = "Coordinate emergency corridor with weather risk mitigation"
+        scenario, corridor = "combined-flood-corridor", "emergency"
+    elif ambulance:
+        goal = "Create emergency corridor for ambulance"
+        scenario, corridor = "ambulance-only", "emergency"
+    elif weather:
+        goal = "Protect critical infrastructure under weather stress"
+        scenario, corridor = "flood-only", "critical-infra"
+    else:
+        goal = "Maintain normal traffic operation"
+        scenario, corridor = "baseline", "none"
+
+    entity_id = event.get("entity_id") or TRAFFIC_SIGNAL_ID
+    entity_ids = list(dict.fromkeys([entity_id, *event.get("corridor_signals", [])]))
+    location = event.get("location") or "the monitored area"
+    if len(entity_ids) > 1:
+        signal_steps = [
+            {
+                "id": "read-state",
+                "action": ActionType.GET_TRAFFIC_SIGNAL_STATES.value,
+                "params": {"entity_ids": entity_ids},
+            },
+            {
+                "id": "set-priority",
+                "action": ActionType.SET_PRIORITY_CORRIDORS.value,
+                "params": {"entity_ids": entity_ids, "value": corridor},
+            },
+        ]
+    else:
+        signal_steps = [
+            {
+                "id": "read-state",
+                "action": ActionType.GET_TRAFFIC_SIGNAL_STATE.value,
+                "params": {"entity_id": entity_id},
+            },
+            {
+                "id": "set-priority",
+                "action": ActionType.SET_PRIORITY_CORRIDOR.value,
+                "params": {"entity_id": entity_id, "value": corridor},
+            },
+        ]
+    return {
+        "goal": goal,
+        "scenario": scenario,
+        "risk_level": risk_level.value,
+        "steps": [
+            *signal_steps,
+            {
+                "id": "notify",
+                "action": ActionType.NOTIFY_TRAFFIC_AGENTS.value,
+                "params": {"message": f"{goal} at {location}"},
+            },
+        ],
+        "approval": {"autonomy_level": _AUTONOMY_LEVELS[risk_level]},
+    }
+
+
+def _malformed(text: str, kind: str) -> str:
+    if kind == "truncated":
+        return text[: len(text) // 2]
+    if kind == "prose":
+        return "Here is the traffic plan you asked for:\n" + text
+    plan = json.loads(text)
+    plan["steps"][1]["action"] = "closeRoad"
+    return json.dumps(plan, indent=2)
+
+
+class FakeChatModel:
+    """
+    Chat model that answers plan prompts locally. Calls that cannot be read as
+    a plan prompt (e.g. the warm-up ping) get a short plain-text reply.
+    """
+
+    model_name = FAKE_MODEL_NAME
+
+    def __init__(
+        self,
+        latency_ms: float = FAKE_LLM_LATENCY_MS,
+        latency_sigma: float = FAKE_LLM_LATENCY_SIGMA,
+        malformed_rate: float = FAKE_LLM_MALFORMED_RATE,
+        failure_rate: float = FAKE_LLM_FAILURE_RATE,
+        chunk_chars: int = FAKE_LLM_CHUNK_CHARS,
+        seed: int = FAKE_LLM_SEED,
+    ):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.malformed_rate = malformed_rate
+        self.failure_rate = failure_rate
+        self.chunk_chars = max(1, chunk_chars)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+        self.malformed = 0
+
+    def _draw(self, prompt: str) -> Tuple[float, Optional[str]]:
+        """Latency in seconds and the response text (None = failure)."""
+        with self._lock:
+            self.calls += 1
+            latency = (
+                self.latency_ms
+                * math.exp(self.latency_sigma * self._random.gauss(0.0, 1.0))
+                / 1000
+            )
+            if self._random.random() < self.failure_rate:
+                self.failures += 1
+                return latency, None
+            malformed_kind = None
+            if self._random.random() < self.malformed_rate:
+                self.malformed += 1
+                malformed_kind = self._random.choice(MALFORMED_KINDS)
+
+        event = _event_from_prompt(prompt)
+        if event is None:
+            return latency, "OK"
+        text = json.dumps(plan_for_event(event), indent=2)
+        if malformed_kind is not None:
+            text = _malformed(text, malformed_kind)
+        return latency, text
+
+    def _chunks(self, text: str) -> List[str]:
+        return [
+            text[start : start + self.chunk_chars]
+            for start in range(0, len(text), self.chunk_chars)
+        ] or [""]
+
+    @staticmethod
+    def _usage(prompt: str, text: str) -> Dict[str, int]:
+        # Roughly four characters per token.
+        return {
+            "input_tokens": len(prompt) // 4,
+            "output_tokens": len(text) // 4,
+            "total_tokens": (len(prompt) + len(text)) // 4,
+        }
+
+    def invoke(
+        self, prompt: str, config: Optional[Dict[str, Any]] = None
+    ) -> FakeMessage:
+        latency, text = self._draw(prompt)
+        time.sleep(latency)
+        if text is None:
+            raise FakeLLMError("simulated LLM provider failure")
+        return FakeMessage(text, self._usage(prompt, text))
+
+    async def ainvoke(
+        self, prompt: str, config: Optional[Dict[str, Any]] = None
+    ) -> FakeMessage:
+        latency, text = self._draw(prompt)
+        await asyncio.sleep(latency)
+        if text is None:
+            raise FakeLLMError("simulated LLM provider failure")
+        return FakeMessage(text, self._usage(prompt, text))
+
+    def batch(
+        self,
+        prompts: List[str],
+        config: Optional[Dict[str, Any]] = None,
+        return_exceptions: bool = False,
+    ) -> List[Any]:
+        if not prompts:
+            return []
+        workers = (config or {}).get("max_concurrency") or len(prompts)
+
+        def call(prompt: str) -> Any:
+            try:
+                return self.invoke(prompt)
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                return e
+
+        with ThreadPoolExecutor(max_workers=min(workers, len(prompts))) as pool:
+            return list(pool.map(call, prompts))
+
+    async def abatch(
+        self,
+        prompts: List[str],
+        config: Optional[Dict[str, Any]] = None,
+        return_exceptions: bool = False,
+    ) -> List[Any]:
+        workers = (config or {}).get("max_concurrency") or max(1, len(prompts))
+        semaphore = asyncio.Semaphore(workers)
+
+        async def call(prompt: str) -> Any:
+            async with semaphore:
+                return await self.ainvoke(prompt)
+
+        return await asyncio.gather(
+            *(call(prompt) for prompt in prompts), return_exceptions=return_exceptions
+        )
+
+    def stream(
+        self, prompt: str, config: Optional[Dict[str, Any]] = None
+    ) -> Iterator[FakeMessage]:
+        latency, text = self._draw(prompt)
+        if text is None:
+            time.sleep(latency)
+            raise FakeLLMError("simulated LLM provider failure")
+        chunks = self._chunks(text)
+        for index, chunk in enumerate(chunks):
+            time.sleep(latency / len(chunks))
+            usage = self._usage(prompt, text) if index == len(chunks) - 1 else None
+            yield FakeMessage(chunk, usage)
+
+    async def astream(
+        self, prompt: str, config: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[FakeMessage]:
+        latency, text = self._draw(prompt)
+        if text is None:
+            await asyncio.sleep(latency)
+            raise FakeLLMError("simulated LLM provider failure")
+        chunks = self._chunks(text)
+        for index, chunk in enumerate(chunks):
+            await asyncio.sleep(latency / len(chunks))
+            usage = self._usage(prompt, text) if index == len(chunks) - 1 else None
+            yield FakeMessage(chunk, usage)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "failures": self.failures,
+                "malformed": self.malformed,
+            }
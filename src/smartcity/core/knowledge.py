@@ -0,0 +1,225 @@
+"""
+Knowledge base of the MAPE-K loop: the latest known state of each entity.
+
+Entries come from Orion subscription notifications, from reads that went to
+Orion, and from our own writes. The state is kept in Orion's normalized form
+(`{"attr": {"type", "value", "metadata"}}`) so it can be served in place of a
+`GET /v2/entities/{id}`. Freshness is the local age of each attribute; the
+entity's `dateModified`, when present, keeps an older notification from
+overwriting a newer state. Only values read from Orion or written by us are
+trusted to skip a write; notifications are not authenticated.
+"""
+
+from __future__ import annotations
+
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Entries older than this are not served and the read goes to Orion (0 = never serve).
+KNOWLEDGE_MAX_AGE_MS = float(os.getenv("KNOWLEDGE_MAX_AGE_MS", "1000"))
+KNOWLEDGE_MAX_ENTITIES = int(os.getenv("KNOWLEDGE_MAX_ENTITIES", "10000"))
+
+
+def _attr_type(value: Any) -> str:
+    if isinstance(value, bool):
+        return "Boolean"
+    if isinstance(value, (int, float)):
+        return "Number"
+    if isinstance(value, str):
+        return "Text"
+    return "StructuredValue"
+
+
+def _normalized(entity: Dict[str, Any]) -> Dict[str, Any]:
+    """The entity in normalized form; keyValues attributes get wrapped."""
+    normalized: Dict[str, Any] = {}
+    for name, value in entity.items():
+        if name in ("id", "type") or (isinstance(value, dict) and "value" in value):
+            normalized[name] = value
+        else:
+            normalized[name] = {
+                "type": _attr_type(value),
+                "value": value,
+                "metadata": {},
+            }
+    return normalized
+
+
+def _value(attr: Any) -> Any:
+    """The value of a normalized attribute (`id` and `type` are bare)."""
+    return attr.get("value") if isinstance(attr, dict) else attr
+
+
+def _date_modified(entity: Dict[str, Any]) -> Optional[str]:
+    """The entity's `dateModified`, or the latest one in its attribute metadata."""
+    value = entity.get("dateModified")
+    if isinstance(value, dict):
+        value = value.get("value")
+    if isinstance(value, str):
+        return value
+    dates = [
+        attr["metadata"]["dateModified"].get("value")
+        for attr in entity.values()
+        if isinstance(attr, dict)
+        and isinstance(attr.get("metadata"), dict)
+        and isinstance(attr["metadata"].get("dateModified"), dict)
+    ]
+    dates = [date for date in dates if isinstance(date, str)]
+    return max(dates) if dates else None
+
+
+class _Entry:
+    """
+    One entity: when each attribute was last observed and whether its value
+    is confirmed by Orion or our own write, and whether the whole entity has
+    been read from Orion (notifications may carry only some attributes, so an
+    entity known only from them is never served).
+    """
+
+    __slots__ = ("complete", "date_modified", "attrs")
+
+    def __init__(self) -> None:
+        self.complete = False
+        self.date_modified: Optional[str] = None
+        self.attrs: Dict[str, Tuple[float, Any, bool]] = {}
+
+    def age_ms(self, now: float, names: Iterable[str]) -> float:
+        return max((now - self.attrs[name][0]) * 1000 for name in names)
+
+
+class KnowledgeBase:
+    """
+    LRU map of entity id to its latest known state, with the time each
+    attribute was last observed. Safe to share across threads.
+    """
+
+    def __init__(self, max_age_ms: float, max_entities: int):
+        self.max_age_ms = max_age_ms
+        self.max_entities = max_entities
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.updates = 0
+        self.writes = 0
+        self.unchanged_writes = 0
+        self.out_of_order = 0
+        self.evictions = 0
+
+    def observe(self, entity: Dict[str, Any], complete: bool = False) -> bool:
+        """
+        Merge the attributes of `entity` as seen now into the stored state;
+        `complete` marks a full read from Orion. Returns False when the entity
+        is older than the stored state and was dropped.
+        """
+        entity_id = entity.get("id")
+        if not entity_id or self.max_entities <= 0:
+            return False
+        date_modified = _date_modified(entity)
+        normalized = _normalized(entity)
+        now = time.monotonic()
+        with self._lock:
+            current = self._entries.get(entity_id)
+            if current is None:
+                current = self._entries[entity_id] = _Entry()
+            elif (
+                date_modified is not None
+                and current.date_modified is not None
+                and date_modified < current.date_modified
+            ):
+                self.out_of_order += 1
+                return False
+            if complete:
+                current.attrs.clear()
+                current.complete = True
+            current.date_modified = date_modified or current.date_modified
+            for name, value in normalized.items():
+                # A notification repeating a confirmed value keeps it confirmed.
+                previous = current.attrs.get(name)
+                confirmed = complete or (
+                    previous is not None
+                    and previous[2]
+                    and _value(previous[1]) == _value(value)
+                )
+                current.attrs[name] = (now, value, confirmed)
+            self._entries.move_to_end(entity_id)
+            self.updates += 1
+            while len(self._entries) > self.max_entities:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return True
+
+    def record_write(self, entity_id: str, attrs: Dict[str, Any]) -> None:
+        """Apply attributes we wrote to Orion to a known entity."""
+        now = time.monotonic()
+        with self._lock:
+            current = self._entries.get(entity_id)
+            if current is None:
+                return
+            for name, value in _normalized(attrs).items():
+                current.attrs[name] = (now, value, True)
+            self.writes += 1
+
+    def fresh(self, entity_id: str) -> Optional[Dict[str, Any]]:
+        """
+        A copy of the entity if it was read from Orion and every attribute was
+        observed within `max_age_ms`.
+        """
+        with self._lock:
+            current = self._entries.get(entity_id)
+            if current is None or not current.complete:
+                self.misses += 1
+                return None
+            if current.age_ms(time.monotonic(), current.attrs) > self.max_age_ms:
+                self.stale += 1
+                return None
+            self._entries.move_to_end(entity_id)
+            self.hits += 1
+            return copy.deepcopy(
+                {name: value for name, (_, value, _) in current.attrs.items()}
+            )
+
+    def unchanged(self, entity_id: str, values: Dict[str, Any]) -> bool:
+        """
+        Whether writing `values` (attribute name to value) would change nothing,
+        judged on those attributes as confirmed and observed within
+        `max_age_ms`. Not a hit or a miss.
+        """
+        with self._lock:
+            current = self._entries.get(entity_id)
+            if current is None or any(name not in current.attrs for name in values):
+                return False
+            if current.age_ms(time.monotonic(), values) > self.max_age_ms or any(
+                not current.attrs[name][2] or _value(current.attrs[name][1]) != value
+                for name, value in values.items()
+            ):
+                return False
+            self.unchanged_writes += 1
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_age_ms": self.max_age_ms,
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "updates": self.updates,
+                "writes": self.writes,
+                "unchanged_writes": self.unchanged_writes,
+                "out_of_order": self.out_of_order,
+                "evictions": self.evictions,
+            }
+
+
+knowledge_base = KnowledgeBase(KNOWLEDGE_MAX_AGE_MS, KNOWLEDGE_MAX_ENTITIES)
@@ -0,0 +1,150 @@
+"""Cache of LLM plan responses: in-memory LRU over an optional SQLite store."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+def cache_key(**parts: Any) -> str:
+    """Digest of the canonical JSON of `parts` (sorted keys, compact separators)."""
+    canonical = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class LlmResponseCache:
+    """
+    LRU cache of LLM responses with a per-entry TTL.
+
+    The memory layer holds up to `max_size` entries. When `path` is set, every
+    entry is also written to a SQLite file that survives restarts and holds
+    up to `disk_max_size` entries (oldest dropped first); a memory miss falls
+    through to it. Expiry uses wall-clock time so disk entries age across
+    restarts. Safe to share across threads.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl_seconds: float,
+        path: Optional[str] = None,
+        disk_max_size: int = 10000,
+    ):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.path = path or None
+        self.disk_max_size = disk_max_size
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if self.path:
+            self._open_db(self.path)
+
+    def _open_db(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS llm_responses ("
+            " key TEXT PRIMARY KEY, expires_at REAL NOT NULL,"
+            " stored_at REAL NOT NULL, response TEXT NOT NULL)"
+        )
+        self._db.execute(
+            "DELETE FROM llm_responses WHERE expires_at <= ?", (time.time(),)
+        )
+        self._db.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+
+            row = self._disk_get(key, now)
+            if row is None:
+                self.misses += 1
+                return None
+            self._remember(key, row[0], row[1])
+            self.hits += 1
+            self.disk_hits += 1
+            return row[1]
+
+    def put(self, key: str, response: str) -> None:
+        if self.max_size <= 0 and self._db is None:
+            return
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        with self._lock:
+            self._remember(key, expires_at, response)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_responses VALUES (?, ?, ?, ?)",
+                    (key, expires_at, now, response),
+                )
+                self._db.execute(
+                    "DELETE FROM llm_responses WHERE key NOT IN ("
+                    " SELECT key FROM llm_responses ORDER BY stored_at DESC LIMIT ?)",
+                    (self.disk_max_size,),
+                )
+                self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM llm_responses")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "persistent": self._db is not None,
+            }
+
+    def _remember(self, key: str, expires_at: float, response: str) -> None:
+        # Caller holds the lock.
+        if self.max_size <= 0:
+            return
+        self._entries[key] = (expires_at, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _disk_get(self, key: str, now: float) -> Optional[Tuple[float, str]]:
+        # Caller holds the lock.
+        if self._db is None:
+            return None
+        row = self._db.execute(
+            "SELECT expires_at, response FROM llm_responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[0] <= now:
+            self._db.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+            self._db.commit()
+            return None
+        return row[0], row[1]
@@ -2,9 +2,14 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 import os
-from typing import Any, Dict, Optional
+import threading
+import time
+import uuid
+import weakref
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
 
 from dotenv import load_dotenv
 # Handle optional LangChain imports
@@ -34,29 +39,68 @@ except ImportError:
         def invoke(self, prompt):
             return None
 
+        async def ainvoke(self, prompt):
+            return None
+
+        def batch(self, prompts, config=None, return_exceptions=False):
+            return [None for _ in prompts]
+
+        async def abatch(self, prompts, config=None, return_exceptions=False):
+            return [None for _ in prompts]
+
+        def stream(self, prompt):
+            return iter(())
+
+        async def astream(self, prompt):
+            for chunk in ():
+                yield chunk
+
 
 from ..infra.logging_utils import configure_logger
+from .fake_llm import FAKE_MODEL_NAME, FakeChatModel
+from .llm_cache import LlmResponseCache, cache_key
+from .stream_parser import INVALID_STEP, RISK_LEVEL, STEP, IncrementalPlanParser
 from .models import ActionType, MonitorEvent, RiskLevel, validate_plan_dict # type: ignore  # noqa: F401
 
 load_dotenv()
 
 logger = configure_logger("llm_planner")
 
+# Chat model behind the planner: "openai" (LangChain ChatOpenAI) or "fake", the
+# local stand-in in fake_llm.py (no network, no API key; FAKE_LLM_* settings).
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai").lower()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4-turbo")
+LLM_MODEL = FAKE_MODEL_NAME if LLM_BACKEND == "fake" else OPENAI_MODEL
 TRAFFIC_SIGNAL_ID = os.getenv("TRAFFIC_SIGNAL_ID", "TrafficSignal:001")
 LLM_PLANNER_ENABLED = os.getenv("LLM_PLANNER_ENABLED", "false").lower() == "true"
 LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.3"))
-
-
-PLAN_GENERATION_PROMPT = PromptTemplate(
-    input_variables=["event_data", "available_actions", "schema_example"],
-    template="""You are an intelligent traffic management planner for a smart city system.
+# Burst planning: concurrent model calls per batch, and how long the async
+# micro-batcher waits to group events (0 = no micro-batching) and up to how many.
+LLM_BATCH_MAX_CONCURRENCY = int(os.getenv("LLM_BATCH_MAX_CONCURRENCY", "8"))
+LLM_BATCH_WINDOW_MS = float(os.getenv("LLM_BATCH_WINDOW_MS", "20"))
+LLM_BATCH_MAX_SIZE = int(os.getenv("LLM_BATCH_MAX_SIZE", "32"))
+# Consume the model's token stream and validate plan parts as they arrive.
+LLM_STREAMING = os.getenv("LLM_STREAMING", "false").lower() == "true"
+# Send a one-line request when warming up the client at service start.
+LLM_WARMUP_PING = os.getenv("LLM_WARMUP_PING", "false").lower() == "true"
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+LLM_CACHE_MAX_SIZE = int(os.getenv("LLM_CACHE_MAX_SIZE", "512"))
+# SQLite file that keeps cached plans across restarts; empty = memory only.
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "")
+LLM_CACHE_DISK_MAX_SIZE = int(os.getenv("LLM_CACHE_DISK_MAX_SIZE", "10000"))
+
+# Part of the plan cache key: bump whenever PLAN_GENERATION_PROMPT, the action
+# description or the schema example change, so stale plans are not replayed.
+PROMPT_VERSION = "5"
+
+
+# Static sections come first and the event data last, so every call shares
+# the same prompt prefix (providers cache repeated prefixes).
+_PLAN_PROMPT_TEMPLATE = """You are an intelligent traffic management planner for a smart city system.
 Your task is to generate a traffic management plan in response to a monitoring event.
 
-## Event Data
-{event_data}
-
 ## Available Actions
 {available_actions}
 
@@ -76,14 +120,46 @@ Your task is to generate a traffic management plan in response to a monitoring e
    - 2 for MEDIUM risk (human review)
    - 3 for HIGH risk (human review required)
 6. Use realistic goal and scenario descriptions
-7. Always include exactly 3 steps: read-state, set-priority, notify
+7. Include 3 steps: read-state, set-priority, notify
+8. Use the event's entity_id for every entity_id param. When corridor_signals
+   lists further signals, read-state and set-priority use the bulk actions
+   (getTrafficSignalStates, setPriorityCorridors) with entity_ids set to the
+   event's entity_id followed by every corridor signal
+
+## Event Data
+{event_data}
 
 ## Output
 Return ONLY the JSON plan, no explanation or markdown:
-""",
+"""
+
+PLAN_GENERATION_PROMPT = PromptTemplate(
+    input_variables=["event_data", "available_actions", "schema_example"],
+    template=_PLAN_PROMPT_TEMPLATE,
 )
 
 
+def _build_plan_cache() -> Optional[LlmResponseCache]:
+    if not LLM_CACHE_ENABLED:
+        return None
+    try:
+        return LlmResponseCache(
+            LLM_CACHE_MAX_SIZE,
+            LLM_CACHE_TTL_SECONDS,
+            path=LLM_CACHE_PATH,
+            disk_max_size=LLM_CACHE_DISK_MAX_SIZE,
+        )
+    except Exception as e:
+        logger.error(
+            "LLM plan cache store unavailable; caching in memory only",
+            extra={"extra_fields": {"path": LLM_CACHE_PATH, "error": str(e)}},
+        )
+        return LlmResponseCache(LLM_CACHE_MAX_SIZE, LLM_CACHE_TTL_SECONDS)
+
+
+_plan_cache = _build_plan_cache()
+
+
 def _get_available_actions_description() -> str:
     """Generate description of available actions for the LLM."""
     return f"""
@@ -98,6 +174,14 @@ def _get_available_actions_description() -> str:
 3. {ActionType.NOTIFY_TRAFFIC_AGENTS.value}
    - Notifies traffic agents of situation
    - Required params: message (string)
+
+4. {ActionType.GET_TRAFFIC_SIGNAL_STATES.value}
+   - Reads the state of several traffic signals in one call
+   - Required params: entity_ids (list of strings)
+
+5. {ActionType.SET_PRIORITY_CORRIDORS.value}
+   - Sets the same priority corridor mode on several signals in one call (e.g. a green wave)
+   - Required params: entity_ids (list of strings), value (enum: "emergency", "critical-infra", "none")
 """
 
 
@@ -133,8 +217,38 @@ def _get_schema_example() -> str:
     )
 
 
-def _get_llm_client() -> Optional[ChatOpenAI]:
-    """Initialize LangChain ChatOpenAI client if API key is available."""
+def _render_prompt_parts() -> Tuple[str, str]:
+    """Render the static text before and after the event data once."""
+    marker = "\x00event_data\x00"
+    rendered = _PLAN_PROMPT_TEMPLATE.format(
+        event_data=marker,
+        available_actions=_get_available_actions_description(),
+        schema_example=_get_schema_example(),
+    )
+    prefix, suffix = rendered.split(marker)
+    return prefix, suffix
+
+
+_render_started = time.perf_counter()
+_PROMPT_PREFIX, _PROMPT_SUFFIX = _render_prompt_parts()
+_PROMPT_RENDER_MS = round((time.perf_counter() - _render_started) * 1000, 3)
+
+_llm_client: Optional[Any] = None
+_llm_client_lock = threading.Lock()
+
+
+def _construct_llm_client() -> Optional[Any]:
+    """Build the chat model for LLM_BACKEND; None if it cannot be used."""
+    if LLM_BACKEND == "fake":
+        return FakeChatModel()
+
+    if LLM_BACKEND != "openai":
+        logger.warning(
+            "Unknown LLM_BACKEND; LLM planner unavailable",
+            extra={"extra_fields": {"backend": LLM_BACKEND}},
+        )
+        return None
+
     if not LANGCHAIN_AVAILABLE:
         logger.warning("LangChain not installed; LLM planner unavailable")
         return None
@@ -152,11 +266,102 @@ def _get_llm_client() -> Optional[ChatOpenAI]:
     except Exception as e:
         logger.error(
             "Failed to initialize ChatOpenAI client",
-            extra={"error": str(e)},
+            extra={"extra_fields": {"error": str(e)}},
         )
         return None
 
 
+def _get_llm_client() -> Optional[Any]:
+    """Return the shared chat model client, building it on first use."""
+    global _llm_client
+    if _llm_client is not None:
+        return _llm_client
+
+    with _llm_client_lock:
+        if _llm_client is not None:
+            return _llm_client
+        started = time.perf_counter()
+        client = _construct_llm_client()
+        if client is None:
+            return None
+        _llm_client = client
+        logger.info(
+            "LLM client constructed",
+            extra={
+                "extra_fields": {
+                    "backend": LLM_BACKEND,
+                    "model": LLM_MODEL,
+                    "construction_ms": round((time.perf_counter() - started) * 1000, 3),
+                    "prompt_prefix_chars": len(_PROMPT_PREFIX),
+                    "prompt_render_ms": _PROMPT_RENDER_MS,
+                }
+            },
+        )
+        return client
+
+
+def warm_up_llm_client(ping: bool = LLM_WARMUP_PING) -> bool:
+    """
+    Build the shared client ahead of the first event. With `ping`, also send a
+    one-line request so the provider connection is open before it is needed.
+    """
+    if not LLM_PLANNER_ENABLED:
+        return False
+    llm = _get_llm_client()
+    if llm is None:
+        return False
+    if ping:
+        started = time.perf_counter()
+        try:
+            llm.invoke("Reply with OK.")
+        except Exception as e:
+            logger.warning(
+                "LLM warm-up request failed",
+                extra={"extra_fields": {"error": str(e)}},
+            )
+            return False
+        logger.info(
+            "LLM warm-up request completed",
+            extra={
+                "extra_fields": {
+                    "latency_ms": round((time.perf_counter() - started) * 1000, 3)
+                }
+            },
+        )
+    return True
+
+
+def _log_llm_usage(response: Any, prompt: str, started: float, trace_id: str) -> None:
+    """Log latency and the token counts the provider reported for one call."""
+    # LangChain exposes usage as `usage_metadata`; older versions only carry
+    # OpenAI's raw `token_usage` in `response_metadata`.
+    usage = getattr(response, "usage_metadata", None) or {}
+    metadata = getattr(response, "response_metadata", None) or {}
+    token_usage = metadata.get("token_usage") or {}
+    cached_tokens = (usage.get("input_token_details") or {}).get(
+        "cache_read",
+        (token_usage.get("prompt_tokens_details") or {}).get("cached_tokens"),
+    )
+    logger.info(
+        "LLM call completed",
+        extra={
+            "traceId": trace_id,
+            "extra_fields": {
+                "model": LLM_MODEL,
+                "latency_ms": round((time.perf_counter() - started) * 1000, 3),
+                "prompt_chars": len(prompt),
+                "prompt_tokens": usage.get(
+                    "input_tokens", token_usage.get("prompt_tokens")
+                ),
+                "completion_tokens": usage.get(
+                    "output_tokens", token_usage.get("completion_tokens")
+                ),
+                "cached_prompt_tokens": cached_tokens,
+            },
+        },
+    )
+
+
 def _parse_llm_response(response_text: str, trace_id: str) -> Optional[Dict[str, Any]]:
     """Extract and validate JSON from LLM response."""
     try:
@@ -187,102 +392,331 @@ def _parse_llm_response(response_text: str, trace_id: str) -> Optional[Dict[str,
         return None
 
 
-def generate_plan_with_llm(
-    event: MonitorEvent, trace_id: str
-) -> Optional[Dict[str, Any]]:
-    """
-    Generate a traffic management plan using LangChain LLM.
-
-    Args:
-        event: Monitoring event containing traffic and weather conditions
-        trace_id: Trace ID for logging and telemetry
-
-    Returns:
-        Dictionary representing the candidate plan, or None if generation fails
-    """
+def _ready_llm_client(trace_id: str) -> Optional[Any]:
+    """Return an LLM client if LLM planning is enabled and configured."""
     if not LLM_PLANNER_ENABLED:
         return None
 
-    if not LANGCHAIN_AVAILABLE:
+    if LLM_BACKEND == "openai" and not LANGCHAIN_AVAILABLE:
         logger.debug(
             "LangChain not available; LLM planner disabled",
             extra={"traceId": trace_id},
         )
         return None
 
-    llm = _get_llm_client()
-    if not llm:
+    return _get_llm_client()
+
+
+def _event_data(event: MonitorEvent) -> Dict[str, Any]:
+    """The event fields the prompt shows the model."""
+    return {
+        "entity_id": event.entity_id or TRAFFIC_SIGNAL_ID,
+        "corridor_signals": event.corridor_signals or [],
+        "event_type": event.event_type,
+        "ambulance_detected": event.ambulance_detected,
+        "heavy_rain": event.heavy_rain,
+        "flood_risk": event.flood_risk,
+        "crowd_level": event.crowd_level,
+        "location": event.location,
+        "notes": event.notes,
+    }
+
+
+def _build_prompt(event: MonitorEvent) -> str:
+    """Render the plan generation prompt for an event."""
+    event_data = json.dumps(_event_data(event), indent=2)
+    return _PROMPT_PREFIX + event_data + _PROMPT_SUFFIX
+
+
+def _plan_from_response(response_text: str, trace_id: str) -> Optional[Dict[str, Any]]:
+    """Parse, stamp and validate the LLM response; None if it is not a valid plan."""
+    logger.debug(
+        "LLM response received",
+        extra={"traceId": trace_id, "response_length": len(response_text)},
+    )
+
+    # Parse and validate response
+    plan_data = _parse_llm_response(response_text, trace_id)
+    if not plan_data:
         return None
 
+    # Inject trace ID and set plan_id
+    plan_data.setdefault("plan_id", str(uuid.uuid4()))
+    plan_data.setdefault("telemetry", {})
+    plan_data["telemetry"]["traceId"] = trace_id
+
+    # Validate against schema
     try:
-        # Prepare prompt inputs
-        event_data = json.dumps(
-            {
-                "event_type": event.event_type,
-                "ambulance_detected": event.ambulance_detected,
-                "heavy_rain": event.heavy_rain,
-                "flood_risk": event.flood_risk,
-                "crowd_level": event.crowd_level,
-                "location": event.location,
-                "notes": event.notes,
+        validated_plan = validate_plan_dict(plan_data)
+        logger.info(
+            "LLM plan generated and validated successfully",
+            extra={
+                "traceId": trace_id,
+                "plan_id": validated_plan.plan_id,
+                "scenario": validated_plan.scenario,
+                "risk_level": validated_plan.risk_level.value,
             },
-            indent=2,
         )
+        return plan_data
+    except ValueError as e:
+        logger.warning(
+            "Generated plan failed validation",
+            extra={"traceId": trace_id, "error": str(e)},
+        )
+        return None
 
-        available_actions = _get_available_actions_description()
-        schema_example = _get_schema_example()
 
-        # Build and invoke the chain
-        prompt = PLAN_GENERATION_PROMPT.format(
-            event_data=event_data,
-            available_actions=available_actions,
-            schema_example=schema_example,
-        )
+def _plan_cache_key(event: MonitorEvent) -> str:
+    return cache_key(
+        event=_event_data(event),
+        model=LLM_MODEL,
+        temperature=LLM_TEMPERATURE,
+        prompt_version=PROMPT_VERSION,
+    )
 
-        logger.debug(
-            "Invoking LLM for plan generation",
-            extra={"traceId": trace_id, "model": OPENAI_MODEL},
-        )
 
-        response = llm.invoke(prompt)
-        response_text = response.content
+def _cached_plan(key: str, trace_id: str) -> Optional[Dict[str, Any]]:
+    """Replay a cached plan with a fresh plan_id and traceId, re-validated."""
+    if _plan_cache is None:
+        return None
 
-        logger.debug(
-            "LLM response received",
-            extra={"traceId": trace_id, "response_length": len(response_text)},
+    cached = _plan_cache.get(key)
+    logger.info(
+        "LLM plan cache hit" if cached is not None else "LLM plan cache miss",
+        extra={"traceId": trace_id, "extra_fields": _plan_cache.stats()},
+    )
+    if cached is None:
+        return None
+
+    return _restamp_plan(cached, trace_id)
+
+
+def _stored_plan(plan_data: Dict[str, Any]) -> str:
+    """The plan without its per-call identifiers, as compact JSON."""
+    stored = {k: v for k, v in plan_data.items() if k not in ("plan_id", "telemetry")}
+    return json.dumps(stored, separators=(",", ":"))
+
+
+def _restamp_plan(stored: str, trace_id: str) -> Optional[Dict[str, Any]]:
+    """Rebuild a stored plan with a fresh plan_id and traceId, re-validated."""
+    plan_data = json.loads(stored)
+    plan_data["plan_id"] = str(uuid.uuid4())
+    plan_data["telemetry"] = {"traceId": trace_id}
+    try:
+        validate_plan_dict(plan_data)
+    except ValueError as e:
+        logger.warning(
+            "Stored LLM plan failed validation",
+            extra={"traceId": trace_id, "extra_fields": {"error": str(e)}},
         )
+        return None
+    return plan_data
 
-        # Parse and validate response
-        plan_data = _parse_llm_response(response_text, trace_id)
-        if not plan_data:
-            return None
 
-        # Inject trace ID and set plan_id
-        import uuid
+def _remember_plan(key: str, plan_data: Optional[Dict[str, Any]]) -> None:
+    if _plan_cache is None or not plan_data:
+        return
+    _plan_cache.put(key, _stored_plan(plan_data))
 
-        plan_data.setdefault("plan_id", str(uuid.uuid4()))
-        plan_data.setdefault("telemetry", {})
-        plan_data["telemetry"]["traceId"] = trace_id
 
-        # Validate against schema
-        try:
-            validated_plan = validate_plan_dict(plan_data)
+async def _off_loop(func: Callable[..., Any], *args: Any) -> Any:
+    """
+    Call `func` for the async path: in a worker thread when the plan cache
+    has a SQLite store (its queries would block the event loop), inline when
+    the cache is memory-only.
+    """
+    if _plan_cache is not None and _plan_cache.path:
+        return await asyncio.to_thread(func, *args)
+    return func(*args)
+
+
+def llm_cache_stats() -> Dict[str, Any]:
+    if _plan_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **_plan_cache.stats()}
+
+
+RiskLevelCallback = Callable[[str], None]
+
+
+def _chunk_text(chunk: Any) -> str:
+    content = getattr(chunk, "content", "")
+    return content if isinstance(content, str) else ""
+
+
+def _handle_stream_events(
+    events: List[Tuple[str, Any]],
+    trace_id: str,
+    started: float,
+    on_risk_level: Optional[RiskLevelCallback],
+) -> bool:
+    """Log streamed plan parts; False once a step fails validation."""
+    for kind, value in events:
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 3)
+        if kind == RISK_LEVEL:
+            logger.info(
+                "LLM plan risk level streamed",
+                extra={
+                    "traceId": trace_id,
+                    "extra_fields": {"risk_level": value, "elapsed_ms": elapsed_ms},
+                },
+            )
+            if on_risk_level is not None:
+                on_risk_level(value)
+        elif kind == STEP:
             logger.info(
-                "LLM plan generated and validated successfully",
+                "LLM plan step streamed",
                 extra={
                     "traceId": trace_id,
-                    "plan_id": validated_plan.plan_id,
-                    "scenario": validated_plan.scenario,
-                    "risk_level": validated_plan.risk_level.value,
+                    "extra_fields": {
+                        "step_id": value.id,
+                        "action": value.action.value,
+                        "elapsed_ms": elapsed_ms,
+                    },
                 },
             )
-            return plan_data
-        except ValueError as e:
+        elif kind == INVALID_STEP:
             logger.warning(
-                "Generated plan failed validation",
-                extra={"traceId": trace_id, "error": str(e)},
+                "Streamed plan step failed validation; abandoning LLM plan",
+                extra={
+                    "traceId": trace_id,
+                    "extra_fields": {"error": value, "elapsed_ms": elapsed_ms},
+                },
             )
+            return False
+    return True
+
+
+def _stream_response(
+    llm: Any,
+    prompt: str,
+    trace_id: str,
+    started: float,
+    on_risk_level: Optional[RiskLevelCallback],
+) -> Optional[Tuple[str, Any]]:
+    """Response text and aggregated message, or None if the stream was abandoned."""
+    parser = IncrementalPlanParser()
+    message = None
+    for chunk in llm.stream(prompt):
+        message = chunk if message is None else message + chunk
+        events = parser.feed(_chunk_text(chunk))
+        if not _handle_stream_events(events, trace_id, started, on_risk_level):
             return None
+    return parser.text, message
+
+
+async def _astream_response(
+    llm: Any,
+    prompt: str,
+    trace_id: str,
+    started: float,
+    on_risk_level: Optional[RiskLevelCallback],
+) -> Optional[Tuple[str, Any]]:
+    parser = IncrementalPlanParser()
+    message = None
+    async for chunk in llm.astream(prompt):
+        message = chunk if message is None else message + chunk
+        events = parser.feed(_chunk_text(chunk))
+        if not _handle_stream_events(events, trace_id, started, on_risk_level):
+            return None
+    return parser.text, message
+
+
+def generate_plan_with_llm(
+    event: MonitorEvent,
+    trace_id: str,
+    on_risk_level: Optional[RiskLevelCallback] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Generate a traffic management plan using LangChain LLM.
+
+    Args:
+        event: Monitoring event containing traffic and weather conditions
+        trace_id: Trace ID for logging and telemetry
+        on_risk_level: With LLM_STREAMING, called with the plan's risk level as
+            soon as it has streamed in, before the rest of the plan
+
+    Returns:
+        Dictionary representing the candidate plan, or None if generation fails
+    """
+    llm = _ready_llm_client(trace_id)
+    if not llm:
+        return None
+
+    key = _plan_cache_key(event)
+    cached_plan = _cached_plan(key, trace_id)
+    if cached_plan:
+        return cached_plan
+
+    try:
+        prompt = _build_prompt(event)
+
+        logger.debug(
+            "Invoking LLM for plan generation",
+            extra={"traceId": trace_id, "model": LLM_MODEL},
+        )
+
+        started = time.perf_counter()
+        if LLM_STREAMING:
+            streamed = _stream_response(llm, prompt, trace_id, started, on_risk_level)
+            if streamed is None:
+                return None
+            response_text, response = streamed
+        else:
+            response = llm.invoke(prompt)
+            response_text = response.content
+        _log_llm_usage(response, prompt, started, trace_id)
+        # The complete plan is always validated, streamed or not.
+        plan_data = _plan_from_response(response_text, trace_id)
+        _remember_plan(key, plan_data)
+        return plan_data
+
+    except Exception as e:
+        logger.error(
+            "Error during LLM plan generation",
+            extra={"traceId": trace_id, "error": str(e)},
+        )
+        return None
+
+
+async def agenerate_plan_with_llm(
+    event: MonitorEvent,
+    trace_id: str,
+    on_risk_level: Optional[RiskLevelCallback] = None,
+) -> Optional[Dict[str, Any]]:
+    """Async `generate_plan_with_llm`: awaits the model via `ainvoke`/`astream`."""
+    llm = _ready_llm_client(trace_id)
+    if not llm:
+        return None
+
+    key = _plan_cache_key(event)
+    cached_plan = await _off_loop(_cached_plan, key, trace_id)
+    if cached_plan:
+        return cached_plan
+
+    try:
+        prompt = _build_prompt(event)
+
+        logger.debug(
+            "Invoking LLM for plan generation",
+            extra={"traceId": trace_id, "model": LLM_MODEL},
+        )
+
+        started = time.perf_counter()
+        if LLM_STREAMING:
+            streamed = await _astream_response(
+                llm, prompt, trace_id, started, on_risk_level
+            )
+            if streamed is None:
+                return None
+            response_text, response = streamed
+        else:
+            response = await llm.ainvoke(prompt)
+            response_text = response.content
+        _log_llm_usage(response, prompt, started, trace_id)
+        plan_data = _plan_from_response(response_text, trace_id)
+        await _off_loop(_remember_plan, key, plan_data)
+        return plan_data
 
     except Exception as e:
         logger.error(
@@ -290,3 +724,196 @@ def generate_plan_with_llm(
             extra={"traceId": trace_id, "error": str(e)},
         )
         return None
+
+
+class _PlanBatch:
+    """Events of one batch call, grouped so identical events share one prompt."""
+
+    def __init__(self, events: Sequence[MonitorEvent], trace_ids: Sequence[str]):
+        if len(events) != len(trace_ids):
+            raise ValueError("generate_plans_with_llm needs one trace id per event")
+        self.trace_ids = list(trace_ids)
+        self.plans: List[Optional[Dict[str, Any]]] = [None] * len(events)
+        self.groups: Dict[str, List[int]] = {}
+        self.prompts: List[str] = []
+        for index, event in enumerate(events):
+            key = _plan_cache_key(event)
+            if key in self.groups:
+                self.groups[key].append(index)
+                continue
+            cached = _cached_plan(key, self.trace_ids[index])
+            if cached:
+                self.plans[index] = cached
+                continue
+            self.groups[key] = [index]
+            self.prompts.append(_build_prompt(event))
+
+    def settle(self, responses: Sequence[Any], started: float) -> None:
+        """Demultiplex one response per prompt back onto the events."""
+        for (key, indexes), prompt, response in zip(
+            self.groups.items(), self.prompts, responses
+        ):
+            first_trace_id = self.trace_ids[indexes[0]]
+            if isinstance(response, Exception) or response is None:
+                logger.error(
+                    "Error during LLM plan generation",
+                    extra={
+                        "traceId": first_trace_id,
+                        "extra_fields": {
+                            "error": str(response),
+                            "events": len(indexes),
+                        },
+                    },
+                )
+                continue
+            _log_llm_usage(response, prompt, started, first_trace_id)
+            plan_data = _plan_from_response(response.content, first_trace_id)
+            if not plan_data:
+                continue
+            _remember_plan(key, plan_data)
+            self.plans[indexes[0]] = plan_data
+            stored = _stored_plan(plan_data)
+            for index in indexes[1:]:
+                self.plans[index] = _restamp_plan(stored, self.trace_ids[index])
+
+    def log(self, started: float) -> None:
+        logger.info(
+            "LLM batch planning completed",
+            extra={
+                "extra_fields": {
+                    "events": len(self.plans),
+                    "model_calls": len(self.prompts),
+                    "planned": sum(1 for plan in self.plans if plan),
+                    "max_concurrency": LLM_BATCH_MAX_CONCURRENCY,
+                    "latency_ms": round((time.perf_counter() - started) * 1000, 3),
+                }
+            },
+        )
+
+
+def generate_plans_with_llm(
+    events: Sequence[MonitorEvent], trace_ids: Sequence[str]
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    Plan a burst of events with concurrent model calls (LangChain `batch`).
+
+    Returns one plan dict per event, in order, with None for every event that
+    could not be planned; callers fall back to the rule-based planner for those.
+    Cached and identical events do not add model calls.
+    """
+    if not events:
+        return []
+    llm = _ready_llm_client(trace_ids[0])
+    if not llm:
+        return [None] * len(events)
+
+    batch = _PlanBatch(events, trace_ids)
+    started = time.perf_counter()
+    if batch.prompts:
+        responses = llm.batch(
+            batch.prompts,
+            config={"max_concurrency": LLM_BATCH_MAX_CONCURRENCY},
+            return_exceptions=True,
+        )
+        batch.settle(responses, started)
+    batch.log(started)
+    return batch.plans
+
+
+async def agenerate_plans_with_llm(
+    events: Sequence[MonitorEvent], trace_ids: Sequence[str]
+) -> List[Optional[Dict[str, Any]]]:
+    """Async `generate_plans_with_llm` (LangChain `abatch`)."""
+    if not events:
+        return []
+    llm = _ready_llm_client(trace_ids[0])
+    if not llm:
+        return [None] * len(events)
+
+    batch = await _off_loop(_PlanBatch, events, trace_ids)
+    started = time.perf_counter()
+    if batch.prompts:
+        responses = await llm.abatch(
+            batch.prompts,
+            config={"max_concurrency": LLM_BATCH_MAX_CONCURRENCY},
+            return_exceptions=True,
+        )
+        await _off_loop(batch.settle, responses, started)
+    batch.log(started)
+    return batch.plans
+
+
+class PlanMicroBatcher:
+    """
+    Groups single-event LLM planning requests that arrive within `window_ms`
+    of each other (up to `max_size`) into one `agenerate_plans_with_llm` call.
+    A request arriving while no batch is running is sent at once, so a lone
+    plan does not wait out the window; only requests that arrive during a
+    model call are held back and batched. Bound to the event loop it is
+    first used on.
+    """
+
+    def __init__(
+        self, window_ms: float = LLM_BATCH_WINDOW_MS, max_size: int = LLM_BATCH_MAX_SIZE
+    ):
+        self.window_ms = window_ms
+        self.max_size = max(1, max_size)
+        self._pending: List[Tuple[MonitorEvent, str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set["asyncio.Task[None]"] = set()
+
+    async def plan(
+        self, event: MonitorEvent, trace_id: str
+    ) -> Optional[Dict[str, Any]]:
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future = loop.create_future()
+        self._pending.append((event, trace_id, future))
+        if len(self._pending) >= self.max_size or not self._tasks:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_ms / 1000, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        if pending:
+            task = asyncio.get_running_loop().create_task(self._run(pending))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, pending: List[Tuple[MonitorEvent, str, asyncio.Future]]):
+        # Requests whose caller gave up (planning deadline) are dropped.
+        live = [item for item in pending if not item[2].done()]
+        if not live:
+            return
+        try:
+            plans = await agenerate_plans_with_llm(
+                [event for event, _, _ in live], [trace_id for _, trace_id, _ in live]
+            )
+        except Exception as e:
+            plans = [None] * len(live)
+            logger.error(
+                "Error during LLM batch planning",
+                extra={"extra_fields": {"error": str(e), "events": len(live)}},
+            )
+        for (_, _, future), plan in zip(live, plans):
+            if not future.done():
+                future.set_result(plan)
+
+
+# One micro-batcher per event loop, dropped with its loop.
+_micro_batchers: (
+    "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, PlanMicroBatcher]"
+) = weakref.WeakKeyDictionary()
+
+
+def plan_micro_batcher() -> PlanMicroBatcher:
+    """The micro-batcher of the running event loop."""
+    loop = asyncio.get_running_loop()
+    batcher = _micro_batchers.get(loop)
+    if batcher is None:
+        batcher = _micro_batchers[loop] = PlanMicroBatcher()
+    return batcher
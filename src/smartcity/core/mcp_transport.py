@@ -0,0 +1,140 @@
+"""Transports the executor uses to reach the MCP tools: HTTP or in-process."""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Any, Dict, List, Tuple
+
+from dotenv import load_dotenv
+
+from ..infra.http_pool import get_async_client, get_session
+
+load_dotenv()
+
+MCP_SERVER_URL = os.getenv("MCP_SERVER_URL", "http://localhost:8000/mcp")
+MCP_BATCH_URL = os.getenv("MCP_BATCH_URL", f"{MCP_SERVER_URL.rstrip('/')}/batch")
+# "http": POST to the MCP server; "inproc": call the tool registry in this process.
+MCP_TRANSPORT = os.getenv("MCP_TRANSPORT", "http").lower()
+# Per MCP call; a batch gets this per call up to MCP_BATCH_TIMEOUT_SECONDS.
+MCP_TIMEOUT_SECONDS = 10
+MCP_BATCH_TIMEOUT_SECONDS = float(os.getenv("MCP_BATCH_TIMEOUT_SECONDS", "30"))
+
+
+class McpTransportError(RuntimeError):
+    """The transport rejected a whole request (e.g. a batch with an invalid token)."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(f"{status_code} error from MCP: {detail}")
+        self.status_code = status_code
+
+
+def _batch_timeout(payload: Dict[str, Any]) -> float:
+    return min(MCP_TIMEOUT_SECONDS * len(payload["calls"]), MCP_BATCH_TIMEOUT_SECONDS)
+
+
+def render_body(body: Dict[str, Any]) -> str:
+    # Same rendering FastAPI uses, so bodies match across transports.
+    return json.dumps(body, ensure_ascii=False, separators=(",", ":"))
+
+
+class HttpMcpTransport:
+    """Calls the MCP server over the shared keep-alive HTTP pool."""
+
+    def __init__(self, url: str = MCP_SERVER_URL, batch_url: str = MCP_BATCH_URL):
+        self.url = url
+        self.batch_url = batch_url
+
+    def call(self, payload: Dict[str, Any]) -> Tuple[int, str]:
+        response = get_session().post(
+            self.url, json=payload, timeout=MCP_TIMEOUT_SECONDS
+        )
+        return response.status_code, response.text
+
+    def call_batch(self, payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+        response = get_session().post(
+            self.batch_url, json=payload, timeout=_batch_timeout(payload)
+        )
+        if response.status_code >= 400:
+            raise McpTransportError(response.status_code, response.text)
+        return response.json()["results"]
+
+    async def acall(self, payload: Dict[str, Any]) -> Tuple[int, str]:
+        response = await get_async_client().post(
+            self.url, json=payload, timeout=MCP_TIMEOUT_SECONDS
+        )
+        return response.status_code, response.text
+
+    async def acall_batch(self, payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+        response = await get_async_client().post(
+            self.batch_url, json=payload, timeout=_batch_timeout(payload)
+        )
+        if response.status_code >= 400:
+            raise McpTransportError(response.status_code, response.text)
+        return response.json()["results"]
+
+
+class InProcessMcpTransport:
+    """
+    Calls the MCP tool registry directly, for single-node deployments.
+
+    Token checks, tool dispatch and logging are the ones the MCP server uses;
+    only HTTP serialization and request parsing are skipped.
+    """
+
+    def __init__(self) -> None:
+        # Imported lazily so HTTP-only deployments never load the tool layer.
+        from ..services import mcp_tools
+
+        self._tools = mcp_tools
+
+    def _authorize(self, payload: Dict[str, Any]) -> str:
+        return self._tools.authorize(payload.get("token"), payload["traceId"])
+
+    def call(self, payload: Dict[str, Any]) -> Tuple[int, str]:
+        tools = self._tools
+        try:
+            token = self._authorize(payload)
+            result = tools.call_tool(
+                payload["method"], payload["params"], payload["traceId"], token
+            )
+        except tools.McpToolError as exc:
+            return exc.status_code, render_body({"detail": exc.detail})
+        return 200, render_body({"result": result})
+
+    def call_batch(self, payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+        tools = self._tools
+        try:
+            token = self._authorize(payload)
+        except tools.McpToolError as exc:
+            raise McpTransportError(exc.status_code, exc.detail)
+        results, _ = tools.run_batch(payload["calls"], payload["traceId"], token)
+        return results
+
+    async def acall(self, payload: Dict[str, Any]) -> Tuple[int, str]:
+        tools = self._tools
+        try:
+            token = self._authorize(payload)
+            result = await tools.acall_tool(
+                payload["method"], payload["params"], payload["traceId"], token
+            )
+        except tools.McpToolError as exc:
+            return exc.status_code, render_body({"detail": exc.detail})
+        return 200, render_body({"result": result})
+
+    async def acall_batch(self, payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+        tools = self._tools
+        try:
+            token = self._authorize(payload)
+        except tools.McpToolError as exc:
+            raise McpTransportError(exc.status_code, exc.detail)
+        results, _ = await tools.arun_batch(payload["calls"], payload["traceId"], token)
+        return results
+
+
+def build_transport(kind: str = MCP_TRANSPORT):
+    if kind == "inproc":
+        return InProcessMcpTransport()
+    if kind == "http":
+        return HttpMcpTransport()
+    raise ValueError(f"Unknown MCP_TRANSPORT '{kind}' (expected 'http' or 'inproc')")
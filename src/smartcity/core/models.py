@@ -1,16 +1,27 @@
 from __future__ import annotations
 
+import copy
 import json
 from enum import Enum
 from typing import Any, Dict, List, Optional
 
-from pydantic import BaseModel, ConfigDict, Field, ValidationError, model_validator
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Field,
+    PrivateAttr,
+    ValidationError,
+    model_validator,
+)
 
 
 class ActionType(str, Enum):
     GET_TRAFFIC_SIGNAL_STATE = "getTrafficSignalState"
     SET_PRIORITY_CORRIDOR = "setPriorityCorridor"
     NOTIFY_TRAFFIC_AGENTS = "notifyTrafficAgents"
+    # Many signals in one Orion round-trip (params: entity_ids).
+    GET_TRAFFIC_SIGNAL_STATES = "getTrafficSignalStates"
+    SET_PRIORITY_CORRIDORS = "setPriorityCorridors"
 
 
 class RiskLevel(str, Enum):
@@ -33,12 +44,20 @@ class MonitorEvent(BaseModel):
     crowd_level: str = Field(default="normal")
     location: str = Field(default="Avenue 1")
     notes: Optional[str] = None
+    # Entity the event was observed on; None means the configured signal.
+    entity_id: Optional[str] = None
+    # Further signals the event concerns (e.g. the rest of an ambulance route);
+    # plans then cover them and entity_id with the bulk actions.
+    corridor_signals: Optional[List[str]] = None
 
 
 class PlanStep(BaseModel):
     id: str
     action: ActionType
     params: Dict[str, Any] = Field(default_factory=dict)
+    # Ids of earlier steps this step needs. None (the default on every step)
+    # keeps strict sequential execution; [] marks a step with no prerequisites.
+    depends_on: Optional[List[str]] = None
 
     @model_validator(mode="after")
     def validate_required_params(self) -> "PlanStep":
@@ -46,6 +65,8 @@ class PlanStep(BaseModel):
             ActionType.GET_TRAFFIC_SIGNAL_STATE: {"entity_id"},
             ActionType.SET_PRIORITY_CORRIDOR: {"entity_id", "value"},
             ActionType.NOTIFY_TRAFFIC_AGENTS: {"message"},
+            ActionType.GET_TRAFFIC_SIGNAL_STATES: {"entity_ids"},
+            ActionType.SET_PRIORITY_CORRIDORS: {"entity_ids", "value"},
         }
         required_keys = required[self.action]
         missing = sorted(k for k in required_keys if k not in self.params)
@@ -53,6 +74,15 @@ class PlanStep(BaseModel):
             raise ValueError(
                 f"step '{self.id}' missing required params for '{self.action.value}': {', '.join(missing)}"
             )
+        entity_ids = self.params.get("entity_ids")
+        if "entity_ids" in required_keys and (
+            not isinstance(entity_ids, list)
+            or not entity_ids
+            or not all(isinstance(entity_id, str) for entity_id in entity_ids)
+        ):
+            raise ValueError(
+                f"step '{self.id}' needs entity_ids as a non-empty list of strings"
+            )
         return self
 
 
@@ -77,8 +107,60 @@ class CandidatePlan(BaseModel):
 
     model_config = ConfigDict(populate_by_name=True)
 
+    # Wire renderings, computed on first use. Assigning a field and
+    # `model_copy(update=...)` start from a clean cache; nested models are
+    # treated as immutable once validated.
+    _wire_dict: Optional[Dict[str, Any]] = PrivateAttr(default=None)
+    _wire_json: Optional[bytes] = PrivateAttr(default=None)
+
+    @model_validator(mode="after")
+    def validate_dependencies(self) -> "CandidatePlan":
+        if all(step.depends_on is None for step in self.steps):
+            return self
+        seen: set = set()
+        for step in self.steps:
+            if step.id in seen:
+                raise ValueError(f"duplicate step id '{step.id}'")
+            unknown = sorted(dep for dep in step.depends_on or [] if dep not in seen)
+            if unknown:
+                raise ValueError(
+                    f"step '{step.id}' depends on steps that do not precede it: {', '.join(unknown)}"
+                )
+            seen.add(step.id)
+        return self
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if name in type(self).model_fields:
+            self._wire_dict = None
+            self._wire_json = None
+
+    def wire_dict_view(self) -> Dict[str, Any]:
+        """The cached aliased dump itself, for read-only use; never mutate it."""
+        if self._wire_dict is None:
+            self._wire_dict = self.model_dump(by_alias=True)
+        return self._wire_dict
+
     def to_wire_dict(self) -> Dict[str, Any]:
-        return self.model_dump(by_alias=True)
+        """Aliased dump of the plan; a copy of the cached dump, free to mutate."""
+        return copy.deepcopy(self.wire_dict_view())
+
+    def to_wire_json(self) -> bytes:
+        """Compact JSON of `to_wire_dict()`; cached like the dict."""
+        if self._wire_json is None:
+            self._wire_json = json.dumps(
+                self.wire_dict_view(), separators=(",", ":")
+            ).encode("utf-8")
+        return self._wire_json
+
+    def model_copy(
+        self, *, update: Optional[Dict[str, Any]] = None, deep: bool = False
+    ) -> "CandidatePlan":
+        copied = super().model_copy(update=update, deep=deep)
+        if update:
+            copied._wire_dict = None
+            copied._wire_json = None
+        return copied
 
     @staticmethod
     def from_json(payload: str) -> "CandidatePlan":
@@ -100,6 +182,8 @@ class StepResult(BaseModel):
     action: ActionType
     status_code: int
     response_body: str
+    # The tool answered without writing because the target already had the value.
+    skipped: bool = False
 
 
 class ExecutionReport(BaseModel):
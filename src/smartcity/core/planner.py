@@ -1,21 +1,40 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import os
+import threading
+import time
 import uuid
-from typing import Any, Dict, Optional
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from functools import partial
+from itertools import product
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
 
 from dotenv import load_dotenv
 
 from ..infra.logging_utils import configure_logger
-from .llm_planner import generate_plan_with_llm
+from .llm_planner import (
+    LLM_BATCH_WINDOW_MS,
+    LLM_PLANNER_ENABLED,
+    LLM_STREAMING,
+    agenerate_plan_with_llm,
+    agenerate_plans_with_llm,
+    generate_plan_with_llm,
+    generate_plans_with_llm,
+    plan_micro_batcher,
+)
 from .models import (
     ActionType,
     CandidatePlan,
     MonitorEvent,
     RiskLevel,
+    Telemetry,
     validate_plan_dict,
 )
+from .policy_engine import USER_TOKEN, aprefetch_decision, prefetch_decision
 
 load_dotenv()
 
@@ -24,10 +43,70 @@ logger = configure_logger("planner")
 TRAFFIC_SIGNAL_ID = os.getenv("TRAFFIC_SIGNAL_ID", "TrafficSignal:001")
 
 
-def _risk_from_event(event: MonitorEvent) -> RiskLevel:
-    if event.flood_risk:
+def _deadline_ms(name: str, default: float) -> float:
+    value = os.getenv(name, "")
+    return float(value) if value else default
+
+
+# How long the LLM planner may take before the rule-based plan is used instead
+# (0 = wait for the LLM). Per-risk values override the global one, and the
+# emergency value applies to every event with an ambulance.
+PLANNING_DEADLINE_MS = _deadline_ms("PLANNING_DEADLINE_MS", 3000)
+PLANNING_DEADLINES_MS = {
+    RiskLevel.LOW: _deadline_ms("PLANNING_DEADLINE_MS_LOW", PLANNING_DEADLINE_MS),
+    RiskLevel.MEDIUM: _deadline_ms("PLANNING_DEADLINE_MS_MEDIUM", PLANNING_DEADLINE_MS),
+    RiskLevel.HIGH: _deadline_ms("PLANNING_DEADLINE_MS_HIGH", PLANNING_DEADLINE_MS),
+}
+PLANNING_DEADLINE_MS_EMERGENCY = _deadline_ms("PLANNING_DEADLINE_MS_EMERGENCY", 800)
+LLM_PLANNER_WORKERS = int(os.getenv("LLM_PLANNER_WORKERS", "4"))
+# Rule-based plan templates kept per cache (entities come from notifications).
+PLAN_TEMPLATE_CACHE_SIZE = int(os.getenv("PLAN_TEMPLATE_CACHE_SIZE", "1024"))
+
+_llm_pool = ThreadPoolExecutor(
+    max_workers=LLM_PLANNER_WORKERS, thread_name_prefix="llm-planner"
+)
+_prefetch_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="policy-prefetch")
+# Async policy prefetches in flight; referenced here so they run to completion.
+_prefetch_tasks: Set["asyncio.Task[None]"] = set()
+
+
+class PlanFeatures(NamedTuple):
+    """Everything the rule-based planner reads from an event."""
+
+    ambulance_detected: bool
+    heavy_rain: bool
+    flood_risk: bool
+    crowd_class: str
+    entity_id: str
+    # Further signals to cover with bulk steps, without entity_id.
+    corridor_signals: Tuple[str, ...] = ()
+
+
+def _corridor_signals(event: MonitorEvent, entity_id: str) -> Tuple[str, ...]:
+    return tuple(
+        signal
+        for signal in dict.fromkeys(event.corridor_signals or [])
+        if signal != entity_id
+    )
+
+
+def _event_features(event: MonitorEvent) -> PlanFeatures:
+    crowd_class = "high" if event.crowd_level.lower() in {"high", "dense"} else "normal"
+    entity_id = event.entity_id or TRAFFIC_SIGNAL_ID
+    return PlanFeatures(
+        ambulance_detected=event.ambulance_detected,
+        heavy_rain=event.heavy_rain,
+        flood_risk=event.flood_risk,
+        crowd_class=crowd_class,
+        entity_id=entity_id,
+        corridor_signals=_corridor_signals(event, entity_id),
+    )
+
+
+def _risk_from_features(features: PlanFeatures) -> RiskLevel:
+    if features.flood_risk:
         return RiskLevel.HIGH
-    if event.heavy_rain or event.crowd_level.lower() in {"high", "dense"}:
+    if features.heavy_rain or features.crowd_class == "high":
         return RiskLevel.MEDIUM
     return RiskLevel.LOW
 
@@ -40,80 +119,350 @@ def _approval_level(risk_level: RiskLevel) -> int:
     return 3
 
 
-def _build_rule_based_plan(event: MonitorEvent, trace_id: str) -> Dict[str, Any]:
-    risk_level = _risk_from_event(event)
-    autonomy_level = _approval_level(risk_level)
-
-    if event.ambulance_detected:
-        corridor_value = "emergency"
-        goal = "Create emergency corridor for ambulance"
-        scenario = "ambulance-only"
-        message = "Emergency corridor activated for ambulance"
-    elif event.flood_risk or event.heavy_rain:
-        corridor_value = "critical-infra"
-        goal = "Protect critical infrastructure under weather stress"
-        scenario = "flood-only"
-        message = "Weather response rerouting activated"
+class RuleDecision(NamedTuple):
+    """What the rule-based planner decides for an event; fixes the whole plan."""
+
+    risk_level: RiskLevel
+    autonomy_level: int
+    scenario: str
+    corridor_value: str
+    entity_id: str
+    corridor_signals: Tuple[str, ...] = ()
+
+
+# Goal and agent message per rule-based scenario.
+_SCENARIO_TEXT = {
+    "baseline": (
+        "Maintain normal traffic operation",
+        "Traffic remains in normal mode",
+    ),
+    "flood-only": (
+        "Protect critical infrastructure under weather stress",
+        "Weather response rerouting activated",
+    ),
+    "ambulance-only": (
+        "Create emergency corridor for ambulance",
+        "Emergency corridor activated for ambulance",
+    ),
+    "combined-flood-corridor": (
+        "Coordinate emergency corridor with weather risk mitigation",
+        "Combined emergency and weather protocol activated",
+    ),
+}
+
+
+def _rule_decision(features: PlanFeatures) -> RuleDecision:
+    risk_level = _risk_from_features(features)
+    weather = features.flood_risk or features.heavy_rain
+
+    if features.ambulance_detected and weather:
+        scenario, corridor_value = "combined-flood-corridor", "emergency"
+    elif features.ambulance_detected:
+        scenario, corridor_value = "ambulance-only", "emergency"
+    elif weather:
+        scenario, corridor_value = "flood-only", "critical-infra"
     else:
-        corridor_value = "none"
-        goal = "Maintain normal traffic operation"
-        scenario = "baseline"
-        message = "Traffic remains in normal mode"
+        scenario, corridor_value = "baseline", "none"
 
-    if event.ambulance_detected and (event.heavy_rain or event.flood_risk):
-        scenario = "combined-flood-corridor"
-        goal = "Coordinate emergency corridor with weather risk mitigation"
-        corridor_value = "emergency"
-        message = "Combined emergency and weather protocol activated"
+    return RuleDecision(
+        risk_level=risk_level,
+        autonomy_level=_approval_level(risk_level),
+        scenario=scenario,
+        corridor_value=corridor_value,
+        entity_id=features.entity_id,
+        corridor_signals=features.corridor_signals,
+    )
 
-    steps = [
+
+def _rule_based_plan_data(
+    features: PlanFeatures, plan_id: str, trace_id: str
+) -> Dict[str, Any]:
+    return _decision_plan_data(_rule_decision(features), plan_id, trace_id)
+
+
+def _signal_steps(decision: RuleDecision) -> List[Dict[str, Any]]:
+    """Read and set the decision's signal, or all its signals in bulk."""
+    if decision.corridor_signals:
+        entity_ids = [decision.entity_id, *decision.corridor_signals]
+        return [
+            {
+                "id": "read-state",
+                "action": ActionType.GET_TRAFFIC_SIGNAL_STATES.value,
+                "params": {"entity_ids": entity_ids},
+                "depends_on": [],
+            },
+            {
+                "id": "set-priority",
+                "action": ActionType.SET_PRIORITY_CORRIDORS.value,
+                "params": {
+                    "entity_ids": entity_ids,
+                    "value": decision.corridor_value,
+                },
+                "depends_on": ["read-state"],
+            },
+        ]
+    return [
         {
             "id": "read-state",
             "action": ActionType.GET_TRAFFIC_SIGNAL_STATE.value,
-            "params": {"entity_id": TRAFFIC_SIGNAL_ID},
+            "params": {"entity_id": decision.entity_id},
+            "depends_on": [],
         },
         {
             "id": "set-priority",
             "action": ActionType.SET_PRIORITY_CORRIDOR.value,
-            "params": {"entity_id": TRAFFIC_SIGNAL_ID, "value": corridor_value},
+            "params": {
+                "entity_id": decision.entity_id,
+                "value": decision.corridor_value,
+            },
+            "depends_on": ["read-state"],
         },
+    ]
+
+
+def _decision_plan_data(
+    decision: RuleDecision, plan_id: str, trace_id: str
+) -> Dict[str, Any]:
+    goal, message = _SCENARIO_TEXT[decision.scenario]
+    steps = [
+        *_signal_steps(decision),
         {
             "id": "notify",
             "action": ActionType.NOTIFY_TRAFFIC_AGENTS.value,
             "params": {"message": message},
+            "depends_on": ["set-priority"],
         },
     ]
 
     return {
-        "plan_id": str(uuid.uuid4()),
+        "plan_id": plan_id,
         "goal": goal,
-        "scenario": scenario,
-        "risk_level": risk_level.value,
+        "scenario": decision.scenario,
+        "risk_level": decision.risk_level.value,
         "steps": steps,
-        "approval": {"autonomy_level": autonomy_level},
+        "approval": {"autonomy_level": decision.autonomy_level},
         "telemetry": {"traceId": trace_id},
     }
 
 
+def _build_rule_based_plan(event: MonitorEvent, trace_id: str) -> Dict[str, Any]:
+    return _rule_based_plan_data(_event_features(event), str(uuid.uuid4()), trace_id)
+
+
+class _TemplateCache:
+    """
+    LRU map of plan templates. Keys carry entity ids from notifications, so
+    the size is bounded. Safe to share across threads.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Any, CandidatePlan]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Optional[CandidatePlan]:
+        with self._lock:
+            template = self._entries.get(key)
+            if template is not None:
+                self._entries.move_to_end(key)
+            return template
+
+    def put(self, key: Any, template: CandidatePlan) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = template
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+# Validated rule-based plans, one per decision, and the template for each
+# feature tuple seen. Per call only plan_id and traceId differ, so plans are
+# stamped from these templates instead of being rebuilt and re-validated.
+# Templates for the configured signal are built at import; other entities are
+# added on first use.
+_DECISION_TEMPLATES = _TemplateCache(PLAN_TEMPLATE_CACHE_SIZE)
+_RULE_BASED_TEMPLATES = _TemplateCache(PLAN_TEMPLATE_CACHE_SIZE)
+
+
+def _decision_template(decision: RuleDecision) -> CandidatePlan:
+    template = _DECISION_TEMPLATES.get(decision)
+    if template is None:
+        template = validate_plan_dict(
+            _decision_plan_data(decision, "template", "template")
+        )
+        _DECISION_TEMPLATES.put(decision, template)
+    return template
+
+
+def _rule_based_template(features: PlanFeatures) -> CandidatePlan:
+    template = _RULE_BASED_TEMPLATES.get(features)
+    if template is None:
+        template = _decision_template(_rule_decision(features))
+        _RULE_BASED_TEMPLATES.put(features, template)
+    return template
+
+
+for _features in product(
+    (False, True),
+    (False, True),
+    (False, True),
+    ("normal", "high"),
+    (TRAFFIC_SIGNAL_ID,),
+):
+    _rule_based_template(PlanFeatures(*_features))
+
+
+def _stamp_plan(
+    template: CandidatePlan, trace_id: str, plan_id: Optional[str] = None
+) -> CandidatePlan:
+    # Shallow copy: steps are shared with the template, and plans are not
+    # mutated after validation.
+    return template.model_copy(
+        update={
+            "plan_id": plan_id or str(uuid.uuid4()),
+            "telemetry": Telemetry(traceId=trace_id),
+        }
+    )
+
+
+def _stamp_rule_based_plan(features: PlanFeatures, trace_id: str) -> CandidatePlan:
+    return _stamp_plan(_rule_based_template(features), trace_id)
+
+
+def _rule_based_plan(event: MonitorEvent, trace_id: str) -> CandidatePlan:
+    return _stamp_rule_based_plan(_event_features(event), trace_id)
+
+
+def _rule_based_plans(
+    events: Sequence[MonitorEvent], trace_ids: Sequence[str]
+) -> List[CandidatePlan]:
+    """
+    Rule-based plans for a batch of events, in input order. Each is stamped
+    from the validated template for its decision, as `_rule_based_plan` does.
+    """
+    return [
+        _rule_based_plan(event, trace_id) for event, trace_id in zip(events, trace_ids)
+    ]
+
+
+def _planning_deadline_ms(features: PlanFeatures) -> float:
+    if features.ambulance_detected:
+        return PLANNING_DEADLINE_MS_EMERGENCY
+    return PLANNING_DEADLINES_MS[_risk_from_features(features)]
+
+
+# Scheduling classes of monitor events, most urgent first.
+PRIORITY_CLASSES = ("emergency", "high", "medium", "low")
+
+
+def event_priority(event: MonitorEvent) -> str:
+    """Scheduling class: emergency with an ambulance, otherwise the risk level."""
+    features = _event_features(event)
+    if features.ambulance_detected:
+        return "emergency"
+    return _risk_from_features(features).value
+
+
+def events_priority(events: Sequence[MonitorEvent]) -> str:
+    """The most urgent class among `events` (low when there are none)."""
+    return min(
+        (event_priority(event) for event in events),
+        key=PRIORITY_CLASSES.index,
+        default=PRIORITY_CLASSES[-1],
+    )
+
+
+def _probe_plan(rule_plan: CandidatePlan, risk_level: str) -> Optional[CandidatePlan]:
+    """The rule-based plan carrying a streamed risk level, for policy prefetch."""
+    try:
+        return rule_plan.model_copy(update={"risk_level": RiskLevel(risk_level)})
+    except ValueError:
+        return None
+
+
+def _prefetch_policy(rule_plan: CandidatePlan, trace_id: str, risk_level: str) -> None:
+    probe = _probe_plan(rule_plan, risk_level)
+    if probe is not None:
+        _prefetch_pool.submit(prefetch_decision, probe, USER_TOKEN, trace_id)
+
+
+def _aprefetch_policy(rule_plan: CandidatePlan, trace_id: str, risk_level: str) -> None:
+    probe = _probe_plan(rule_plan, risk_level)
+    if probe is not None:
+        task = asyncio.get_running_loop().create_task(
+            aprefetch_decision(probe, USER_TOKEN, trace_id)
+        )
+        _prefetch_tasks.add(task)
+        task.add_done_callback(_prefetch_tasks.discard)
+
+
 def _llm_planner_payload(
-    event: MonitorEvent, trace_id: str
+    event: MonitorEvent,
+    trace_id: str,
+    rule_plan: Optional[CandidatePlan] = None,
 ) -> Optional[Dict[str, Any]]:
     """
     Generate plan using LLM planner with LangChain.
     """
 
+    # With streaming, the policy decision for the streamed risk level is
+    # fetched while the rest of the plan is still arriving.
+    on_risk_level = (
+        partial(_prefetch_policy, rule_plan, trace_id)
+        if LLM_STREAMING and rule_plan is not None
+        else None
+    )
     # Use LangChain-based LLM planner
-    llm_plan = generate_plan_with_llm(event, trace_id)
+    llm_plan = generate_plan_with_llm(event, trace_id, on_risk_level)
     if llm_plan:
         return llm_plan
 
     return None
 
 
-def build_candidate_plan(event: MonitorEvent, trace_id: str) -> CandidatePlan:
-    llm_payload = _llm_planner_payload(event, trace_id)
-    plan_data = llm_payload if llm_payload else _build_rule_based_plan(event, trace_id)
-    plan = validate_plan_dict(plan_data)
+async def _allm_planner_payload(
+    event: MonitorEvent,
+    trace_id: str,
+    rule_plan: Optional[CandidatePlan] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Async variant of `_llm_planner_payload`. Without streaming, events arriving
+    together are micro-batched into one concurrent LLM batch unless
+    LLM_BATCH_WINDOW_MS is 0.
+    """
+    if LLM_STREAMING:
+        on_risk_level = (
+            partial(_aprefetch_policy, rule_plan, trace_id)
+            if rule_plan is not None
+            else None
+        )
+        llm_plan = await agenerate_plan_with_llm(event, trace_id, on_risk_level)
+    elif LLM_BATCH_WINDOW_MS > 0:
+        llm_plan = await plan_micro_batcher().plan(event, trace_id)
+    else:
+        llm_plan = await agenerate_plan_with_llm(event, trace_id)
+    if llm_plan:
+        return llm_plan
+
+    return None
+
+
+def _finalize_plan(
+    event: MonitorEvent,
+    trace_id: str,
+    llm_payload: Optional[Dict[str, Any]],
+    rule_plan: Optional[CandidatePlan] = None,
+) -> CandidatePlan:
+    if llm_payload:
+        plan = validate_plan_dict(llm_payload)
+    else:
+        plan = rule_plan or _rule_based_plan(event, trace_id)
     logger.info(
         "Candidate plan generated",
         extra={
@@ -129,6 +478,177 @@ def build_candidate_plan(event: MonitorEvent, trace_id: str) -> CandidatePlan:
     return plan
 
 
+def _log_planner_race(
+    trace_id: str,
+    llm_payload: Optional[Dict[str, Any]],
+    deadline_ms: float,
+    llm_ms: Optional[float],
+) -> None:
+    """
+    Log which planner's plan is used. `margin_ms` is how far inside the deadline
+    the LLM finished; it is None when the deadline passed first.
+    """
+    if llm_ms is None:
+        outcome = "deadline-exceeded"
+    elif llm_payload:
+        outcome = "llm-in-budget"
+    else:
+        outcome = "llm-failed"
+    logger.info(
+        "Planner race decided",
+        extra={
+            "traceId": trace_id,
+            "extra_fields": {
+                "winner": "llm" if llm_payload else "rule-based",
+                "outcome": outcome,
+                "deadline_ms": deadline_ms,
+                "llm_ms": None if llm_ms is None else round(llm_ms, 3),
+                "margin_ms": (
+                    round(deadline_ms - llm_ms, 3)
+                    if llm_ms is not None and deadline_ms > 0
+                    else None
+                ),
+            },
+        },
+    )
+
+
+def _log_late_llm_plan(
+    trace_id: str, started: float, deadline_ms: float, future: Future
+) -> None:
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    logger.info(
+        "Late LLM plan ignored",
+        extra={
+            "traceId": trace_id,
+            "extra_fields": {
+                "llm_ms": round(elapsed_ms, 3),
+                "overrun_ms": round(elapsed_ms - deadline_ms, 3),
+                "produced_plan": future.exception() is None and bool(future.result()),
+            },
+        },
+    )
+
+
+def build_candidate_plan(event: MonitorEvent, trace_id: str) -> CandidatePlan:
+    """
+    Plan an event. With the LLM planner enabled, the rule-based plan is built
+    up front and the LLM gets the event's planning deadline; whichever valid
+    plan is available when the LLM returns or the deadline passes is used.
+    """
+    if not LLM_PLANNER_ENABLED:
+        return _finalize_plan(event, trace_id, None)
+
+    features = _event_features(event)
+    rule_plan = _stamp_rule_based_plan(features, trace_id)
+    deadline_ms = _planning_deadline_ms(features)
+
+    started = time.perf_counter()
+    future = _llm_pool.submit(_llm_planner_payload, event, trace_id, rule_plan)
+    llm_ms: Optional[float] = None
+    try:
+        llm_payload = future.result(
+            timeout=deadline_ms / 1000 if deadline_ms > 0 else None
+        )
+        llm_ms = (time.perf_counter() - started) * 1000
+    except FutureTimeoutError:
+        # A running call cannot be interrupted; its result is only logged.
+        if not future.cancel():
+            future.add_done_callback(
+                lambda done: _log_late_llm_plan(trace_id, started, deadline_ms, done)
+            )
+        llm_payload = None
+
+    _log_planner_race(trace_id, llm_payload, deadline_ms, llm_ms)
+    return _finalize_plan(event, trace_id, llm_payload, rule_plan)
+
+
+async def abuild_candidate_plan(event: MonitorEvent, trace_id: str) -> CandidatePlan:
+    """Async `build_candidate_plan`; the LLM call is cancelled at the deadline."""
+    if not LLM_PLANNER_ENABLED:
+        return _finalize_plan(event, trace_id, None)
+
+    features = _event_features(event)
+    rule_plan = _stamp_rule_based_plan(features, trace_id)
+    deadline_ms = _planning_deadline_ms(features)
+
+    started = time.perf_counter()
+    llm_ms: Optional[float] = None
+    try:
+        llm_payload = await asyncio.wait_for(
+            _allm_planner_payload(event, trace_id, rule_plan),
+            timeout=deadline_ms / 1000 if deadline_ms > 0 else None,
+        )
+        llm_ms = (time.perf_counter() - started) * 1000
+    except asyncio.TimeoutError:
+        llm_payload = None
+
+    _log_planner_race(trace_id, llm_payload, deadline_ms, llm_ms)
+    return _finalize_plan(event, trace_id, llm_payload, rule_plan)
+
+
+def _batch_trace_ids(
+    events: Sequence[MonitorEvent], trace_ids: Optional[Sequence[str]]
+) -> Sequence[str]:
+    if trace_ids is None:
+        return [str(uuid.uuid4()) for _ in events]
+    if len(events) != len(trace_ids):
+        raise ValueError("build_candidate_plans needs one trace id per event")
+    return trace_ids
+
+
+def _finalize_plans(
+    events: Sequence[MonitorEvent],
+    trace_ids: Sequence[str],
+    llm_payloads: Sequence[Optional[Dict[str, Any]]],
+) -> List[CandidatePlan]:
+    fallback = [index for index, payload in enumerate(llm_payloads) if not payload]
+    rule_plans = dict(
+        zip(
+            fallback,
+            _rule_based_plans(
+                [events[index] for index in fallback],
+                [trace_ids[index] for index in fallback],
+            ),
+        )
+    )
+    return [
+        _finalize_plan(event, trace_id, llm_payload, rule_plans.get(index))
+        for index, (event, trace_id, llm_payload) in enumerate(
+            zip(events, trace_ids, llm_payloads)
+        )
+    ]
+
+
+def build_candidate_plans(
+    events: Sequence[MonitorEvent], trace_ids: Optional[Sequence[str]] = None
+) -> List[CandidatePlan]:
+    """
+    Plan a batch of events, returning plans in input order. With the LLM
+    planner enabled the events go to the LLM in one concurrent batch; every
+    event it does not plan gets its rule-based plan, computed for all of them
+    at once. Without `trace_ids`, each event gets a fresh one.
+    """
+    trace_ids = _batch_trace_ids(events, trace_ids)
+    if LLM_PLANNER_ENABLED:
+        llm_payloads = generate_plans_with_llm(events, trace_ids)
+    else:
+        llm_payloads = [None] * len(events)
+    return _finalize_plans(events, trace_ids, llm_payloads)
+
+
+async def abuild_candidate_plans(
+    events: Sequence[MonitorEvent], trace_ids: Optional[Sequence[str]] = None
+) -> List[CandidatePlan]:
+    """Async `build_candidate_plans`."""
+    trace_ids = _batch_trace_ids(events, trace_ids)
+    if LLM_PLANNER_ENABLED:
+        llm_payloads = await agenerate_plans_with_llm(events, trace_ids)
+    else:
+        llm_payloads = [None] * len(events)
+    return _finalize_plans(events, trace_ids, llm_payloads)
+
+
 def malformed_plan_fixture(trace_id: str) -> Dict[str, Any]:
     """
     Malformed plan fixture is designed to test the robustness of the plan validation and execution system.
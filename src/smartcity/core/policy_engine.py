@@ -2,14 +2,22 @@
 
 from __future__ import annotations
 
+import hashlib
+import json
 import os
-from typing import Any, Dict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 
+import httpx
 import requests
 from dotenv import load_dotenv
 
+from ..infra.http_pool import get_async_client, get_session
 from ..infra.logging_utils import configure_logger
+from .circuit_breaker import CircuitBreaker
+from .decision_cache import DecisionCache
 from .models import ApprovalMode, CandidatePlan, PolicyDecision, RiskLevel
+from .rego_evaluator import RegoPolicy, load_policy
 
 load_dotenv()
 
@@ -19,7 +27,25 @@ USER_TOKEN = os.getenv("USER_TOKEN", "user-token")
 HUMAN_APPROVAL_TOKEN = os.getenv("HUMAN_APPROVAL_TOKEN", "human-approval-token")
 OPA_URL = os.getenv("OPA_URL", "").strip()
 OPA_POLICY_PATH = os.getenv("OPA_POLICY_PATH", "v1/data/smartcity/allow")
+OPA_BATCH_POLICY_PATH = os.getenv(
+    "OPA_BATCH_POLICY_PATH", "v1/data/smartcity/allow_batch"
+)
 OPA_TIMEOUT_SECONDS = float(os.getenv("OPA_TIMEOUT_SECONDS", "1.5"))
+# "opa": query OPA_URL (fallback rules if unset/unreachable); "embedded": evaluate
+# POLICY_REGO_PATH in-process; "fallback": deterministic local rules only.
+POLICY_BACKEND = os.getenv("POLICY_BACKEND", "opa").lower()
+POLICY_REGO_PATH = os.getenv("POLICY_REGO_PATH", "policies/traffic_policy.rego")
+OPA_BREAKER_FAILURE_THRESHOLD = int(os.getenv("OPA_BREAKER_FAILURE_THRESHOLD", "3"))
+OPA_BREAKER_COOLDOWN_SECONDS = float(os.getenv("OPA_BREAKER_COOLDOWN_SECONDS", "30"))
+OPA_BREAKER_PROBE_INTERVAL_SECONDS = float(
+    os.getenv("OPA_BREAKER_PROBE_INTERVAL_SECONDS", "5")
+)
+POLICY_CACHE_ENABLED = os.getenv("POLICY_CACHE_ENABLED", "true").lower() == "true"
+POLICY_CACHE_TTL_SECONDS = float(os.getenv("POLICY_CACHE_TTL_SECONDS", "30"))
+POLICY_CACHE_MAX_SIZE = int(os.getenv("POLICY_CACHE_MAX_SIZE", "256"))
+
+_decision_cache = DecisionCache(POLICY_CACHE_MAX_SIZE, POLICY_CACHE_TTL_SECONDS)
+_embedded_policy: Optional[RegoPolicy] = None
 
 
 def _color_for_mode(mode: ApprovalMode) -> str:
@@ -68,25 +94,58 @@ def _fallback_policy(plan: CandidatePlan, provided_token: str) -> PolicyDecision
     )
 
 
-def _opa_policy(
-    plan: CandidatePlan, provided_token: str, trace_id: str
-) -> PolicyDecision:
-    if not OPA_URL:
-        raise RuntimeError("OPA_URL not configured")
+def _policy_input(plan: CandidatePlan, provided_token: str) -> Dict[str, Any]:
+    # The evaluators only read the input, so the plan's cached dump is shared.
+    return {
+        "plan": plan.wire_dict_view(),
+        "token": provided_token,
+        "expected_user_token": USER_TOKEN,
+        "expected_human_token": HUMAN_APPROVAL_TOKEN,
+    }
 
-    url = f"{OPA_URL.rstrip('/')}/{OPA_POLICY_PATH.lstrip('/')}"
-    payload = {
-        "input": {
-            "plan": plan.to_wire_dict(),
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def _opa_input_json(plan: CandidatePlan, provided_token: str) -> bytes:
+    """JSON `input` document; the plan is spliced in from its cached wire JSON."""
+    tokens = json.dumps(
+        {
             "token": provided_token,
             "expected_user_token": USER_TOKEN,
             "expected_human_token": HUMAN_APPROVAL_TOKEN,
-        }
-    }
-    response = requests.post(url, json=payload, timeout=OPA_TIMEOUT_SECONDS)
-    response.raise_for_status()
-    result = response.json().get("result", {})
+        },
+        separators=(",", ":"),
+    ).encode("utf-8")
+    return b'{"plan":' + plan.to_wire_json() + b"," + tokens[1:]
+
+
+def _opa_body(plan: CandidatePlan, provided_token: str) -> bytes:
+    return b'{"input":' + _opa_input_json(plan, provided_token) + b"}"
+
+
+def _opa_batch_request(
+    plans: Sequence[CandidatePlan], provided_token: str
+) -> Tuple[str, bytes]:
+    if not OPA_URL:
+        raise RuntimeError("OPA_URL not configured")
+
+    url = f"{OPA_URL.rstrip('/')}/{OPA_BATCH_POLICY_PATH.lstrip('/')}"
+    items = b",".join(_opa_input_json(plan, provided_token) for plan in plans)
+    return url, b'{"input":{"items":[' + items + b"]}}"
 
+
+def _opa_request(plan: CandidatePlan, provided_token: str) -> Tuple[str, bytes]:
+    if not OPA_URL:
+        raise RuntimeError("OPA_URL not configured")
+
+    url = f"{OPA_URL.rstrip('/')}/{OPA_POLICY_PATH.lstrip('/')}"
+    return url, _opa_body(plan, provided_token)
+
+
+def _decision_from_opa(
+    result: Dict[str, Any], plan: CandidatePlan, source: str = "opa"
+) -> PolicyDecision:
     mode_raw = result.get("approval_mode", ApprovalMode.DENY.value)
     mode = ApprovalMode(mode_raw)
     return PolicyDecision(
@@ -95,29 +154,459 @@ def _opa_policy(
         approval_mode=mode,
         verdict_color=result.get("verdict_color", _color_for_mode(mode)),
         reason=result.get("reason", "Policy decision returned by OPA"),
-        source="opa",
+        source=source,
     )
 
 
-def evaluate_plan(
-    plan: Dict[str, Any], provided_token: str, trace_id: str
+def _resolve_rego_path(configured_path: str) -> Path:
+    direct = Path(configured_path)
+    if direct.is_absolute() or direct.exists():
+        return direct
+    return Path(__file__).resolve().parents[3] / configured_path
+
+
+def _load_embedded_policy() -> RegoPolicy:
+    global _embedded_policy
+    path = _resolve_rego_path(POLICY_REGO_PATH)
+    policy = load_policy(str(path))
+    _embedded_policy = policy
+    logger.info(
+        "Embedded policy loaded",
+        extra={
+            "extra_fields": {
+                "path": str(path),
+                "package": policy.package,
+                "rules": {name: len(rows) for name, rows in policy.tables.items()},
+                "unsupported_rules": sorted(policy.unsupported),
+            }
+        },
+    )
+    return policy
+
+
+def _embedded_policy_decision(
+    plan: CandidatePlan, provided_token: str
 ) -> PolicyDecision:
-    validated_plan = CandidatePlan.model_validate(plan)
+    policy = _embedded_policy or _load_embedded_policy()
+    rule = OPA_POLICY_PATH.rstrip("/").rsplit("/", 1)[-1]
+    result = policy.evaluate(rule, _policy_input(plan, provided_token))
+    if not isinstance(result, dict):
+        raise RuntimeError(f"Embedded policy rule '{rule}' is undefined")
+    return _decision_from_opa(result, plan, source="embedded")
 
+
+def reload_policies() -> None:
+    """Reload the embedded Rego policy (if in use) and drop cached decisions."""
+    if POLICY_BACKEND == "embedded":
+        _load_embedded_policy()
+    invalidate_decision_cache("policy reload")
+
+
+def _opa_healthy() -> bool:
+    response = get_session().get(
+        f"{OPA_URL.rstrip('/')}/health", timeout=OPA_TIMEOUT_SECONDS
+    )
+    return response.status_code == 200
+
+
+_opa_breaker = CircuitBreaker(
+    "opa",
+    failure_threshold=OPA_BREAKER_FAILURE_THRESHOLD,
+    cooldown_seconds=OPA_BREAKER_COOLDOWN_SECONDS,
+    logger=logger,
+    health_check=_opa_healthy,
+    probe_interval_seconds=OPA_BREAKER_PROBE_INTERVAL_SECONDS,
+)
+
+
+def opa_breaker_stats() -> Dict[str, Any]:
+    return _opa_breaker.stats()
+
+
+def _is_opa_outage(exc: Exception) -> bool:
+    """
+    Whether `exc` means OPA is unreachable or broken: connection errors,
+    timeouts and 5xx responses other than policy evaluation errors (OPA
+    reports those, e.g. a rule conflict, with an `eval_*` error code).
+    """
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(exc, httpx.TransportError):
+        return True
+    if isinstance(exc, (requests.HTTPError, httpx.HTTPStatusError)):
+        response = exc.response
+        return (
+            response is not None
+            and response.status_code >= 500
+            and "eval_" not in response.text
+        )
+    return False
+
+
+def _record_opa_error(exc: Exception) -> None:
+    if _is_opa_outage(exc):
+        _opa_breaker.record_failure(str(exc))
+
+
+def _opa_policy(
+    plan: CandidatePlan, provided_token: str, trace_id: str
+) -> PolicyDecision:
+    url, body = _opa_request(plan, provided_token)
+    trial = _opa_breaker.before_call()
     try:
-        decision = _opa_policy(validated_plan, provided_token, trace_id)
-    except Exception as exc:  # pragma: no cover - network path
-        logger.warning(
-            "OPA unavailable, using fallback policy",
-            extra={
-                "traceId": trace_id,
-                "extra_fields": {"error": str(exc)},
-            },
+        response = get_session().post(
+            url, data=body, headers=_JSON_HEADERS, timeout=OPA_TIMEOUT_SECONDS
+        )
+        response.raise_for_status()
+        decision = _decision_from_opa(response.json().get("result", {}), plan)
+    except Exception as exc:
+        _record_opa_error(exc)
+        raise
+    else:
+        _opa_breaker.record_success()
+    finally:
+        _opa_breaker.release(trial)
+    return decision
+
+
+async def _aopa_policy(
+    plan: CandidatePlan, provided_token: str, trace_id: str
+) -> PolicyDecision:
+    url, body = _opa_request(plan, provided_token)
+    trial = _opa_breaker.before_call()
+    try:
+        response = await get_async_client().post(
+            url, content=body, headers=_JSON_HEADERS, timeout=OPA_TIMEOUT_SECONDS
+        )
+        response.raise_for_status()
+        decision = _decision_from_opa(response.json().get("result", {}), plan)
+    except Exception as exc:
+        _record_opa_error(exc)
+        raise
+    else:
+        _opa_breaker.record_success()
+    finally:
+        _opa_breaker.release(trial)
+    return decision
+
+
+def _batch_decisions(
+    response_json: Dict[str, Any], plans: Sequence[CandidatePlan]
+) -> List[PolicyDecision]:
+    results = response_json.get("result")
+    if not isinstance(results, list) or len(results) != len(plans):
+        raise RuntimeError("OPA batch result does not match the submitted plans")
+    return [_decision_from_opa(result, plan) for result, plan in zip(results, plans)]
+
+
+def _opa_batch_policy(
+    plans: Sequence[CandidatePlan], provided_token: str
+) -> List[PolicyDecision]:
+    url, body = _opa_batch_request(plans, provided_token)
+    trial = _opa_breaker.before_call()
+    try:
+        response = get_session().post(
+            url, data=body, headers=_JSON_HEADERS, timeout=OPA_TIMEOUT_SECONDS
+        )
+        response.raise_for_status()
+        decisions = _batch_decisions(response.json(), plans)
+    except Exception as exc:
+        _record_opa_error(exc)
+        raise
+    else:
+        _opa_breaker.record_success()
+    finally:
+        _opa_breaker.release(trial)
+    return decisions
+
+
+async def _aopa_batch_policy(
+    plans: Sequence[CandidatePlan], provided_token: str
+) -> List[PolicyDecision]:
+    url, body = _opa_batch_request(plans, provided_token)
+    trial = _opa_breaker.before_call()
+    try:
+        response = await get_async_client().post(
+            url, content=body, headers=_JSON_HEADERS, timeout=OPA_TIMEOUT_SECONDS
+        )
+        response.raise_for_status()
+        decisions = _batch_decisions(response.json(), plans)
+    except Exception as exc:
+        _record_opa_error(exc)
+        raise
+    else:
+        _opa_breaker.record_success()
+    finally:
+        _opa_breaker.release(trial)
+    return decisions
+
+
+def _policy_unavailable(
+    plan: CandidatePlan, provided_token: str, trace_id: str, exc: Exception
+) -> PolicyDecision:
+    backend = "Embedded policy" if POLICY_BACKEND == "embedded" else "OPA"
+    logger.warning(
+        f"{backend} unavailable, using fallback policy",
+        extra={
+            "traceId": trace_id,
+            "extra_fields": {"error": str(exc)},
+        },
+    )
+    return _fallback_policy(plan, provided_token)
+
+
+def _decision_cache_key(plan: CandidatePlan, provided_token: str) -> str:
+    """Digest of exactly the inputs traffic_policy.rego reads."""
+    fields = [
+        plan.risk_level.value.lower(),
+        provided_token == USER_TOKEN,
+        plan.approval.human_token == HUMAN_APPROVAL_TOKEN,
+    ]
+    return hashlib.sha256(json.dumps(fields).encode("utf-8")).hexdigest()
+
+
+def _cached_decision(
+    plan: CandidatePlan, provided_token: str
+) -> Optional[PolicyDecision]:
+    if not (POLICY_CACHE_ENABLED and OPA_URL):
+        return None
+    return _decision_cache.get(_decision_cache_key(plan, provided_token))
+
+
+def _remember_decision(
+    plan: CandidatePlan, provided_token: str, decision: PolicyDecision
+) -> None:
+    if POLICY_CACHE_ENABLED:
+        _decision_cache.put(
+            _decision_cache_key(plan, provided_token),
+            decision.model_copy(update={"source": "opa-cache"}),
         )
-        decision = _fallback_policy(validated_plan, provided_token)
 
+
+def invalidate_decision_cache(reason: str = "policy reload") -> None:
+    """Drop every cached decision; call whenever the policies are reloaded."""
+    _decision_cache.invalidate()
+    logger.info(
+        "Policy decision cache invalidated",
+        extra={"extra_fields": {"reason": reason}},
+    )
+
+
+def decision_cache_stats() -> Dict[str, int]:
+    return _decision_cache.stats()
+
+
+def _log_decision(decision: PolicyDecision, trace_id: str) -> PolicyDecision:
     logger.info(
         "Policy evaluated",
         extra={"traceId": trace_id, "extra_fields": decision.model_dump()},
     )
     return decision
+
+
+def _evaluate_with_backend(
+    plan: CandidatePlan, provided_token: str, trace_id: str
+) -> PolicyDecision:
+    if POLICY_BACKEND == "embedded":
+        return _embedded_policy_decision(plan, provided_token)
+    if POLICY_BACKEND == "fallback":
+        return _fallback_policy(plan, provided_token)
+
+    decision = _cached_decision(plan, provided_token)
+    if decision is None:
+        decision = _opa_policy(plan, provided_token, trace_id)
+        _remember_decision(plan, provided_token, decision)
+    return decision
+
+
+async def _aevaluate_with_backend(
+    plan: CandidatePlan, provided_token: str, trace_id: str
+) -> PolicyDecision:
+    if POLICY_BACKEND != "opa":
+        return _evaluate_with_backend(plan, provided_token, trace_id)
+
+    decision = _cached_decision(plan, provided_token)
+    if decision is None:
+        decision = await _aopa_policy(plan, provided_token, trace_id)
+        _remember_decision(plan, provided_token, decision)
+    return decision
+
+
+def _as_plan(plan: Union[CandidatePlan, Dict[str, Any]]) -> CandidatePlan:
+    # A CandidatePlan instance was validated when it was built; only raw dicts
+    # (e.g. from outside the planner) need validating here.
+    if isinstance(plan, CandidatePlan):
+        return plan
+    return CandidatePlan.model_validate(plan)
+
+
+def prefetch_decision(plan: CandidatePlan, provided_token: str, trace_id: str) -> None:
+    """
+    Fill the decision cache for this plan's policy inputs ahead of
+    `evaluate_plan`, e.g. from a partially streamed plan. Only the OPA backend
+    with the cache enabled benefits; failures are left for `evaluate_plan`.
+    """
+    if POLICY_BACKEND != "opa" or not (POLICY_CACHE_ENABLED and OPA_URL):
+        return
+    if _decision_cache.peek(_decision_cache_key(plan, provided_token)):
+        return
+    try:
+        decision = _opa_policy(plan, provided_token, trace_id)
+    except Exception as exc:
+        logger.debug(
+            "Policy prefetch failed",
+            extra={"traceId": trace_id, "extra_fields": {"error": str(exc)}},
+        )
+        return
+    _remember_decision(plan, provided_token, decision)
+
+
+async def aprefetch_decision(
+    plan: CandidatePlan, provided_token: str, trace_id: str
+) -> None:
+    """Async `prefetch_decision`."""
+    if POLICY_BACKEND != "opa" or not (POLICY_CACHE_ENABLED and OPA_URL):
+        return
+    if _decision_cache.peek(_decision_cache_key(plan, provided_token)):
+        return
+    try:
+        decision = await _aopa_policy(plan, provided_token, trace_id)
+    except Exception as exc:
+        logger.debug(
+            "Policy prefetch failed",
+            extra={"traceId": trace_id, "extra_fields": {"error": str(exc)}},
+        )
+        return
+    _remember_decision(plan, provided_token, decision)
+
+
+def evaluate_plan(
+    plan: Union[CandidatePlan, Dict[str, Any]], provided_token: str, trace_id: str
+) -> PolicyDecision:
+    validated_plan = _as_plan(plan)
+
+    try:
+        decision = _evaluate_with_backend(validated_plan, provided_token, trace_id)
+    except Exception as exc:  # pragma: no cover - network path
+        decision = _policy_unavailable(validated_plan, provided_token, trace_id, exc)
+
+    return _log_decision(decision, trace_id)
+
+
+async def aevaluate_plan(
+    plan: Union[CandidatePlan, Dict[str, Any]], provided_token: str, trace_id: str
+) -> PolicyDecision:
+    """Async `evaluate_plan`: the OPA query runs on the event loop."""
+    validated_plan = _as_plan(plan)
+
+    try:
+        decision = await _aevaluate_with_backend(
+            validated_plan, provided_token, trace_id
+        )
+    except Exception as exc:  # pragma: no cover - network path
+        decision = _policy_unavailable(validated_plan, provided_token, trace_id, exc)
+
+    return _log_decision(decision, trace_id)
+
+
+def _batch_plans(
+    plans: Sequence[Union[CandidatePlan, Dict[str, Any]]], trace_ids: Sequence[str]
+) -> List[CandidatePlan]:
+    if len(plans) != len(trace_ids):
+        raise ValueError("evaluate_plans needs exactly one trace id per plan")
+    return [_as_plan(plan) for plan in plans]
+
+
+def _batch_fallback_warning(count: int, exc: Exception) -> None:
+    logger.warning(
+        "OPA batch query failed, evaluating plans individually",
+        extra={"extra_fields": {"plans": count, "error": str(exc)}},
+    )
+
+
+def evaluate_plans(
+    plans: Sequence[Union[CandidatePlan, Dict[str, Any]]],
+    provided_token: str,
+    trace_ids: Sequence[str],
+) -> List[PolicyDecision]:
+    """
+    Evaluate several plans with a single OPA query (the `allow_batch` rule).
+
+    Decisions are returned in the order of `plans`. Cached decisions are reused
+    and only the remaining plans are sent; if the batch query fails, every
+    plan goes through `evaluate_plan` on its own.
+    """
+    validated_plans = _batch_plans(plans, trace_ids)
+    if POLICY_BACKEND != "opa" or not OPA_URL or len(validated_plans) < 2:
+        return [
+            evaluate_plan(plan, provided_token, trace_id)
+            for plan, trace_id in zip(validated_plans, trace_ids)
+        ]
+
+    decisions = [_cached_decision(plan, provided_token) for plan in validated_plans]
+    pending = [index for index, decision in enumerate(decisions) if decision is None]
+    if pending:
+        try:
+            fresh = _opa_batch_policy(
+                [validated_plans[index] for index in pending], provided_token
+            )
+        except Exception as exc:
+            _batch_fallback_warning(len(pending), exc)
+            return [
+                evaluate_plan(plan, provided_token, trace_id)
+                for plan, trace_id in zip(validated_plans, trace_ids)
+            ]
+        for index, decision in zip(pending, fresh):
+            _remember_decision(validated_plans[index], provided_token, decision)
+            decisions[index] = decision
+
+    return [
+        _log_decision(decision, trace_id)
+        for decision, trace_id in zip(decisions, trace_ids)
+    ]
+
+
+async def aevaluate_plans(
+    plans: Sequence[Union[CandidatePlan, Dict[str, Any]]],
+    provided_token: str,
+    trace_ids: Sequence[str],
+) -> List[PolicyDecision]:
+    """Async `evaluate_plans`."""
+    validated_plans = _batch_plans(plans, trace_ids)
+    if POLICY_BACKEND != "opa" or not OPA_URL or len(validated_plans) < 2:
+        return [
+            await aevaluate_plan(plan, provided_token, trace_id)
+            for plan, trace_id in zip(validated_plans, trace_ids)
+        ]
+
+    decisions = [_cached_decision(plan, provided_token) for plan in validated_plans]
+    pending = [index for index, decision in enumerate(decisions) if decision is None]
+    if pending:
+        try:
+            fresh = await _aopa_batch_policy(
+                [validated_plans[index] for index in pending], provided_token
+            )
+        except Exception as exc:
+            _batch_fallback_warning(len(pending), exc)
+            return [
+                await aevaluate_plan(plan, provided_token, trace_id)
+                for plan, trace_id in zip(validated_plans, trace_ids)
+            ]
+        for index, decision in zip(pending, fresh):
+            _remember_decision(validated_plans[index], provided_token, decision)
+            decisions[index] = decision
+
+    return [
+        _log_decision(decision, trace_id)
+        for decision, trace_id in zip(decisions, trace_ids)
+    ]
+
+
+if POLICY_BACKEND == "embedded":
+    try:
+        _load_embedded_policy()
+    except Exception as exc:  # pragma: no cover - misconfiguration
+        logger.error(
+            "Embedded policy failed to load; fallback policy will be used",
+            extra={"extra_fields": {"path": POLICY_REGO_PATH, "error": str(exc)}},
+        )
@@ -0,0 +1,412 @@
+"""
+In-process evaluator for the subset of Rego used by `policies/traffic_policy.rego`.
+
+Supported: `package`, `import` (ignored), `default NAME := value`, complete
+rules `NAME := value if { body }` (and `NAME if { body }`), object/array/scalar
+literals, `input.*` references, local `x := expr` bindings, `==`, `!=` and the
+`lower()`/`upper()` builtins. Anything else (comprehensions, `some`, `with`,
+`not`, ...) makes that rule unsupported; the rule is skipped at load time and
+evaluating it raises RegoUnsupportedError.
+
+Each rule is compiled to a row of the rule's decision table: a list of
+condition closures and a head builder. Rows are tried in file order and the
+first one whose conditions all hold wins, falling back to the default. OPA
+instead reports a conflict when two rows match with different values, so
+first-match is the documented behaviour of this backend; traffic_policy.rego
+keeps its rows mutually exclusive so both agree.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+
+class RegoUnsupportedError(ValueError):
+    """The policy uses Rego outside the supported subset."""
+
+
+class _Undefined:
+    def __repr__(self) -> str:
+        return "undefined"
+
+
+UNDEFINED = _Undefined()
+
+Env = Dict[str, Any]
+Expr = Callable[[Env], Any]
+Condition = Callable[[Env], bool]
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<ws>[ \t\r]+)
+  | (?P<comment>\#[^\n]*)
+  | (?P<newline>\n)
+  | (?P<string>"(?:[^"\\]|\\.)*")
+  | (?P<number>-?\d+(?:\.\d+)?)
+  | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<op>:=|==|!=|<=|>=|[{}\[\]().,:;|<>=+\-*/`])
+    """,
+    re.VERBOSE,
+)
+
+_BUILTINS: Dict[str, Callable[[Any], Any]] = {
+    "lower": lambda value: value.lower() if isinstance(value, str) else UNDEFINED,
+    "upper": lambda value: value.upper() if isinstance(value, str) else UNDEFINED,
+}
+
+_CONSTANTS = {"true": True, "false": False, "null": None}
+
+
+class _Token(NamedTuple):
+    kind: str
+    value: str
+    line: int
+
+
+def _tokenize(source: str) -> List[_Token]:
+    tokens: List[_Token] = []
+    line = 1
+    position = 0
+    while position < len(source):
+        match = _TOKEN_RE.match(source, position)
+        if match is None:
+            raise RegoUnsupportedError(
+                f"line {line}: unexpected character {source[position]!r}"
+            )
+        kind = match.lastgroup or ""
+        if kind not in ("ws", "comment"):
+            tokens.append(_Token(kind, match.group(), line))
+        if kind == "newline":
+            line += 1
+        position = match.end()
+    return tokens
+
+
+def _split_statements(tokens: List[_Token]) -> List[List[_Token]]:
+    """Split on newlines outside any brackets."""
+    statements: List[List[_Token]] = []
+    current: List[_Token] = []
+    depth = 0
+    for token in tokens:
+        if token.kind == "op" and token.value in "{[(":
+            depth += 1
+        elif token.kind == "op" and token.value in "}])":
+            depth -= 1
+        if token.kind == "newline" and depth == 0:
+            if current:
+                statements.append(current)
+            current = []
+            continue
+        current.append(token)
+    if current:
+        statements.append(current)
+    return statements
+
+
+class CompiledRule(NamedTuple):
+    conditions: List[Condition]
+    head: Expr
+
+
+class _Parser:
+    def __init__(self, tokens: List[_Token]):
+        self.tokens = tokens
+        self.index = 0
+
+    # -- token helpers -----------------------------------------------------
+
+    def _peek(self) -> Optional[_Token]:
+        return self.tokens[self.index] if self.index < len(self.tokens) else None
+
+    def _skip_newlines(self) -> None:
+        while (
+            self.index < len(self.tokens) and self.tokens[self.index].kind == "newline"
+        ):
+            self.index += 1
+
+    def _next(self) -> _Token:
+        if self.index >= len(self.tokens):
+            raise RegoUnsupportedError("unexpected end of statement")
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+
+    def _expect(self, value: str) -> _Token:
+        token = self._next()
+        if token.value != value:
+            raise RegoUnsupportedError(
+                f"line {token.line}: expected {value!r}, got {token.value!r}"
+            )
+        return token
+
+    def _accept(self, value: str) -> bool:
+        token = self._peek()
+        if token is not None and token.value == value and token.kind != "string":
+            self.index += 1
+            return True
+        return False
+
+    def at_end(self) -> bool:
+        return self.index >= len(self.tokens)
+
+    # -- terms -------------------------------------------------------------
+
+    def term(self) -> Expr:
+        token = self._next()
+        if token.kind == "string":
+            value = json.loads(token.value)
+            return lambda env: value
+        if token.kind == "number":
+            number = json.loads(token.value)
+            return lambda env: number
+        if token.kind == "op" and token.value == "{":
+            return self._object()
+        if token.kind == "op" and token.value == "[":
+            return self._array()
+        if token.kind == "name":
+            if token.value in _CONSTANTS:
+                constant = _CONSTANTS[token.value]
+                return lambda env: constant
+            if self._accept("("):
+                return self._call(token)
+            return self._ref(token)
+        raise RegoUnsupportedError(
+            f"line {token.line}: unsupported term {token.value!r}"
+        )
+
+    def _object(self) -> Expr:
+        items: List[Tuple[Expr, Expr]] = []
+        self._skip_newlines()
+        while not self._accept("}"):
+            key = self.term()
+            self._expect(":")
+            self._skip_newlines()
+            items.append((key, self.term()))
+            self._skip_newlines()
+            if not self._accept(","):
+                self._skip_newlines()
+                self._expect("}")
+                break
+            self._skip_newlines()
+
+        def build(env: Env) -> Any:
+            result = {}
+            for key_expr, value_expr in items:
+                key, value = key_expr(env), value_expr(env)
+                if key is UNDEFINED or value is UNDEFINED:
+                    return UNDEFINED
+                result[key] = value
+            return result
+
+        return build
+
+    def _array(self) -> Expr:
+        items: List[Expr] = []
+        self._skip_newlines()
+        while not self._accept("]"):
+            items.append(self.term())
+            self._skip_newlines()
+            if self._accept("|"):
+                raise RegoUnsupportedError("comprehensions are not supported")
+            if not self._accept(","):
+                self._skip_newlines()
+                self._expect("]")
+                break
+            self._skip_newlines()
+
+        def build(env: Env) -> Any:
+            values = [item(env) for item in items]
+            return UNDEFINED if any(v is UNDEFINED for v in values) else values
+
+        return build
+
+    def _call(self, name: _Token) -> Expr:
+        builtin = _BUILTINS.get(name.value)
+        if builtin is None:
+            raise RegoUnsupportedError(
+                f"line {name.line}: unsupported builtin {name.value!r}"
+            )
+        argument = self.term()
+        self._expect(")")
+
+        def call(env: Env) -> Any:
+            value = argument(env)
+            return UNDEFINED if value is UNDEFINED else builtin(value)
+
+        return call
+
+    def _ref(self, root: _Token) -> Expr:
+        path: List[Expr] = []
+        while True:
+            if self._accept("."):
+                key = self._next().value
+                path.append(lambda env, key=key: key)
+            elif self._accept("["):
+                path.append(self.term())
+                self._expect("]")
+            else:
+                break
+
+        def resolve(env: Env) -> Any:
+            if root.value not in env:
+                return UNDEFINED
+            value = env[root.value]
+            for key_expr in path:
+                key = key_expr(env)
+                if isinstance(value, dict) and key in value:
+                    value = value[key]
+                elif (
+                    isinstance(value, list)
+                    and isinstance(key, int)
+                    and 0 <= key < len(value)
+                ):
+                    value = value[key]
+                else:
+                    return UNDEFINED
+            return value
+
+        return resolve
+
+    # -- rule bodies -------------------------------------------------------
+
+    def body(self) -> List[Condition]:
+        conditions: List[Condition] = []
+        self._expect("{")
+        while True:
+            self._skip_newlines()
+            while self._accept(";"):
+                self._skip_newlines()
+            if self._accept("}"):
+                return conditions
+            conditions.append(self._condition())
+
+    def _condition(self) -> Condition:
+        token = self._peek()
+        if token is not None and token.value in ("some", "every", "not", "with"):
+            raise RegoUnsupportedError(
+                f"line {token.line}: {token.value!r} is not supported"
+            )
+        following = (
+            self.tokens[self.index + 1] if self.index + 1 < len(self.tokens) else None
+        )
+        if (
+            token is not None
+            and token.kind == "name"
+            and following is not None
+            and following.value == ":="
+        ):
+            name = token.value
+            self.index += 2
+            value_expr = self.term()
+
+            def bind(env: Env) -> bool:
+                value = value_expr(env)
+                if value is UNDEFINED:
+                    return False
+                env[name] = value
+                return True
+
+            return bind
+
+        left = self.term()
+        operator = self._peek()
+        if operator is not None and operator.value in ("==", "!="):
+            self.index += 1
+            right = self.term()
+            equal = operator.value == "=="
+
+            def compare(env: Env) -> bool:
+                a, b = left(env), right(env)
+                if a is UNDEFINED or b is UNDEFINED:
+                    return False
+                return (a == b) == equal
+
+            return compare
+        if (
+            operator is not None
+            and operator.kind == "op"
+            and operator.value not in ";}"
+        ):
+            raise RegoUnsupportedError(
+                f"line {operator.line}: operator {operator.value!r} is not supported"
+            )
+
+        def truthy(env: Env) -> bool:
+            value = left(env)
+            return value is not UNDEFINED and value is not False
+
+        return truthy
+
+
+class RegoPolicy:
+    """A compiled policy: per rule name, its ordered decision table and default."""
+
+    def __init__(self, package: str):
+        self.package = package
+        self.tables: Dict[str, List[CompiledRule]] = {}
+        self.defaults: Dict[str, Any] = {}
+        self.unsupported: Dict[str, str] = {}
+
+    def evaluate(self, rule: str, input_doc: Dict[str, Any]) -> Any:
+        """Value of `rule` for this input; None when undefined and without default."""
+        if rule in self.unsupported:
+            raise RegoUnsupportedError(f"rule '{rule}': {self.unsupported[rule]}")
+        for conditions, head in self.tables.get(rule, []):
+            env: Env = {"input": input_doc}
+            if all(condition(env) for condition in conditions):
+                value = head(env)
+                if value is not UNDEFINED:
+                    return value
+        return self.defaults.get(rule)
+
+
+def _compile_statement(policy: RegoPolicy, tokens: List[_Token]) -> None:
+    first = tokens[0]
+    if first.value == "package":
+        policy.package = ".".join(t.value for t in tokens[1:] if t.value != ".")
+        return
+    if first.value == "import":
+        return
+
+    parser = _Parser(tokens)
+    is_default = parser._accept("default")
+    name = parser._next()
+    if name.kind != "name":
+        raise RegoUnsupportedError(f"line {name.line}: expected a rule name")
+    try:
+        if parser._accept(":=") or parser._accept("="):
+            head = parser.term()
+        else:
+            head = lambda env: True  # noqa: E731 - `NAME if { ... }` rules
+        if is_default:
+            if not parser.at_end():
+                raise RegoUnsupportedError(f"line {name.line}: malformed default")
+            policy.defaults[name.value] = head({})
+            return
+        parser._accept("if")
+        conditions = parser.body() if not parser.at_end() else []
+        if not parser.at_end():
+            raise RegoUnsupportedError(
+                f"line {name.line}: unexpected tokens after rule body"
+            )
+    except RegoUnsupportedError as exc:
+        policy.unsupported[name.value] = str(exc)
+        return
+    policy.tables.setdefault(name.value, []).append(CompiledRule(conditions, head))
+
+
+def compile_policy(source: str) -> RegoPolicy:
+    policy = RegoPolicy(package="")
+    for statement in _split_statements(_tokenize(source)):
+        _compile_statement(policy, statement)
+    # A rule with any unsupported definition cannot be evaluated faithfully.
+    for name in policy.unsupported:
+        policy.tables.pop(name, None)
+    return policy
+
+
+def load_policy(path: str) -> RegoPolicy:
+    return compile_policy(Path(path).read_text(encoding="utf-8"))
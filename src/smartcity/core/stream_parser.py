@@ -0,0 +1,109 @@
+"""Incremental parser for plan JSON arriving as a stream of LLM tokens."""
+
+from __future__ import annotations
+
+import json
+from typing import Any, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from .models import PlanStep
+
+# Events returned by `IncrementalPlanParser.feed`.
+RISK_LEVEL = "risk_level"
+STEP = "step"
+INVALID_STEP = "invalid_step"
+
+
+class IncrementalPlanParser:
+    """
+    Scans the response text as it arrives and reports, as soon as each is
+    complete: the top-level `risk_level` value and every `steps[]` entry
+    (validated as a PlanStep). Text outside the top-level object, such as
+    markdown fences, is ignored. The full text is kept in `text` for the
+    final parse and validation.
+    """
+
+    def __init__(self) -> None:
+        self._buffer = ""
+        self._position = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._pending_key: Optional[str] = None
+        self._current_key: Optional[str] = None
+        self._in_steps = False
+        self._step_start: Optional[int] = None
+        self._risk_level_seen = False
+        self.closed = False
+
+    @property
+    def text(self) -> str:
+        return self._buffer
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        self._buffer += chunk
+        events: List[Tuple[str, Any]] = []
+        buffer = self._buffer
+        for index in range(self._position, len(buffer)):
+            if self.closed:
+                break
+            self._scan(buffer, index, buffer[index], events)
+        self._position = len(buffer)
+        return events
+
+    def _scan(
+        self, buffer: str, index: int, char: str, events: List[Tuple[str, Any]]
+    ) -> None:
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif char == "\\":
+                self._escape = True
+            elif char == '"':
+                self._in_string = False
+                self._string_closed(buffer[self._string_start : index + 1], events)
+            return
+        if self._depth == 0 and char != "{":
+            return
+        if char == '"':
+            self._in_string = True
+            self._string_start = index
+        elif char in "{[":
+            self._depth += 1
+            if char == "[" and self._depth == 2 and self._current_key == "steps":
+                self._in_steps = True
+            elif char == "{" and self._depth == 3 and self._in_steps:
+                self._step_start = index
+        elif char in "}]":
+            if char == "}" and self._depth == 3 and self._step_start is not None:
+                events.append(self._step(buffer[self._step_start : index + 1]))
+                self._step_start = None
+            elif char == "]" and self._depth == 2:
+                self._in_steps = False
+            self._depth -= 1
+            if self._depth == 0:
+                self.closed = True
+        elif self._depth == 1 and char == ":":
+            self._current_key = self._pending_key
+        elif self._depth == 1 and char == ",":
+            self._pending_key = None
+            self._current_key = None
+
+    def _string_closed(self, token: str, events: List[Tuple[str, Any]]) -> None:
+        if self._depth != 1:
+            return
+        value = json.loads(token)
+        if self._current_key is None:
+            self._pending_key = value
+        elif self._current_key == "risk_level" and not self._risk_level_seen:
+            self._risk_level_seen = True
+            events.append((RISK_LEVEL, value))
+
+    @staticmethod
+    def _step(text: str) -> Tuple[str, Any]:
+        try:
+            return STEP, PlanStep.model_validate(json.loads(text))
+        except (ValueError, ValidationError) as exc:
+            return INVALID_STEP, str(exc)
@@ -0,0 +1,206 @@
+"""Shared, keep-alive HTTP connection pool for outbound calls (MCP, OPA, Orion)."""
+
+import asyncio
+import os
+import threading
+import weakref
+from typing import Any, Dict, Iterable, Optional
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from .logging_utils import configure_logger
+
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))
+HTTP_POOL_BLOCK = os.getenv("HTTP_POOL_BLOCK", "false").lower() == "true"
+HTTP_WARMUP_ENABLED = os.getenv("HTTP_WARMUP_ENABLED", "true").lower() == "true"
+HTTP_WARMUP_CONNECTIONS = int(os.getenv("HTTP_WARMUP_CONNECTIONS", "1"))
+HTTP_WARMUP_TIMEOUT_SECONDS = float(os.getenv("HTTP_WARMUP_TIMEOUT_SECONDS", "2"))
+HTTP_ASYNC_TIMEOUT_SECONDS = float(os.getenv("HTTP_ASYNC_TIMEOUT_SECONDS", "10"))
+
+logger = configure_logger("http_pool")
+
+_adapter: Optional[HTTPAdapter] = None
+_adapter_lock = threading.Lock()
+_local = threading.local()
+_async_clients: (
+    "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]"
+) = weakref.WeakKeyDictionary()
+
+
+def _shared_adapter() -> HTTPAdapter:
+    global _adapter
+    if _adapter is None:
+        with _adapter_lock:
+            if _adapter is None:
+                _adapter = HTTPAdapter(
+                    pool_connections=HTTP_POOL_CONNECTIONS,
+                    pool_maxsize=HTTP_POOL_MAXSIZE,
+                    pool_block=HTTP_POOL_BLOCK,
+                )
+    return _adapter
+
+
+def get_session() -> requests.Session:
+    """
+    Return the calling thread's session.
+
+    Sessions are per thread (cookie and header state is not thread-safe), but
+    they all mount one shared adapter, so TCP connections are pooled and kept
+    alive across threads and across calls.
+    """
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        adapter = _shared_adapter()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers["Connection"] = "keep-alive"
+        _local.session = session
+    return session
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Return the keep-alive async client bound to the running event loop.
+
+    httpx clients cannot be shared across event loops, so one client is kept
+    per loop; the uvicorn services only ever run one.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=HTTP_POOL_CONNECTIONS * HTTP_POOL_MAXSIZE,
+                max_keepalive_connections=HTTP_POOL_MAXSIZE,
+            ),
+            timeout=HTTP_ASYNC_TIMEOUT_SECONDS,
+        )
+        _async_clients[loop] = client
+    return client
+
+
+async def aclose_async_client() -> None:
+    """Close the running loop's async client (call from service shutdown)."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def warm_up(
+    urls: Iterable[str], connections: int = HTTP_WARMUP_CONNECTIONS
+) -> Dict[str, int]:
+    """
+    Open `connections` keep-alive connections to each URL ahead of the first real call.
+
+    Any HTTP status counts as a successful warm-up (the connection is what we
+    want); network errors are logged and reported as 0 for that URL.
+    """
+    warmed: Dict[str, int] = {}
+    for url in urls:
+        if not url:
+            continue
+        threads = []
+        results = []
+
+        def _open(target: str = url) -> None:
+            try:
+                get_session().head(target, timeout=HTTP_WARMUP_TIMEOUT_SECONDS)
+                results.append(True)
+            except requests.RequestException as exc:
+                results.append(False)
+                logger.warning(
+                    "HTTP warm-up failed",
+                    extra={"extra_fields": {"url": target, "error": str(exc)}},
+                )
+
+        # Concurrent requests are needed to open more than one connection per host.
+        for _ in range(max(1, connections)):
+            thread = threading.Thread(target=_open, daemon=True)
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        warmed[url] = sum(1 for ok in results if ok)
+
+    logger.info("HTTP pool warmed up", extra={"extra_fields": {"warmed": warmed}})
+    return warmed
+
+
+async def awarm_up(
+    urls: Iterable[str], connections: int = HTTP_WARMUP_CONNECTIONS
+) -> Dict[str, int]:
+    """`warm_up` for the running loop's async client."""
+    client = get_async_client()
+
+    async def _open(target: str) -> bool:
+        try:
+            await client.head(target, timeout=HTTP_WARMUP_TIMEOUT_SECONDS)
+            return True
+        except httpx.HTTPError as exc:
+            logger.warning(
+                "HTTP warm-up failed",
+                extra={"extra_fields": {"url": target, "error": str(exc)}},
+            )
+            return False
+
+    warmed: Dict[str, int] = {}
+    for url in urls:
+        if not url:
+            continue
+        results = await asyncio.gather(
+            *(_open(url) for _ in range(max(1, connections)))
+        )
+        warmed[url] = sum(1 for ok in results if ok)
+
+    logger.info("HTTP pool warmed up", extra={"extra_fields": {"warmed": warmed}})
+    return warmed
+
+
+def async_pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Per-host statistics for the async clients' pools, keyed by `scheme://host:port`."""
+    stats: Dict[str, Dict[str, Any]] = {}
+    for client in list(_async_clients.values()):
+        # httpx and httpcore do not expose the pool or a connection's origin
+        # publicly; every private read is guarded so a change degrades to {}.
+        pool = getattr(getattr(client, "_transport", None), "_pool", None)
+        for conn in list(getattr(pool, "connections", None) or []):
+            origin = getattr(conn, "_origin", None)
+            scheme = getattr(origin, "scheme", None)
+            host = getattr(origin, "host", None)
+            is_idle = getattr(conn, "is_idle", None)
+            if not isinstance(scheme, bytes) or not isinstance(host, bytes):
+                continue
+            key = f"{scheme.decode()}://{host.decode()}:{getattr(origin, 'port', '')}"
+            entry = stats.setdefault(
+                key, {"maxsize": HTTP_POOL_MAXSIZE, "open": 0, "idle": 0}
+            )
+            entry["open"] += 1
+            if callable(is_idle) and is_idle():
+                entry["idle"] += 1
+    return stats
+
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    """Per-host statistics for the sync pool, keyed by `scheme://host:port`."""
+    if _adapter is None:
+        return {}
+
+    pools = _adapter.poolmanager.pools
+    stats: Dict[str, Dict[str, Any]] = {}
+    for key in list(pools.keys()):
+        pool = pools.get(key)
+        if pool is None:
+            continue
+        queue = pool.pool
+        idle = sum(1 for conn in list(queue.queue) if conn is not None) if queue else 0
+        stats[f"{key.key_scheme}://{key.key_host}:{key.key_port}"] = {
+            "maxsize": queue.maxsize if queue else HTTP_POOL_MAXSIZE,
+            "connections_opened": pool.num_connections,
+            "requests": pool.num_requests,
+            "idle": idle,
+        }
+    return stats
@@ -1,14 +1,17 @@
+import asyncio
 import os
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Sequence
 from urllib.parse import quote
 
-import requests
-
+from .http_pool import get_async_client, get_session
 from .logging_utils import configure_logger
 
 ORION_BASE_URL = os.getenv("ORION_BASE_URL", "http://localhost:1026")
 SERVICE = os.getenv("ORION_FIWARE_SERVICE", "openiot")
 SERVICE_PATH = os.getenv("ORION_FIWARE_SERVICE_PATH", "/")
+# Entities per /v2/op/update or /v2/op/query request; longer lists are split.
+# Capped at 1000, the largest page Orion returns for a query.
+ORION_BATCH_SIZE = max(1, min(int(os.getenv("ORION_BATCH_SIZE", "100")), 1000))
 
 logger = configure_logger("ngsi_client")
 
@@ -27,11 +30,57 @@ def _encode_entity_id(entity_id: str) -> str:
     return quote(entity_id, safe="")
 
 
+def _entity_url(entity_id: str) -> str:
+    return f"{ORION_BASE_URL}/v2/entities/{_encode_entity_id(entity_id)}"
+
+
+def _upsert_url() -> str:
+    return f"{ORION_BASE_URL}/v2/entities?options=upsert,keyValues"
+
+
+def _corridor_url(entity_id: str) -> str:
+    return f"{_entity_url(entity_id)}/attrs/priorityCorridor"
+
+
+def _op_update_url() -> str:
+    return f"{ORION_BASE_URL}/v2/op/update"
+
+
+def _op_query_url(limit: int) -> str:
+    return f"{ORION_BASE_URL}/v2/op/query?limit={limit}"
+
+
+def _chunks(entity_ids: Sequence[str]) -> List[List[str]]:
+    return [
+        list(entity_ids[start : start + ORION_BATCH_SIZE])
+        for start in range(0, len(entity_ids), ORION_BATCH_SIZE)
+    ]
+
+
+def _corridor_update_body(entity_ids: List[str], value: str) -> Dict[str, Any]:
+    return {
+        "actionType": "update",
+        "entities": [
+            {"id": entity_id, "priorityCorridor": {"type": "Text", "value": value}}
+            for entity_id in entity_ids
+        ],
+    }
+
+
+def _query_body(entity_ids: List[str]) -> Dict[str, Any]:
+    return {"entities": [{"id": entity_id} for entity_id in entity_ids]}
+
+
+def _json_headers(token: Optional[str] = None) -> Dict[str, str]:
+    headers = _headers(token)
+    headers["Content-Type"] = "application/json"
+    return headers
+
+
 def get_traffic_signal(
     entity_id: str, trace_id: str, token: Optional[str] = None
 ) -> Dict[str, Any]:
-    url = f"{ORION_BASE_URL}/v2/entities/{_encode_entity_id(entity_id)}"
-    response = requests.get(url, headers=_headers(token))
+    response = get_session().get(_entity_url(entity_id), headers=_headers(token))
     logger.info(
         "Fetched TrafficSignal",
         extra={"traceId": trace_id, "extra_fields": {"status": response.status_code}},
@@ -41,10 +90,7 @@ def get_traffic_signal(
 
 
 def upsert_traffic_signal(entity: Dict[str, Any], trace_id: str) -> None:
-    url = f"{ORION_BASE_URL}/v2/entities?options=upsert,keyValues"
-    response = requests.post(
-        url, headers={**_headers(), "Content-Type": "application/json"}, json=entity
-    )
+    response = get_session().post(_upsert_url(), headers=_json_headers(), json=entity)
     logger.info(
         "Upsert TrafficSignal",
         extra={"traceId": trace_id, "extra_fields": {"status": response.status_code}},
@@ -55,11 +101,51 @@ def upsert_traffic_signal(entity: Dict[str, Any], trace_id: str) -> None:
 def update_priority_corridor(
     entity_id: str, value: str, trace_id: str, token: Optional[str] = None
 ) -> Dict[str, Any]:
-    url = f"{ORION_BASE_URL}/v2/entities/{_encode_entity_id(entity_id)}/attrs/priorityCorridor"
-    headers = _headers(token)
-    headers["Content-Type"] = "application/json"
-    payload = {"value": value}
-    response = requests.put(url, headers=headers, json=payload)
+    response = get_session().put(
+        _corridor_url(entity_id), headers=_json_headers(token), json={"value": value}
+    )
+    logger.info(
+        "Updated priorityCorridor",
+        extra={
+            "traceId": trace_id,
+            "extra_fields": {"status": response.status_code, "value": value},
+        },
+    )
+    response.raise_for_status()
+    return response.json() if response.content else {"result": "updated"}
+
+
+async def aget_traffic_signal(
+    entity_id: str, trace_id: str, token: Optional[str] = None
+) -> Dict[str, Any]:
+    response = await get_async_client().get(
+        _entity_url(entity_id), headers=_headers(token)
+    )
+    logger.info(
+        "Fetched TrafficSignal",
+        extra={"traceId": trace_id, "extra_fields": {"status": response.status_code}},
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+async def aupsert_traffic_signal(entity: Dict[str, Any], trace_id: str) -> None:
+    response = await get_async_client().post(
+        _upsert_url(), headers=_json_headers(), json=entity
+    )
+    logger.info(
+        "Upsert TrafficSignal",
+        extra={"traceId": trace_id, "extra_fields": {"status": response.status_code}},
+    )
+    response.raise_for_status()
+
+
+async def aupdate_priority_corridor(
+    entity_id: str, value: str, trace_id: str, token: Optional[str] = None
+) -> Dict[str, Any]:
+    response = await get_async_client().put(
+        _corridor_url(entity_id), headers=_json_headers(token), json={"value": value}
+    )
     logger.info(
         "Updated priorityCorridor",
         extra={
@@ -71,11 +157,100 @@ def update_priority_corridor(
     return response.json() if response.content else {"result": "updated"}
 
 
+def _log_batch(message: str, trace_id: str, status: int, entities: int) -> None:
+    logger.info(
+        message,
+        extra={
+            "traceId": trace_id,
+            "extra_fields": {"status": status, "entities": entities},
+        },
+    )
+
+
+def update_priority_corridors(
+    entity_ids: Sequence[str], value: str, trace_id: str, token: Optional[str] = None
+) -> Dict[str, Any]:
+    """Set priorityCorridor on every entity via /v2/op/update, chunked."""
+    chunks = _chunks(entity_ids)
+    for chunk in chunks:
+        response = get_session().post(
+            _op_update_url(),
+            headers=_json_headers(token),
+            json=_corridor_update_body(chunk, value),
+        )
+        _log_batch(
+            "Batch updated priorityCorridor", trace_id, response.status_code, len(chunk)
+        )
+        response.raise_for_status()
+    return {"result": "updated", "entities": len(entity_ids), "requests": len(chunks)}
+
+
+def query_traffic_signals(
+    entity_ids: Sequence[str], trace_id: str, token: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Read the entities via /v2/op/query, chunked; unknown ids are left out."""
+    entities: List[Dict[str, Any]] = []
+    for chunk in _chunks(entity_ids):
+        response = get_session().post(
+            _op_query_url(ORION_BATCH_SIZE),
+            headers=_json_headers(token),
+            json=_query_body(chunk),
+        )
+        _log_batch(
+            "Batch fetched TrafficSignals", trace_id, response.status_code, len(chunk)
+        )
+        response.raise_for_status()
+        entities.extend(response.json())
+    return entities
+
+
+async def aupdate_priority_corridors(
+    entity_ids: Sequence[str], value: str, trace_id: str, token: Optional[str] = None
+) -> Dict[str, Any]:
+    """Async `update_priority_corridors`; the chunks are sent concurrently."""
+
+    async def update(chunk: List[str]) -> None:
+        response = await get_async_client().post(
+            _op_update_url(),
+            headers=_json_headers(token),
+            json=_corridor_update_body(chunk, value),
+        )
+        _log_batch(
+            "Batch updated priorityCorridor", trace_id, response.status_code, len(chunk)
+        )
+        response.raise_for_status()
+
+    chunks = _chunks(entity_ids)
+    await asyncio.gather(*(update(chunk) for chunk in chunks))
+    return {"result": "updated", "entities": len(entity_ids), "requests": len(chunks)}
+
+
+async def aquery_traffic_signals(
+    entity_ids: Sequence[str], trace_id: str, token: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Async `query_traffic_signals`; the chunks are sent concurrently."""
+
+    async def query(chunk: List[str]) -> List[Dict[str, Any]]:
+        response = await get_async_client().post(
+            _op_query_url(ORION_BATCH_SIZE),
+            headers=_json_headers(token),
+            json=_query_body(chunk),
+        )
+        _log_batch(
+            "Batch fetched TrafficSignals", trace_id, response.status_code, len(chunk)
+        )
+        response.raise_for_status()
+        return response.json()
+
+    pages = await asyncio.gather(*(query(chunk) for chunk in _chunks(entity_ids)))
+    return [entity for page in pages for entity in page]
+
+
 def create_subscription(subscription: Dict[str, Any], trace_id: str) -> Dict[str, Any]:
     url = f"{ORION_BASE_URL}/v2/subscriptions"
-    headers = _headers()
-    headers["Content-Type"] = "application/json"
-    response = requests.post(url, headers=headers, json=subscription, timeout=10)
+    response = get_session().post(
+        url, headers=_json_headers(), json=subscription, timeout=10
+    )
     logger.info(
         "Created subscription",
         extra={"traceId": trace_id, "extra_fields": {"status": response.status_code}},
@@ -90,7 +265,7 @@ def create_subscription(subscription: Dict[str, Any], trace_id: str) -> Dict[str
 
 def list_subscriptions(trace_id: str) -> Dict[str, Any]:
     url = f"{ORION_BASE_URL}/v2/subscriptions"
-    response = requests.get(url, headers=_headers(), timeout=10)
+    response = get_session().get(url, headers=_headers(), timeout=10)
     logger.info(
         "Listed subscriptions",
         extra={"traceId": trace_id, "extra_fields": {"status": response.status_code}},
@@ -0,0 +1,312 @@
+"""Bounded in-process work queue drained by a fixed pool of asyncio workers."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+Job = Callable[[], Awaitable[Any]]
+
+# How many recent wait and latency samples the percentiles are computed over.
+_SAMPLES = 1024
+# Upper bounds (ms) of the latency histogram buckets; one more bucket counts
+# everything slower.
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class QueueFullError(RuntimeError):
+    """Raised by `WorkQueue.submit`/`reserve` when the job's class is at capacity."""
+
+
+def _percentile(samples: List[float], q: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return round(ordered[index], 3)
+
+
+class _Pending(NamedTuple):
+    enqueued_at: float
+    trace_id: str
+    job: Job
+
+
+class _ClassStats:
+    """Counters, recent samples and the latency histogram of one class."""
+
+    def __init__(self) -> None:
+        self.accepted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self.waits_ms: Deque[float] = deque(maxlen=_SAMPLES)
+        self.latencies_ms: Deque[float] = deque(maxlen=_SAMPLES)
+        self.histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def record(self, wait_ms: float, latency_ms: float) -> None:
+        self.waits_ms.append(wait_ms)
+        self.latencies_ms.append(latency_ms)
+        bucket = next(
+            (i for i, bound in enumerate(LATENCY_BUCKETS_MS) if latency_ms <= bound),
+            len(LATENCY_BUCKETS_MS),
+        )
+        self.histogram[bucket] += 1
+
+    def snapshot(self, depth: int, reserved: int) -> Dict[str, Any]:
+        waits = list(self.waits_ms)
+        latencies = list(self.latencies_ms)
+        labels = [f"le_{bound}" for bound in LATENCY_BUCKETS_MS] + ["inf"]
+        return {
+            "depth": depth,
+            "reserved": reserved,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "failed": self.failed,
+            "wait_p50_ms": _percentile(waits, 0.5),
+            "wait_p95_ms": _percentile(waits, 0.95),
+            "latency_p50_ms": _percentile(latencies, 0.5),
+            "latency_p95_ms": _percentile(latencies, 0.95),
+            "latency_p99_ms": _percentile(latencies, 0.99),
+            "latency_histogram_ms": dict(zip(labels, self.histogram)),
+        }
+
+
+class WorkQueue:
+    """
+    Accepts jobs (argument-less coroutine functions) and runs them on
+    `workers` concurrent worker tasks. `submit` never waits: a job whose class
+    already has `max_size` jobs waiting raises QueueFullError so the caller
+    can shed load. Every class has its own bound, so a flood of routine work
+    cannot crowd urgent work out of the queue.
+
+    `classes` are priority classes, most urgent first. A free worker takes the
+    oldest job of the most urgent non-empty class, but waiting earns priority:
+    each `aging_ms` a class's oldest job has waited counts as one class step,
+    so less urgent work keeps moving under sustained urgent load
+    (`aging_ms=0` means strict priority).
+
+    `reserve` holds a slot of a class for a job that will be submitted later
+    (e.g. once a coalescing window closes); reserved slots count against the
+    class bound, and a `submit(..., reserved=True)` in that class is always
+    accepted while the queue runs.
+
+    `start` binds the queue to the running event loop (it can be restarted on
+    another one). Job errors are logged and counted; they do not stop the
+    worker.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_size: int,
+        workers: int,
+        logger: logging.Logger,
+        classes: Sequence[str] = ("default",),
+        aging_ms: float = 0,
+    ):
+        self.name = name
+        self.max_size = max(1, max_size)
+        self.workers = max(1, workers)
+        self.classes = tuple(classes)
+        self.aging_ms = max(0.0, aging_ms)
+        self._logger = logger
+        self._lanes: Dict[str, Deque[_Pending]] = {c: deque() for c in self.classes}
+        self._class_stats = {c: _ClassStats() for c in self.classes}
+        self._reserved: Dict[str, int] = {c: 0 for c in self.classes}
+        self._ready: Optional[asyncio.Semaphore] = None
+        self._idle: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self._closed = False
+        self._unfinished = 0
+        self.in_flight = 0
+
+    @property
+    def depth(self) -> int:
+        return sum(len(lane) for lane in self._lanes.values())
+
+    def start(self) -> None:
+        self._closed = False
+        if not self._tasks:
+            self._ready = asyncio.Semaphore(self.depth)
+            self._idle = asyncio.Event()
+            if not self._unfinished:
+                self._idle.set()
+            self._tasks = [
+                asyncio.create_task(
+                    self._work(self._ready), name=f"{self.name}-worker-{index}"
+                )
+                for index in range(self.workers)
+            ]
+
+    async def stop(self, drain_seconds: float = 0) -> None:
+        """Stop accepting jobs, let queued ones finish for up to `drain_seconds`."""
+        self._closed = True
+        if self._idle is not None and drain_seconds > 0:
+            try:
+                await asyncio.wait_for(self._idle.wait(), drain_seconds)
+            except asyncio.TimeoutError:
+                self._logger.warning(
+                    "Work queue stopped before draining",
+                    extra={"extra_fields": {"queue": self.name, "depth": self.depth}},
+                )
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def reserve(self, priority: str, trace_id: str) -> None:
+        """Hold one slot of class `priority` for a later `submit(reserved=True)`."""
+        self._admit(priority, trace_id)
+        self._reserved[priority] += 1
+
+    def release(self, priority: str) -> None:
+        """Give back a slot reserved in class `priority` without submitting."""
+        if self._reserved.get(priority, 0) > 0:
+            self._reserved[priority] -= 1
+
+    def submit(
+        self,
+        job: Job,
+        trace_id: str,
+        priority: Optional[str] = None,
+        reserved: bool = False,
+    ) -> None:
+        """
+        Queue `job` in class `priority` (default: the least urgent class);
+        with `reserved`, in the slot held by an earlier `reserve`.
+        """
+        priority = priority or self.classes[-1]
+        if reserved:
+            self.release(priority)
+            if self._closed or self._ready is None or not self._tasks:
+                raise QueueFullError(f"{self.name} queue is not running")
+        else:
+            self._admit(priority, trace_id)
+        self._lanes[priority].append(_Pending(time.perf_counter(), trace_id, job))
+        self._class_stats[priority].accepted += 1
+        self._unfinished += 1
+        if self._idle is not None:
+            self._idle.clear()
+        self._ready.release()
+
+    def _admit(self, priority: str, trace_id: str) -> None:
+        """Raise unless class `priority` has a free slot."""
+        if priority not in self._lanes:
+            raise ValueError(f"Unknown priority class: {priority}")
+        if self._closed or self._ready is None or not self._tasks:
+            raise QueueFullError(f"{self.name} queue is not running")
+        lane = self._lanes[priority]
+        class_stats = self._class_stats[priority]
+        if len(lane) + self._reserved[priority] >= self.max_size:
+            class_stats.rejected += 1
+            self._logger.warning(
+                "Work queue full; job rejected",
+                extra={
+                    "traceId": trace_id,
+                    "extra_fields": {
+                        "queue": self.name,
+                        "priority": priority,
+                        "depth": len(lane),
+                        "reserved": self._reserved[priority],
+                        "rejected": class_stats.rejected,
+                    },
+                },
+            )
+            raise QueueFullError(f"{self.name} queue is full for {priority} jobs")
+
+    def _next(self) -> Tuple[str, _Pending]:
+        """Pop the job to run next; the caller holds a `_ready` permit."""
+        now = time.perf_counter()
+        best: Optional[Tuple[float, str]] = None
+        for rank, priority in enumerate(self.classes):
+            lane = self._lanes[priority]
+            if not lane:
+                continue
+            score = float(rank)
+            if self.aging_ms:
+                score -= (now - lane[0].enqueued_at) * 1000 / self.aging_ms
+            if best is None or score < best[0]:
+                best = (score, priority)
+        assert best is not None
+        return best[1], self._lanes[best[1]].popleft()
+
+    async def _work(self, ready: asyncio.Semaphore) -> None:
+        while True:
+            await ready.acquire()
+            priority, pending = self._next()
+            class_stats = self._class_stats[priority]
+            started = time.perf_counter()
+            self.in_flight += 1
+            try:
+                await pending.job()
+                class_stats.completed += 1
+            except Exception as exc:
+                class_stats.failed += 1
+                self._logger.error(
+                    "Queued job failed",
+                    extra={
+                        "traceId": pending.trace_id,
+                        "extra_fields": {
+                            "queue": self.name,
+                            "priority": priority,
+                            "error": str(exc),
+                        },
+                    },
+                )
+            finally:
+                finished = time.perf_counter()
+                class_stats.record(
+                    (started - pending.enqueued_at) * 1000,
+                    (finished - pending.enqueued_at) * 1000,
+                )
+                self.in_flight -= 1
+                self._unfinished -= 1
+                if not self._unfinished and self._idle is not None:
+                    self._idle.set()
+
+    def stats(self) -> Dict[str, Any]:
+        per_class = {
+            priority: self._class_stats[priority].snapshot(
+                len(self._lanes[priority]), self._reserved[priority]
+            )
+            for priority in self.classes
+        }
+        waits = [
+            wait
+            for class_stats in self._class_stats.values()
+            for wait in class_stats.waits_ms
+        ]
+        return {
+            "name": self.name,
+            "running": bool(self._tasks) and not self._closed,
+            "depth": self.depth,
+            "reserved": sum(self._reserved.values()),
+            "max_size": self.max_size,
+            "workers": self.workers,
+            "aging_ms": self.aging_ms,
+            "in_flight": self.in_flight,
+            "accepted": sum(c["accepted"] for c in per_class.values()),
+            "rejected": sum(c["rejected"] for c in per_class.values()),
+            "completed": sum(c["completed"] for c in per_class.values()),
+            "failed": sum(c["failed"] for c in per_class.values()),
+            "wait_p50_ms": _percentile(waits, 0.5),
+            "wait_p95_ms": _percentile(waits, 0.95),
+            "wait_max_ms": round(max(waits), 3) if waits else None,
+            "classes": per_class,
+        }
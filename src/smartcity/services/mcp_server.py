@@ -1,16 +1,26 @@
-import os
-from typing import Any, Dict, Optional
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
 
 from fastapi import FastAPI, HTTPException, Request
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
+from ..core.knowledge import knowledge_base
+from ..infra.http_pool import HTTP_WARMUP_ENABLED, aclose_async_client, awarm_up
 from ..infra.logging_utils import configure_logger
-from ..infra.ngsi_client import get_traffic_signal, update_priority_corridor
+from ..infra.ngsi_client import ORION_BASE_URL
+from .mcp_tools import McpToolError, acall_tool, arun_batch, authorize
 
-app = FastAPI(title="MCP Server")
-logger = configure_logger("mcp_server")
 
-USER_TOKEN = os.getenv("USER_TOKEN", "user-token")
+@asynccontextmanager
+async def _lifespan(_: FastAPI):
+    if HTTP_WARMUP_ENABLED:
+        await awarm_up([ORION_BASE_URL])
+    yield
+    await aclose_async_client()
+
+
+app = FastAPI(title="MCP Server", lifespan=_lifespan)
+logger = configure_logger("mcp_server")
 
 
 class McpCall(BaseModel):
@@ -20,42 +30,55 @@ class McpCall(BaseModel):
     token: Optional[str] = None
 
 
-@app.post("/mcp")
-async def handle_mcp(call: McpCall, request: Request):
-    trace_id = call.traceId
-    token = call.token or request.headers.get("Authorization", "").replace(
+class McpStep(BaseModel):
+    method: str
+    params: Dict[str, Any]
+
+
+class McpBatchCall(BaseModel):
+    calls: List[McpStep] = Field(min_length=1)
+    traceId: str
+    token: Optional[str] = None
+
+
+def _authorize(call_token: Optional[str], request: Request, trace_id: str) -> str:
+    token = call_token or request.headers.get("Authorization", "").replace(
         "Bearer ", ""
     )
-    if token != USER_TOKEN:
-        logger.warning("Unauthorized MCP call", extra={"traceId": trace_id})
-        raise HTTPException(status_code=401, detail="Invalid token")
+    try:
+        return authorize(token, trace_id)
+    except McpToolError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=exc.detail)
 
+
+@app.post("/mcp")
+async def handle_mcp(call: McpCall, request: Request):
+    trace_id = call.traceId
+    token = _authorize(call.token, request, trace_id)
     try:
-        if call.method == "getTrafficSignalState":
-            result = get_traffic_signal(call.params["entity_id"], trace_id, token)
-        elif call.method == "setPriorityCorridor":
-            result = update_priority_corridor(
-                call.params["entity_id"], call.params["value"], trace_id, token
-            )
-        elif call.method == "notifyTrafficAgents":
-            logger.info(
-                "Notify traffic agents",
-                extra={
-                    "traceId": trace_id,
-                    "extra_fields": {"message": call.params.get("message", "")},
-                },
-            )
-            result = {"status": "notified"}
-        else:
-            raise HTTPException(status_code=400, detail="Unknown method")
-    except HTTPException:
-        raise
-    except Exception as exc:  # pragma: no cover
-        logger.exception("MCP tool error", extra={"traceId": trace_id})
-        raise HTTPException(status_code=500, detail=str(exc))
-
-    logger.info(
-        "MCP call executed",
-        extra={"traceId": trace_id, "extra_fields": {"method": call.method}},
-    )
+        result = await acall_tool(call.method, call.params, trace_id, token)
+    except McpToolError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=exc.detail)
     return {"result": result}
+
+
+@app.get("/mcp/knowledge")
+async def knowledge_stats() -> Dict[str, Any]:
+    return knowledge_base.stats()
+
+
+@app.post("/mcp/batch")
+async def handle_mcp_batch(batch: McpBatchCall, request: Request):
+    """
+    Run an ordered list of calls under one token and traceId.
+
+    Each entry reports the status code and body `/mcp` would have returned for
+    that call. Execution stops at the first failing call, so `results` may be
+    shorter than `calls`.
+    """
+    trace_id = batch.traceId
+    token = _authorize(batch.token, request, trace_id)
+    results, completed = await arun_batch(
+        [call.model_dump() for call in batch.calls], trace_id, token
+    )
+    return {"results": results, "completed": completed}
@@ -0,0 +1,362 @@
+"""MCP tool registry shared by the HTTP server and the in-process transport."""
+
+import os
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from ..core.knowledge import knowledge_base
+from ..infra.logging_utils import configure_logger
+from ..infra.ngsi_client import (
+    aget_traffic_signal,
+    aquery_traffic_signals,
+    aupdate_priority_corridor,
+    aupdate_priority_corridors,
+    get_traffic_signal,
+    query_traffic_signals,
+    update_priority_corridor,
+    update_priority_corridors,
+)
+
+# Same component as the server so traces look identical whichever transport is used.
+logger = configure_logger("mcp_server")
+
+USER_TOKEN = os.getenv("USER_TOKEN", "user-token")
+# Answer setPriorityCorridor(s) without writing to Orion for signals the knowledge
+# base shows already at the requested value (the write would only echo a
+# notification).
+SKIP_UNCHANGED_WRITES = os.getenv("SKIP_UNCHANGED_WRITES", "true").lower() == "true"
+
+
+class McpToolError(Exception):
+    """A tool call failure with the HTTP status `/mcp` answers with."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class McpTool(NamedTuple):
+    handler: Callable[[Dict[str, Any], str, str], Any]
+    ahandler: Callable[[Dict[str, Any], str, str], Awaitable[Any]]
+
+
+TOOLS: Dict[str, McpTool] = {}
+
+
+def register_tool(
+    name: str,
+    handler: Callable[[Dict[str, Any], str, str], Any],
+    ahandler: Callable[[Dict[str, Any], str, str], Awaitable[Any]],
+) -> None:
+    TOOLS[name] = McpTool(handler=handler, ahandler=ahandler)
+
+
+def authorize(token: Optional[str], trace_id: str) -> str:
+    if token != USER_TOKEN:
+        logger.warning("Unauthorized MCP call", extra={"traceId": trace_id})
+        raise McpToolError(401, "Invalid token")
+    return token
+
+
+def _lookup(method: str) -> McpTool:
+    tool = TOOLS.get(method)
+    if tool is None:
+        raise McpToolError(400, "Unknown method")
+    return tool
+
+
+def _log_executed(method: str, trace_id: str) -> None:
+    logger.info(
+        "MCP call executed",
+        extra={"traceId": trace_id, "extra_fields": {"method": method}},
+    )
+
+
+def call_tool(method: str, params: Dict[str, Any], trace_id: str, token: str) -> Any:
+    """Run one already-authorized call; raises McpToolError on failure."""
+    tool = _lookup(method)
+    try:
+        result = tool.handler(params, trace_id, token)
+    except McpToolError:
+        raise
+    except Exception as exc:  # pragma: no cover
+        logger.exception("MCP tool error", extra={"traceId": trace_id})
+        raise McpToolError(500, str(exc))
+    _log_executed(method, trace_id)
+    return result
+
+
+async def acall_tool(
+    method: str, params: Dict[str, Any], trace_id: str, token: str
+) -> Any:
+    """Async `call_tool`."""
+    tool = _lookup(method)
+    try:
+        result = await tool.ahandler(params, trace_id, token)
+    except McpToolError:
+        raise
+    except Exception as exc:  # pragma: no cover
+        logger.exception("MCP tool error", extra={"traceId": trace_id})
+        raise McpToolError(500, str(exc))
+    _log_executed(method, trace_id)
+    return result
+
+
+def _batch_entry(method: str, status_code: int, body: Dict[str, Any]) -> Dict[str, Any]:
+    return {"method": method, "status_code": status_code, "body": body}
+
+
+def _log_batch(
+    calls: List[Dict[str, Any]], results: List[Dict[str, Any]], trace_id: str
+) -> bool:
+    completed = len(results) == len(calls) and results[-1]["status_code"] < 400
+    logger.info(
+        "MCP batch executed",
+        extra={
+            "traceId": trace_id,
+            "extra_fields": {
+                "calls": len(calls),
+                "executed": len(results),
+                "completed": completed,
+            },
+        },
+    )
+    return completed
+
+
+def run_batch(
+    calls: List[Dict[str, Any]], trace_id: str, token: str
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """Run calls in order, stopping at the first failure; returns (entries, completed)."""
+    results: List[Dict[str, Any]] = []
+    for call in calls:
+        try:
+            result = call_tool(call["method"], call["params"], trace_id, token)
+        except McpToolError as exc:
+            results.append(
+                _batch_entry(call["method"], exc.status_code, {"detail": exc.detail})
+            )
+            break
+        results.append(_batch_entry(call["method"], 200, {"result": result}))
+    return results, _log_batch(calls, results, trace_id)
+
+
+async def arun_batch(
+    calls: List[Dict[str, Any]], trace_id: str, token: str
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """Async `run_batch`."""
+    results: List[Dict[str, Any]] = []
+    for call in calls:
+        try:
+            result = await acall_tool(call["method"], call["params"], trace_id, token)
+        except McpToolError as exc:
+            results.append(
+                _batch_entry(call["method"], exc.status_code, {"detail": exc.detail})
+            )
+            break
+        results.append(_batch_entry(call["method"], 200, {"result": result}))
+    return results, _log_batch(calls, results, trace_id)
+
+
+def _known_traffic_signal(entity_id: str, trace_id: str) -> Optional[Dict[str, Any]]:
+    entity = knowledge_base.fresh(entity_id)
+    if entity is not None:
+        logger.info(
+            "Served TrafficSignal from knowledge base",
+            extra={"traceId": trace_id, "extra_fields": {"entity_id": entity_id}},
+        )
+    return entity
+
+
+def _get_traffic_signal_state(params: Dict[str, Any], trace_id: str, token: str) -> Any:
+    entity = _known_traffic_signal(params["entity_id"], trace_id)
+    if entity is None:
+        entity = get_traffic_signal(params["entity_id"], trace_id, token)
+        knowledge_base.observe(entity, complete=True)
+    return entity
+
+
+async def _aget_traffic_signal_state(
+    params: Dict[str, Any], trace_id: str, token: str
+) -> Any:
+    entity = _known_traffic_signal(params["entity_id"], trace_id)
+    if entity is None:
+        entity = await aget_traffic_signal(params["entity_id"], trace_id, token)
+        knowledge_base.observe(entity, complete=True)
+    return entity
+
+
+def _record_corridor(entity_ids: List[str], value: str) -> None:
+    for entity_id in entity_ids:
+        knowledge_base.record_write(
+            entity_id, {"priorityCorridor": {"type": "Text", "value": value}}
+        )
+
+
+def _changed_corridors(entity_ids: List[str], value: str, trace_id: str) -> List[str]:
+    """The entities whose corridor the write would change, in order."""
+    if not SKIP_UNCHANGED_WRITES:
+        return entity_ids
+    changed = [
+        entity_id
+        for entity_id in entity_ids
+        if not knowledge_base.unchanged(entity_id, {"priorityCorridor": value})
+    ]
+    if len(changed) < len(entity_ids):
+        logger.info(
+            "Skipped unchanged priorityCorridor writes",
+            extra={
+                "traceId": trace_id,
+                "extra_fields": {
+                    "entity_ids": [e for e in entity_ids if e not in changed],
+                    "value": value,
+                },
+            },
+        )
+    return changed
+
+
+_UNCHANGED = {"result": "unchanged", "skipped": True}
+
+
+def _set_priority_corridor(params: Dict[str, Any], trace_id: str, token: str) -> Any:
+    entity_ids = [params["entity_id"]]
+    if not _changed_corridors(entity_ids, params["value"], trace_id):
+        return dict(_UNCHANGED)
+    result = update_priority_corridor(
+        params["entity_id"], params["value"], trace_id, token
+    )
+    _record_corridor(entity_ids, params["value"])
+    return result
+
+
+async def _aset_priority_corridor(
+    params: Dict[str, Any], trace_id: str, token: str
+) -> Any:
+    entity_ids = [params["entity_id"]]
+    if not _changed_corridors(entity_ids, params["value"], trace_id):
+        return dict(_UNCHANGED)
+    result = await aupdate_priority_corridor(
+        params["entity_id"], params["value"], trace_id, token
+    )
+    _record_corridor(entity_ids, params["value"])
+    return result
+
+
+def _set_priority_corridors(params: Dict[str, Any], trace_id: str, token: str) -> Any:
+    entity_ids = list(dict.fromkeys(params["entity_ids"]))
+    changed = _changed_corridors(entity_ids, params["value"], trace_id)
+    if not changed:
+        return {**_UNCHANGED, "unchanged": len(entity_ids)}
+    result = update_priority_corridors(changed, params["value"], trace_id, token)
+    _record_corridor(changed, params["value"])
+    return {**result, "unchanged": len(entity_ids) - len(changed)}
+
+
+async def _aset_priority_corridors(
+    params: Dict[str, Any], trace_id: str, token: str
+) -> Any:
+    entity_ids = list(dict.fromkeys(params["entity_ids"]))
+    changed = _changed_corridors(entity_ids, params["value"], trace_id)
+    if not changed:
+        return {**_UNCHANGED, "unchanged": len(entity_ids)}
+    result = await aupdate_priority_corridors(changed, params["value"], trace_id, token)
+    _record_corridor(changed, params["value"])
+    return {**result, "unchanged": len(entity_ids) - len(changed)}
+
+
+def _known_traffic_signals(
+    entity_ids: List[str], trace_id: str
+) -> Dict[str, Dict[str, Any]]:
+    known = {}
+    for entity_id in entity_ids:
+        entity = knowledge_base.fresh(entity_id)
+        if entity is not None:
+            known[entity_id] = entity
+    if known:
+        logger.info(
+            "Served TrafficSignals from knowledge base",
+            extra={"traceId": trace_id, "extra_fields": {"entities": len(known)}},
+        )
+    return known
+
+
+def _traffic_signal_states(
+    entity_ids: List[str],
+    known: Dict[str, Dict[str, Any]],
+    fetched: List[Dict[str, Any]],
+) -> Dict[str, Any]:
+    for entity in fetched:
+        knowledge_base.observe(entity, complete=True)
+        known[entity["id"]] = entity
+    return {
+        "entities": [known[e] for e in entity_ids if e in known],
+        "missing": [e for e in entity_ids if e not in known],
+    }
+
+
+def _get_traffic_signal_states(
+    params: Dict[str, Any], trace_id: str, token: str
+) -> Any:
+    entity_ids = list(dict.fromkeys(params["entity_ids"]))
+    known = _known_traffic_signals(entity_ids, trace_id)
+    unknown = [e for e in entity_ids if e not in known]
+    fetched = query_traffic_signals(unknown, trace_id, token) if unknown else []
+    return _traffic_signal_states(entity_ids, known, fetched)
+
+
+async def _aget_traffic_signal_states(
+    params: Dict[str, Any], trace_id: str, token: str
+) -> Any:
+    entity_ids = list(dict.fromkeys(params["entity_ids"]))
+    known = _known_traffic_signals(entity_ids, trace_id)
+    unknown = [e for e in entity_ids if e not in known]
+    fetched = await aquery_traffic_signals(unknown, trace_id, token) if unknown else []
+    return _traffic_signal_states(entity_ids, known, fetched)
+
+
+def _notify_traffic_agents(params: Dict[str, Any], trace_id: str, token: str) -> Any:
+    logger.info(
+        "Notify traffic agents",
+        extra={
+            "traceId": trace_id,
+            "extra_fields": {"message": params.get("message", "")},
+        },
+    )
+    return {"status": "notified"}
+
+
+async def _anotify_traffic_agents(
+    params: Dict[str, Any], trace_id: str, token: str
+) -> Any:
+    return _notify_traffic_agents(params, trace_id, token)
+
+
+def _observe_entities(params: Dict[str, Any], trace_id: str, token: str) -> Any:
+    """Record entity state the monitor was notified of in the knowledge base."""
+    entities = params["entities"]
+    if not isinstance(entities, list):
+        raise McpToolError(400, "observeEntities needs a list of entities")
+    observed = sum(
+        1
+        for entity in entities
+        if isinstance(entity, dict) and knowledge_base.observe(entity)
+    )
+    return {"observed": observed, "dropped": len(entities) - observed}
+
+
+async def _aobserve_entities(params: Dict[str, Any], trace_id: str, token: str) -> Any:
+    return _observe_entities(params, trace_id, token)
+
+
+register_tool(
+    "getTrafficSignalState", _get_traffic_signal_state, _aget_traffic_signal_state
+)
+register_tool("setPriorityCorridor", _set_priority_corridor, _aset_priority_corridor)
+register_tool("notifyTrafficAgents", _notify_traffic_agents, _anotify_traffic_agents)
+register_tool(
+    "getTrafficSignalStates", _get_traffic_signal_states, _aget_traffic_signal_states
+)
+register_tool("setPriorityCorridors", _set_priority_corridors, _aset_priority_corridors)
+# Not a plan action: the monitor forwards notified state to the tools' process.
+register_tool("observeEntities", _observe_entities, _aobserve_entities)
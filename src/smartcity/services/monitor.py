@@ -1,35 +1,115 @@
 from __future__ import annotations
 
+import asyncio
 import os
 import uuid
-from typing import Any, Dict, List
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
 
-from fastapi import Body, FastAPI
+from fastapi import Body, FastAPI, HTTPException, Response
 
-from ..core.executor import execute_candidate_plan
+from ..core.coalescing import EventCoalescer, merge_events
+from ..core.executor import aexecute_candidate_plans, aobserve_entities
+from ..core.knowledge import knowledge_base
+from ..core.mcp_transport import MCP_SERVER_URL, MCP_TRANSPORT
 from ..core.models import MonitorEvent
-from ..core.planner import build_candidate_plan
+from ..core.llm_planner import llm_cache_stats, warm_up_llm_client
+from ..core.planner import (
+    PRIORITY_CLASSES,
+    abuild_candidate_plan,
+    event_priority,
+    events_priority,
+)
+from ..core.policy_engine import (
+    OPA_URL,
+    POLICY_BACKEND,
+    decision_cache_stats,
+    invalidate_decision_cache,
+    opa_breaker_stats,
+    reload_policies,
+)
+from ..infra.http_pool import (
+    HTTP_WARMUP_ENABLED,
+    aclose_async_client,
+    async_pool_stats,
+    awarm_up,
+    pool_stats,
+)
 from ..infra.logging_utils import configure_logger
-from ..infra.ngsi_client import create_subscription
+from ..infra.ngsi_client import ORION_BASE_URL, create_subscription
+from ..infra.work_queue import QueueFullError, WorkQueue
 
 logger = configure_logger("monitor")
-app = FastAPI(title="Monitor Service")
 
 MONITOR_CALLBACK_URL = os.getenv(
     "MONITOR_CALLBACK_URL", "http://localhost:8010/monitor/notify"
 )
 TRAFFIC_SIGNAL_ID = os.getenv("TRAFFIC_SIGNAL_ID", "TrafficSignal:001")
+# Notifications wait in a bounded queue for a pool of MAPE-K workers and are
+# acknowledged at once (0 = run the loop inline and reply with its results).
+# A full queue answers MONITOR_QUEUE_FULL_STATUS (503 or 429) with Retry-After.
+MONITOR_QUEUE_MAX_SIZE = int(os.getenv("MONITOR_QUEUE_MAX_SIZE", "256"))
+MONITOR_QUEUE_WORKERS = int(os.getenv("MONITOR_QUEUE_WORKERS", "8"))
+MONITOR_QUEUE_FULL_STATUS = int(os.getenv("MONITOR_QUEUE_FULL_STATUS", "503"))
+MONITOR_QUEUE_RETRY_AFTER_SECONDS = int(
+    os.getenv("MONITOR_QUEUE_RETRY_AFTER_SECONDS", "1")
+)
+# On shutdown, how long queued notifications may still run.
+MONITOR_QUEUE_DRAIN_SECONDS = float(os.getenv("MONITOR_QUEUE_DRAIN_SECONDS", "10"))
+# Notifications are scheduled by their most urgent event (ambulance first, then
+# by risk level). Each class gets its own MONITOR_QUEUE_MAX_SIZE slots, and every
+# MONITOR_QUEUE_AGING_MS of waiting lifts a notification one class (0 = never).
+MONITOR_QUEUE_AGING_MS = float(os.getenv("MONITOR_QUEUE_AGING_MS", "1000"))
+# Events for the same entity arriving within this window are merged into one
+# event with the most severe flags before planning (0 = plan every event).
+MONITOR_COALESCE_WINDOW_MS = float(os.getenv("MONITOR_COALESCE_WINDOW_MS", "0"))
 
+_work_queue = (
+    WorkQueue(
+        "mape-k",
+        MONITOR_QUEUE_MAX_SIZE,
+        MONITOR_QUEUE_WORKERS,
+        logger,
+        classes=PRIORITY_CLASSES,
+        aging_ms=MONITOR_QUEUE_AGING_MS,
+    )
+    if MONITOR_QUEUE_MAX_SIZE > 0
+    else None
+)
 
-def _notification_to_event(notification: Dict[str, Any]) -> MonitorEvent:
-    data: List[Dict[str, Any]] = notification.get("data", [])
-    if not data:
-        return MonitorEvent(event_type="empty")
 
-    item = data[0]
+@asynccontextmanager
+async def _lifespan(_: FastAPI):
+    if HTTP_WARMUP_ENABLED:
+        # Over HTTP the MCP server makes the Orion calls and warms its own pool.
+        if MCP_TRANSPORT == "http":
+            await awarm_up([MCP_SERVER_URL, OPA_URL])
+        else:
+            await awarm_up([OPA_URL, ORION_BASE_URL])
+    await asyncio.to_thread(warm_up_llm_client)
+    if _work_queue is not None:
+        _work_queue.start()
+    yield
+    if _coalescer is not None:
+        await _coalescer.flush_all()
+    if _work_queue is not None:
+        await _work_queue.stop(MONITOR_QUEUE_DRAIN_SECONDS)
+    await aclose_async_client()
+
+
+app = FastAPI(title="Monitor Service", lifespan=_lifespan)
+
+
+def _entity_to_event(item: Dict[str, Any]) -> MonitorEvent:
     weather = str(item.get("weather", "normal")).lower()
     crowd = str(item.get("crowd", "normal")).lower()
     event_type = str(item.get("eventType", "combined")).lower()
+    corridor_signals = item.get("corridorSignals")
+    if isinstance(corridor_signals, dict):
+        corridor_signals = corridor_signals.get("value")
+    if not isinstance(corridor_signals, list):
+        corridor_signals = None
 
     return MonitorEvent(
         event_type=event_type,
@@ -39,34 +119,289 @@ def _notification_to_event(notification: Dict[str, Any]) -> MonitorEvent:
         crowd_level=crowd,
         location=str(item.get("location", "unknown")),
         notes=str(item.get("notes", "")) or None,
+        entity_id=item.get("id") or None,
+        corridor_signals=[str(signal) for signal in corridor_signals or []] or None,
     )
 
 
-@app.post("/monitor/notify")
-async def handle_notification(payload: Dict[str, Any] = Body(...)) -> Dict[str, Any]:
-    trace_id = str(uuid.uuid4())
-    event = _notification_to_event(payload)
-    plan = build_candidate_plan(event, trace_id)
-    report = execute_candidate_plan(plan)
-    logger.info(
-        "MAPE-K loop completed from monitor event",
-        extra={
-            "traceId": trace_id,
-            "extra_fields": {
-                "scenario": event.event_type,
+def _notification_to_events(notification: Dict[str, Any]) -> List[MonitorEvent]:
+    """One event per entity in `data`, in notification order."""
+    data: List[Dict[str, Any]] = notification.get("data", [])
+    if not data:
+        return [MonitorEvent(event_type="empty")]
+    return [_entity_to_event(item) for item in data]
+
+
+async def _run_mape_k(
+    events: List[MonitorEvent], trace_ids: List[str]
+) -> List[Dict[str, Any]]:
+    """
+    Run the MAPE-K loop for the events of one notification. Events are planned
+    concurrently (their LLM calls share a micro-batch), evaluated with one
+    policy batch and executed concurrently; plans for the same entity run in
+    notification order.
+    """
+    plans = await asyncio.gather(
+        *(
+            abuild_candidate_plan(event, trace_id)
+            for event, trace_id in zip(events, trace_ids)
+        )
+    )
+    entity_ids = [event.entity_id or TRAFFIC_SIGNAL_ID for event in events]
+    reports = await aexecute_candidate_plans(plans, order_keys=entity_ids)
+
+    results = []
+    for event, entity_id, report in zip(events, entity_ids, reports):
+        logger.info(
+            "MAPE-K loop completed from monitor event",
+            extra={
+                "traceId": report.trace_id,
+                "extra_fields": {
+                    "entity_id": entity_id,
+                    "scenario": event.event_type,
+                    "executed": report.executed,
+                    "policy_mode": report.policy.approval_mode.value,
+                },
+            },
+        )
+        results.append(
+            {
+                "entityId": entity_id,
+                "traceId": report.trace_id,
+                "planId": report.plan_id,
                 "executed": report.executed,
-                "policy_mode": report.policy.approval_mode.value,
+                "error": report.error,
+                "policy": report.policy.model_dump(),
+            }
+        )
+    return results
+
+
+async def _observe_and_run(
+    entities: List[Dict[str, Any]], events: List[MonitorEvent], trace_ids: List[str]
+) -> List[Dict[str, Any]]:
+    """
+    Hand the notified entity state to the knowledge base next to the MCP
+    tools, then run the MAPE-K loop. Queued, this is the worker's job, so
+    only admitted notifications reach the knowledge base and the 202 does
+    not wait for it.
+    """
+    await aobserve_entities(entities, trace_ids[0])
+    return await _run_mape_k(events, trace_ids)
+
+
+# Notified entities per open coalescing window, observed when its merged
+# event runs.
+_window_entities: Dict[str, List[Dict[str, Any]]] = {}
+
+
+async def _dispatch_coalesced(
+    event: MonitorEvent, trace_ids: List[str]
+) -> Optional[Dict[str, Any]]:
+    """
+    Run (or queue) the MAPE-K loop for a merged event under its first trace
+    id; queued, it takes the slot its window reserved.
+    """
+    entities = _window_entities.pop(event.entity_id or TRAFFIC_SIGNAL_ID, [])
+    if _work_queue is None:
+        return (await _observe_and_run(entities, [event], trace_ids[:1]))[0]
+    try:
+        _work_queue.submit(
+            partial(_observe_and_run, entities, [event], trace_ids[:1]),
+            trace_ids[0],
+            event_priority(event),
+            reserved=True,
+        )
+    except QueueFullError as exc:
+        logger.error(
+            "Coalesced event dropped",
+            extra={
+                "traceId": trace_ids[0],
+                "extra_fields": {"events": len(trace_ids), "error": str(exc)},
             },
-        },
+        )
+    return None
+
+
+_coalescer = (
+    EventCoalescer(MONITOR_COALESCE_WINDOW_MS, _dispatch_coalesced, logger)
+    if MONITOR_COALESCE_WINDOW_MS > 0
+    else None
+)
+
+
+def _reserve_windows(
+    entity_ids: List[str], events: List[MonitorEvent], trace_ids: List[str]
+) -> None:
+    """
+    Keep one queue slot reserved per open coalescing window, in the class of
+    its merged event, before the events join their windows: a window opened
+    or moved to a more urgent class by these events reserves a slot there
+    and gives back its old one. Raises QueueFullError, holding nothing new,
+    when a class is full.
+    """
+    windows: Dict[str, Tuple[List[MonitorEvent], List[MonitorEvent], str]] = {}
+    for entity_id, event, trace_id in zip(entity_ids, events, trace_ids):
+        if entity_id not in windows:
+            windows[entity_id] = (_coalescer.window_events(entity_id), [], trace_id)
+        windows[entity_id][1].append(event)
+    moves = []
+    for waiting, added, trace_id in windows.values():
+        old = event_priority(merge_events(waiting)) if waiting else None
+        new = event_priority(merge_events(waiting + added))
+        if new != old:
+            moves.append((old, new, trace_id))
+    reserved: List[str] = []
+    try:
+        for _, new, trace_id in moves:
+            _work_queue.reserve(new, trace_id)
+            reserved.append(new)
+    except QueueFullError:
+        for priority in reserved:
+            _work_queue.release(priority)
+        raise
+    for old, _, _ in moves:
+        if old is not None:
+            _work_queue.release(old)
+
+
+async def _coalesce(
+    entities: List[Dict[str, Any]], events: List[MonitorEvent], trace_ids: List[str]
+) -> List[Dict[str, Any]]:
+    """
+    Add the events to their entities' coalescing windows. Inline, wait for the
+    merged runs and return their results; queued, reserve the windows' queue
+    slots (QueueFullError when a class is full) and acknowledge right away.
+    """
+    entity_ids = [event.entity_id or TRAFFIC_SIGNAL_ID for event in events]
+    if _work_queue is not None:
+        _reserve_windows(entity_ids, events, trace_ids)
+    for entity in entities:
+        key = entity.get("id") or TRAFFIC_SIGNAL_ID
+        _window_entities.setdefault(key, []).append(entity)
+    futures = [
+        _coalescer.add(entity_id, event, trace_id)
+        for entity_id, event, trace_id in zip(entity_ids, events, trace_ids)
+    ]
+    if _work_queue is None:
+        return list(await asyncio.gather(*futures))
+    return [
+        {"entityId": entity_id, "traceId": trace_id}
+        for entity_id, trace_id in zip(entity_ids, trace_ids)
+    ]
+
+
+def _queue_full(exc: QueueFullError) -> HTTPException:
+    return HTTPException(
+        status_code=MONITOR_QUEUE_FULL_STATUS,
+        detail=str(exc),
+        headers={"Retry-After": str(MONITOR_QUEUE_RETRY_AFTER_SECONDS)},
     )
+
+
+@app.post("/monitor/notify")
+async def handle_notification(
+    response: Response, payload: Dict[str, Any] = Body(...)
+) -> Dict[str, Any]:
+    """
+    Queue the notification for the MAPE-K workers, in the class of its most
+    urgent event, and acknowledge it with one trace id per entity (202).
+    Without the queue, run the loop inline and return each entity's result.
+    With a coalescing window, events first wait to be merged per entity; each
+    open window holds a queue slot, so a full class is answered before the
+    events are acknowledged. The notified entity state reaches the knowledge
+    base next to the MCP tools when the notification's job runs, so a
+    rejected notification is never observed.
+    """
+    entities = [
+        entity for entity in payload.get("data", []) if isinstance(entity, dict)
+    ]
+    events = _notification_to_events(payload)
+    trace_ids = [str(uuid.uuid4()) for _ in events]
+    if _coalescer is not None:
+        try:
+            results = await _coalesce(entities, events, trace_ids)
+        except QueueFullError as exc:
+            raise _queue_full(exc) from None
+        if _work_queue is None:
+            return {"results": results}
+        response.status_code = 202
+        return {"queued": True, "coalesced": True, "results": results}
+    if _work_queue is None:
+        return {"results": await _observe_and_run(entities, events, trace_ids)}
+
+    priority = events_priority(events)
+    try:
+        _work_queue.submit(
+            partial(_observe_and_run, entities, events, trace_ids),
+            trace_ids[0],
+            priority,
+        )
+    except QueueFullError as exc:
+        raise _queue_full(exc) from None
+    response.status_code = 202
     return {
-        "traceId": trace_id,
-        "planId": report.plan_id,
-        "executed": report.executed,
-        "policy": report.policy.model_dump(),
+        "queued": True,
+        "priority": priority,
+        "results": [
+            {"entityId": event.entity_id or TRAFFIC_SIGNAL_ID, "traceId": trace_id}
+            for event, trace_id in zip(events, trace_ids)
+        ],
     }
 
 
+@app.get("/monitor/queue")
+async def work_queue_stats() -> Dict[str, Any]:
+    if _work_queue is None:
+        return {"enabled": False}
+    return {"enabled": True, **_work_queue.stats()}
+
+
+@app.get("/monitor/coalescing")
+async def coalescing_stats() -> Dict[str, Any]:
+    if _coalescer is None:
+        return {"enabled": False}
+    return {"enabled": True, **_coalescer.stats()}
+
+
+@app.get("/monitor/knowledge")
+async def knowledge_stats() -> Dict[str, Any]:
+    """Knowledge base counters of this process (the MCP tools' with `inproc`)."""
+    return {"transport": MCP_TRANSPORT, **knowledge_base.stats()}
+
+
+@app.get("/monitor/http-pool")
+async def http_pool_stats() -> Dict[str, Any]:
+    return {"pools": pool_stats(), "async_pools": async_pool_stats()}
+
+
+@app.get("/monitor/opa-breaker")
+async def opa_breaker_state() -> Dict[str, Any]:
+    return opa_breaker_stats()
+
+
+@app.get("/monitor/llm-cache")
+async def llm_plan_cache_stats() -> Dict[str, Any]:
+    return llm_cache_stats()
+
+
+@app.get("/monitor/policy-cache")
+async def policy_cache_stats() -> Dict[str, Any]:
+    return decision_cache_stats()
+
+
+@app.post("/monitor/policy-cache/invalidate")
+async def policy_cache_invalidate() -> Dict[str, Any]:
+    invalidate_decision_cache("invalidated via monitor API")
+    return decision_cache_stats()
+
+
+@app.post("/monitor/policy/reload")
+async def policy_reload() -> Dict[str, Any]:
+    reload_policies()
+    return {"backend": POLICY_BACKEND, "cache": decision_cache_stats()}
+
+
 def register_default_subscription() -> Dict[str, Any]:
     trace_id = str(uuid.uuid4())
     subscription = {
@@ -0,0 +1,122 @@
+"""Batch rule-based planning must match the per-event planner."""
+
+import os
+import sys
+from itertools import product
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
+
+from smartcity.core import executor, planner, policy_engine
+from smartcity.core.fake_llm import plan_for_event
+from smartcity.core.knowledge import KnowledgeBase
+from smartcity.core.llm_planner import _event_data
+from smartcity.core.mcp_transport import InProcessMcpTransport
+from smartcity.core.models import ActionType, MonitorEvent, validate_plan_dict
+from smartcity.services import mcp_tools
+
+
+def test_bulk_plans_match_per_event_plans():
+    crowd_levels = ("normal", "high", "dense", "low", "HIGH", "Dense", "")
+    events = [
+        MonitorEvent(
+            ambulance_detected=ambulance,
+            heavy_rain=rain,
+            flood_risk=flood,
+            crowd_level=crowd,
+            entity_id=entity_id,
+            corridor_signals=corridor_signals,
+        )
+        for ambulance, rain, flood, crowd, entity_id, corridor_signals in product(
+            (False, True),
+            (False, True),
+            (False, True),
+            crowd_levels,
+            (None, "TrafficSignal:002"),
+            (None, ["TrafficSignal:002", "TrafficSignal:003"]),
+        )
+    ]
+    events = events[::-1] + events
+    trace_ids = [f"bulk-{index}" for index in range(len(events))]
+
+    bulk = planner._rule_based_plans(events, trace_ids)
+
+    assert len(bulk) == len(events)
+    assert len({plan.plan_id for plan in bulk}) == len(events)
+    for event, trace_id, plan in zip(events, trace_ids, bulk):
+        expected = planner._rule_based_plan(event, trace_id)
+        assert plan.model_dump(exclude={"plan_id"}) == expected.model_dump(
+            exclude={"plan_id"}
+        )
+
+
+def test_build_candidate_plans_keeps_input_order():
+    events = [MonitorEvent(ambulance_detected=True), MonitorEvent(), MonitorEvent()]
+    plans = planner.build_candidate_plans(events)
+    assert [plan.scenario for plan in plans] == [
+        "ambulance-only",
+        "baseline",
+        "baseline",
+    ]
+    assert len({plan.telemetry.trace_id for plan in plans}) == 3
+    assert planner.build_candidate_plans([]) == []
+
+
+def test_bulk_step_plan_runs_through_executor_and_mcp_tools(monkeypatch):
+    route = ["TrafficSignal:001", "TrafficSignal:002", "TrafficSignal:003"]
+    event = MonitorEvent(
+        ambulance_detected=True, entity_id=route[0], corridor_signals=route
+    )
+    queries, writes = [], []
+
+    def query_traffic_signals(entity_ids, trace_id, token):
+        queries.append(list(entity_ids))
+        return [{"id": e, "type": "TrafficSignal"} for e in entity_ids]
+
+    def update_priority_corridors(entity_ids, value, trace_id, token):
+        writes.append((list(entity_ids), value))
+        return {"result": "updated", "updated": len(entity_ids)}
+
+    monkeypatch.setattr(mcp_tools, "query_traffic_signals", query_traffic_signals)
+    monkeypatch.setattr(
+        mcp_tools, "update_priority_corridors", update_priority_corridors
+    )
+    monkeypatch.setattr(mcp_tools, "knowledge_base", KnowledgeBase(1000, 100))
+    monkeypatch.setattr(executor, "transport", InProcessMcpTransport())
+    monkeypatch.setattr(executor, "MCP_CALL_MODE", "steps")
+    monkeypatch.setattr(policy_engine, "POLICY_BACKEND", "fallback")
+
+    llm_plan = validate_plan_dict(
+        {
+            **plan_for_event(_event_data(event)),
+            "plan_id": "p",
+            "telemetry": {"traceId": "t"},
+        }
+    )
+    rule_plan = planner._rule_based_plan(event, "trace-green-wave")
+    for plan in (llm_plan, rule_plan):
+        assert [step.action for step in plan.steps[:2]] == [
+            ActionType.GET_TRAFFIC_SIGNAL_STATES,
+            ActionType.SET_PRIORITY_CORRIDORS,
+        ]
+
+    report = executor.execute_candidate_plan(rule_plan)
+
+    assert report.executed and report.error is None
+    assert [result.status_code for result in report.step_results] == [200] * 3
+    assert queries == [route]
+    assert writes == [(route, "emergency")]
+
+
+def test_template_caches_are_bounded(monkeypatch):
+    monkeypatch.setattr(planner, "_DECISION_TEMPLATES", planner._TemplateCache(4))
+    monkeypatch.setattr(planner, "_RULE_BASED_TEMPLATES", planner._TemplateCache(4))
+    events = [MonitorEvent(entity_id=f"TrafficSignal:{index}") for index in range(20)]
+
+    plans = planner._rule_based_plans(events, ["t"] * len(events))
+
+    assert [plan.steps[0].params["entity_id"] for plan in plans] == [
+        event.entity_id for event in events
+    ]
+    assert len(planner._DECISION_TEMPLATES) == 4
+    assert len(planner._RULE_BASED_TEMPLATES) == 4
@@ -0,0 +1,166 @@
+"""State machine of the OPA circuit breaker and how policy calls feed it."""
+
+import asyncio
+import logging
+import os
+import sys
+
+import httpx
+import pytest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
+
+from smartcity.core import policy_engine
+from smartcity.core.circuit_breaker import (
+    CircuitBreaker,
+    CircuitOpenError,
+    CircuitState,
+)
+from smartcity.core.models import MonitorEvent
+from smartcity.core.planner import build_candidate_plan
+
+
+def _breaker(threshold=2, cooldown=0.0):
+    return CircuitBreaker(
+        "test",
+        failure_threshold=threshold,
+        cooldown_seconds=cooldown,
+        logger=logging.getLogger(),
+    )
+
+
+def test_opens_after_threshold_and_closes_after_trial():
+    breaker = _breaker(threshold=2, cooldown=60)
+    assert breaker.before_call() is False
+    breaker.record_failure("down")
+    assert breaker.state == CircuitState.CLOSED
+    breaker.record_failure("down")
+    assert breaker.state == CircuitState.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.cooldown_seconds = 0
+    assert breaker.before_call() is True
+    assert breaker.state == CircuitState.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # only one trial at a time
+    breaker.record_success()
+    breaker.release(True)
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.stats()["consecutive_failures"] == 0
+
+
+def test_failed_trial_reopens():
+    breaker = _breaker(threshold=1)
+    breaker.record_failure("down")
+    trial = breaker.before_call()
+    breaker.record_failure("still down")
+    breaker.release(trial)
+    assert breaker.state == CircuitState.OPEN
+
+
+def test_release_frees_trial_without_an_outcome():
+    breaker = _breaker(threshold=1)
+    breaker.record_failure("down")
+    trial = breaker.before_call()
+    breaker.release(trial)
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert breaker.before_call() is True
+
+
+class _FakeClient:
+    def __init__(self, handler):
+        self._handler = handler
+
+    async def post(self, url, **kwargs):
+        return await self._handler(httpx.Request("POST", url))
+
+
+@pytest.fixture
+def opa(monkeypatch):
+    breaker = _breaker(threshold=1)
+    monkeypatch.setattr(policy_engine, "OPA_URL", "http://opa.test")
+    monkeypatch.setattr(policy_engine, "_opa_breaker", breaker)
+
+    def use(handler):
+        monkeypatch.setattr(
+            policy_engine, "get_async_client", lambda: _FakeClient(handler)
+        )
+        return breaker
+
+    return use
+
+
+def _call_opa():
+    plan = build_candidate_plan(MonitorEvent(), "trace-breaker")
+    return policy_engine._aopa_policy(plan, policy_engine.USER_TOKEN, "trace-breaker")
+
+
+def test_cancelled_trial_is_released(opa):
+    async def hang(request):
+        await asyncio.sleep(60)
+
+    breaker = opa(hang)
+    breaker.record_failure("down")
+
+    async def scenario():
+        task = asyncio.ensure_future(_call_opa())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert breaker.before_call() is True
+
+
+def test_evaluation_error_does_not_open(opa):
+    async def conflict(request):
+        return httpx.Response(
+            500,
+            json={
+                "code": "internal_error",
+                "message": "eval_conflict_error: complete rules must not "
+                "produce multiple outputs",
+            },
+            request=request,
+        )
+
+    breaker = opa(conflict)
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(_call_opa())
+    assert breaker.state == CircuitState.CLOSED
+
+
+@pytest.mark.parametrize(
+    "response_kwargs",
+    [
+        {"exc": httpx.ConnectError("refused")},
+        {"exc": httpx.ReadTimeout("slow")},
+        {"status": 503, "text": "unavailable"},
+    ],
+)
+def test_outages_open(opa, response_kwargs):
+    async def handler(request):
+        if "exc" in response_kwargs:
+            raise response_kwargs["exc"]
+        return httpx.Response(
+            response_kwargs["status"], text=response_kwargs["text"], request=request
+        )
+
+    breaker = opa(handler)
+    with pytest.raises(httpx.HTTPError):
+        asyncio.run(_call_opa())
+    assert breaker.state == CircuitState.OPEN
+
+
+def test_client_error_does_not_open(opa):
+    async def bad_request(request):
+        return httpx.Response(400, json={"code": "invalid_parameter"}, request=request)
+
+    breaker = opa(bad_request)
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(_call_opa())
+    assert breaker.state == CircuitState.CLOSED
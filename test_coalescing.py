@@ -0,0 +1,51 @@
+"""Per-entity coalescing of monitor events."""
+
+import asyncio
+import logging
+import os
+import sys
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
+
+from smartcity.core.coalescing import EventCoalescer, merge_events
+from smartcity.core.models import MonitorEvent
+
+
+def test_merge_keeps_most_severe_flags():
+    merged = merge_events(
+        [
+            MonitorEvent(ambulance_detected=True, crowd_level="high", notes="first"),
+            MonitorEvent(heavy_rain=True, crowd_level="dense", event_type="rain"),
+            MonitorEvent(crowd_level="low", location="Avenue 9"),
+        ]
+    )
+    assert merged.ambulance_detected and merged.heavy_rain and not merged.flood_risk
+    assert merged.crowd_level == "dense"
+    assert merged.location == "Avenue 9" and merged.notes == "first"
+    assert merged.event_type == "combined"
+
+
+def test_window_merges_per_entity():
+    async def scenario():
+        dispatched = []
+
+        async def dispatch(event, trace_ids):
+            dispatched.append((event, trace_ids))
+            return len(trace_ids)
+
+        coalescer = EventCoalescer(20, dispatch, logging.getLogger())
+        first = coalescer.add("A", MonitorEvent(), "t1")
+        coalescer.add("B", MonitorEvent(), "t2")
+        second = coalescer.add("A", MonitorEvent(flood_risk=True), "t3")
+        assert first is second
+        results = await asyncio.gather(first, second)
+        await coalescer.flush_all()
+        return dispatched, results, coalescer.stats()
+
+    dispatched, results, stats = asyncio.run(scenario())
+    merged = {trace_ids[0]: event for event, trace_ids in dispatched}
+    assert sorted(trace_ids for _, trace_ids in dispatched) == [["t1", "t3"], ["t2"]]
+    assert merged["t1"].flood_risk and not merged["t2"].flood_risk
+    assert results == [2, 2]
+    assert stats["dispatched"] == 2 and stats["coalescing_ratio"] == 1.5
@@ -0,0 +1,111 @@
+"""Policy decision cache: TTL, LRU eviction and what the cache key covers."""
+
+import os
+import sys
+import time
+
+import pytest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
+
+from smartcity.core import policy_engine
+from smartcity.core.decision_cache import DecisionCache
+from smartcity.core.models import (
+    ApprovalMode,
+    ApprovalRequest,
+    MonitorEvent,
+    PolicyDecision,
+    RiskLevel,
+)
+from smartcity.core.planner import build_candidate_plan
+
+
+def _decision(reason="ok"):
+    return PolicyDecision(
+        allowed=True,
+        risk_level=RiskLevel.LOW,
+        approval_mode=ApprovalMode.AUTO,
+        verdict_color="green",
+        reason=reason,
+        source="opa",
+    )
+
+
+def test_entries_expire_after_ttl():
+    cache = DecisionCache(max_size=4, ttl_seconds=0.05)
+    cache.put("key", _decision())
+    assert cache.get("key").reason == "ok"
+    assert cache.peek("key")
+
+    time.sleep(0.06)
+    assert not cache.peek("key")
+    assert cache.get("key") is None
+    stats = cache.stats()
+    assert (stats["size"], stats["hits"], stats["misses"]) == (0, 1, 1)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = DecisionCache(max_size=2, ttl_seconds=60)
+    cache.put("a", _decision("a"))
+    cache.put("b", _decision("b"))
+    assert cache.get("a") is not None  # "b" is now the oldest
+    cache.put("c", _decision("c"))
+
+    assert cache.get("b") is None
+    assert cache.get("a").reason == "a" and cache.get("c").reason == "c"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_disabled_cache_keeps_nothing():
+    cache = DecisionCache(max_size=0, ttl_seconds=60)
+    cache.put("key", _decision())
+    assert cache.get("key") is None and cache.stats()["size"] == 0
+
+
+def _plan(risk_level=RiskLevel.LOW, human_token=None, trace_id="trace-key"):
+    plan = build_candidate_plan(MonitorEvent(), trace_id)
+    return plan.model_copy(
+        update={
+            "risk_level": risk_level,
+            "approval": ApprovalRequest(autonomy_level=1, human_token=human_token),
+        }
+    )
+
+
+def _key(plan, token=policy_engine.USER_TOKEN):
+    return policy_engine._decision_cache_key(plan, token)
+
+
+def test_key_ignores_what_the_policy_does_not_read():
+    assert _key(_plan(trace_id="one")) == _key(_plan(trace_id="two"))
+    # Only the validity of each token counts, not its value.
+    assert _key(_plan(), "wrong") == _key(_plan(), "also-wrong")
+    assert _key(_plan(human_token="wrong")) == _key(_plan(human_token="also-wrong"))
+
+
+@pytest.mark.parametrize(
+    "other",
+    [
+        lambda: _key(_plan(risk_level=RiskLevel.MEDIUM)),
+        lambda: _key(_plan(), "wrong"),
+        lambda: _key(_plan(human_token=policy_engine.HUMAN_APPROVAL_TOKEN)),
+    ],
+    ids=["risk", "user-token", "human-token"],
+)
+def test_key_covers_risk_and_both_tokens(other):
+    assert _key(_plan()) != other()
+
+
+def test_remembered_decision_is_replayed_for_the_same_key(monkeypatch):
+    monkeypatch.setattr(policy_engine, "OPA_URL", "http://opa.test")
+    monkeypatch.setattr(policy_engine, "POLICY_CACHE_ENABLED", True)
+    monkeypatch.setattr(policy_engine, "_decision_cache", DecisionCache(8, 60))
+    token = policy_engine.USER_TOKEN
+
+    policy_engine._remember_decision(_plan(trace_id="first"), token, _decision())
+
+    replayed = policy_engine._cached_decision(_plan(trace_id="second"), token)
+    assert replayed.source == "opa-cache" and replayed.allowed
+    assert policy_engine._cached_decision(_plan(RiskLevel.HIGH), token) is None
+    assert policy_engine._cached_decision(_plan(), "wrong") is None
@@ -0,0 +1,109 @@
+"""LLM planner paths against the local fake chat model (no network, no API key)."""
+
+import asyncio
+import os
+import sys
+import threading
+
+import pytest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
+
+from smartcity.core import llm_planner
+from smartcity.core.fake_llm import FakeChatModel
+from smartcity.core.models import MonitorEvent, validate_plan_dict
+
+EVENTS = [
+    MonitorEvent(ambulance_detected=True, heavy_rain=True),
+    MonitorEvent(flood_risk=True),
+    MonitorEvent(crowd_level="dense"),
+    MonitorEvent(),
+]
+
+
+@pytest.fixture
+def use_model(monkeypatch):
+    def install(**settings):
+        settings.setdefault("latency_ms", 1)
+        model = FakeChatModel(**settings)
+        monkeypatch.setattr(llm_planner, "LLM_PLANNER_ENABLED", True)
+        monkeypatch.setattr(llm_planner, "LLM_BACKEND", "fake")
+        monkeypatch.setattr(llm_planner, "_llm_client", model)
+        monkeypatch.setattr(llm_planner, "_plan_cache", None)
+        return model
+
+    return install
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_fake_model_plans_are_valid(use_model, monkeypatch, streaming):
+    monkeypatch.setattr(llm_planner, "LLM_STREAMING", streaming)
+    use_model(chunk_chars=7)
+    for index, event in enumerate(EVENTS):
+        plan_data = llm_planner.generate_plan_with_llm(event, f"fake-{index}")
+        plan = validate_plan_dict(plan_data)
+        assert plan.telemetry.trace_id == f"fake-{index}"
+    assert plan.risk_level.value == "low"
+
+
+def test_fake_model_failures_and_malformed_output_fall_back(use_model):
+    model = use_model(malformed_rate=0.5, failure_rate=0.2, seed=7)
+    events = [
+        event.model_copy(update={"notes": str(i)})
+        for i, event in enumerate(EVENTS * 10)
+    ]
+    trace_ids = [f"fake-batch-{index}" for index in range(len(events))]
+    plans = asyncio.run(llm_planner.agenerate_plans_with_llm(events, trace_ids))
+
+    stats = model.stats()
+    assert stats["calls"] == len(events)
+    planned = sum(1 for plan in plans if plan)
+    assert planned == len(events) - stats["failures"] - stats["malformed"]
+
+
+def test_persistent_cache_is_queried_off_the_event_loop(
+    use_model, monkeypatch, tmp_path
+):
+    use_model()
+    cache = llm_planner.LlmResponseCache(8, 60, path=str(tmp_path / "llm_cache.sqlite"))
+    monkeypatch.setattr(llm_planner, "_plan_cache", cache)
+    threads = []
+    get, put = cache.get, cache.put
+    monkeypatch.setattr(
+        cache, "get", lambda *a: threads.append(threading.get_ident()) or get(*a)
+    )
+    monkeypatch.setattr(
+        cache, "put", lambda *a: threads.append(threading.get_ident()) or put(*a)
+    )
+
+    async def scenario():
+        first = await llm_planner.agenerate_plan_with_llm(EVENTS[0], "disk-1")
+        second = await llm_planner.agenerate_plan_with_llm(EVENTS[0], "disk-2")
+        return first, second, threading.get_ident()
+
+    first, second, loop_thread = asyncio.run(scenario())
+    assert first and second and second["telemetry"]["traceId"] == "disk-2"
+    assert cache.stats()["hits"] == 1
+    assert len(threads) == 3 and loop_thread not in threads
+
+
+def test_micro_batcher_sends_a_lone_plan_at_once(use_model):
+    model = use_model(latency_ms=50)
+
+    async def scenario():
+        batcher = llm_planner.PlanMicroBatcher(window_ms=200, max_size=8)
+        started = asyncio.get_running_loop().time()
+        lone = await batcher.plan(EVENTS[0], "lone")
+        lone_s = asyncio.get_running_loop().time() - started
+        first = asyncio.ensure_future(batcher.plan(EVENTS[1], "first"))
+        await asyncio.sleep(0)
+        # Arrive while "first" is at the model: held back and batched together.
+        rest = [batcher.plan(event, f"rest-{i}") for i, event in enumerate(EVENTS)]
+        plans = await asyncio.gather(first, *rest)
+        return lone, lone_s, plans, batcher
+
+    lone, lone_s, plans, batcher = asyncio.run(scenario())
+    assert lone and lone_s < 0.15
+    assert all(plans) and not batcher._tasks
+    assert model.stats()["calls"] == 2 + len({e.model_dump_json() for e in EVENTS})
@@ -0,0 +1,131 @@
+"""Knowledge base freshness, ordering and write-through."""
+
+import os
+import sys
+import time
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
+
+from smartcity.core.knowledge import KnowledgeBase
+
+
+def _entity(corridor, date_modified):
+    return {
+        "id": "TrafficSignal:001",
+        "type": "TrafficSignal",
+        "priorityCorridor": {
+            "type": "Text",
+            "value": corridor,
+            "metadata": {"dateModified": {"type": "DateTime", "value": date_modified}},
+        },
+    }
+
+
+def test_fresh_entries_are_served_until_max_age():
+    knowledge = KnowledgeBase(max_age_ms=50, max_entities=10)
+    assert knowledge.fresh("TrafficSignal:001") is None
+
+    # Notifications may carry only some attributes: not served until a full read.
+    knowledge.observe({"id": "TrafficSignal:001", "floodRisk": True})
+    assert knowledge.fresh("TrafficSignal:001") is None
+
+    knowledge.observe(_entity("none", "2026-01-01T00:00:00.000Z"), complete=True)
+    time.sleep(0.03)
+    knowledge.observe({"id": "TrafficSignal:001", "floodRisk": True})
+    entity = knowledge.fresh("TrafficSignal:001")
+    assert entity["floodRisk"] == {"type": "Boolean", "value": True, "metadata": {}}
+    assert entity["priorityCorridor"]["value"] == "none"
+
+    time.sleep(0.03)  # priorityCorridor is now older than 50 ms
+    assert knowledge.fresh("TrafficSignal:001") is None
+    stats = knowledge.stats()
+    assert (stats["hits"], stats["misses"], stats["stale"]) == (1, 2, 1)
+
+
+def test_older_notifications_and_own_writes():
+    knowledge = KnowledgeBase(max_age_ms=1000, max_entities=10)
+    assert knowledge.observe(
+        _entity("emergency", "2026-01-01T00:00:02.000Z"), complete=True
+    )
+    assert not knowledge.observe(_entity("none", "2026-01-01T00:00:01.000Z"))
+
+    knowledge.record_write("TrafficSignal:001", {"priorityCorridor": "critical-infra"})
+    knowledge.record_write("TrafficSignal:999", {"priorityCorridor": "none"})
+    entity = knowledge.fresh("TrafficSignal:001")
+    assert entity["priorityCorridor"]["value"] == "critical-infra"
+    assert knowledge.fresh("TrafficSignal:999") is None
+    stats = knowledge.stats()
+    assert stats["out_of_order"] == 1 and stats["writes"] == 1 and stats["size"] == 1
+
+
+def test_unchanged_corridor_write_is_skipped(monkeypatch):
+    from smartcity.core import executor
+    from smartcity.core.knowledge import knowledge_base
+    from smartcity.core.mcp_transport import render_body
+    from smartcity.core.models import ActionType, PlanStep
+    from smartcity.services import mcp_tools
+
+    writes = []
+    monkeypatch.setattr(
+        mcp_tools,
+        "update_priority_corridor",
+        lambda entity_id, value, trace_id, token: writes.append(value) or {},
+    )
+    knowledge_base.observe(
+        _entity("emergency", "2026-01-01T00:00:00.000Z"), complete=True
+    )
+    step = PlanStep(
+        id="set-priority",
+        action=ActionType.SET_PRIORITY_CORRIDOR,
+        params={"entity_id": "TrafficSignal:001", "value": "emergency"},
+    )
+
+    results = []
+    for value in ("emergency", "none", "none"):
+        params = {**step.params, "value": value}
+        body = {"result": mcp_tools.call_tool(step.action.value, params, "t", "x")}
+        results.append(executor._step_result(step, "t", 200, render_body(body)))
+
+    assert writes == ["none"]
+    assert [result.skipped for result in results] == [True, False, True]
+
+
+def test_notified_values_do_not_skip_writes():
+    knowledge = KnowledgeBase(max_age_ms=1000, max_entities=10)
+    knowledge.observe(_entity("none", "2026-01-01T00:00:00.000Z"), complete=True)
+    knowledge.observe(_entity("emergency", "2026-01-01T00:00:01.000Z"))
+    assert not knowledge.unchanged(
+        "TrafficSignal:001", {"priorityCorridor": "emergency"}
+    )
+
+    # Our own write is confirmed, and a notification echoing it stays so.
+    knowledge.record_write("TrafficSignal:001", {"priorityCorridor": "emergency"})
+    knowledge.observe(_entity("emergency", "2026-01-01T00:00:02.000Z"))
+    assert knowledge.unchanged("TrafficSignal:001", {"priorityCorridor": "emergency"})
+
+
+def test_notified_state_reaches_the_mcp_server(monkeypatch):
+    import asyncio
+
+    from fastapi.testclient import TestClient
+
+    from smartcity.core import executor
+    from smartcity.services import mcp_server, mcp_tools
+
+    knowledge = KnowledgeBase(max_age_ms=1000, max_entities=10)
+    monkeypatch.setattr(mcp_tools, "knowledge_base", knowledge)
+    monkeypatch.setattr(mcp_server, "knowledge_base", knowledge)
+    client = TestClient(mcp_server.app)
+
+    class HttpToTestClient:
+        async def acall(self, payload):
+            response = client.post("/mcp", json=payload)
+            return response.status_code, response.text
+
+    monkeypatch.setattr(executor, "transport", HttpToTestClient())
+    entity = {"id": "TrafficSignal:002", "type": "TrafficSignal", "floodRisk": True}
+    asyncio.run(executor.aobserve_entities([entity, "not-an-entity"], "t"))
+
+    stats = client.get("/mcp/knowledge").json()
+    assert stats["size"] == 1 and stats["updates"] == 1
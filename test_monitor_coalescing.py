@@ -0,0 +1,82 @@
+"""Monitor with both the work queue and the coalescing window enabled."""
+
+import logging
+import os
+import sys
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
+
+from smartcity.core.coalescing import EventCoalescer
+from smartcity.core.planner import PRIORITY_CLASSES
+from smartcity.infra.work_queue import WorkQueue
+from smartcity.services import monitor
+
+
+@pytest.fixture
+def client(monkeypatch):
+    runs = []
+    observed = []
+
+    async def run_mape_k(events, trace_ids):
+        runs.append((events[0], trace_ids))
+        return []
+
+    async def observe_entities(entities, trace_id):
+        observed.extend(entity["id"] for entity in entities)
+
+    logger = logging.getLogger("test-monitor")
+    queue = WorkQueue("test", 1, 1, logger, classes=PRIORITY_CLASSES)
+    coalescer = EventCoalescer(150, monitor._dispatch_coalesced, logger)
+    monkeypatch.setattr(monitor, "HTTP_WARMUP_ENABLED", False)
+    monkeypatch.setattr(monitor, "warm_up_llm_client", lambda: None)
+    monkeypatch.setattr(monitor, "_run_mape_k", run_mape_k)
+    monkeypatch.setattr(monitor, "aobserve_entities", observe_entities)
+    monkeypatch.setattr(monitor, "_work_queue", queue)
+    monkeypatch.setattr(monitor, "_coalescer", coalescer)
+    with TestClient(monitor.app) as test_client:
+        yield test_client, queue, runs, observed
+
+
+def _notify(test_client, entity_id, **attrs):
+    return test_client.post(
+        "/monitor/notify", json={"data": [{"id": entity_id, **attrs}]}
+    )
+
+
+def test_full_class_is_refused_before_acknowledging(client):
+    test_client, queue, runs, observed = client
+
+    assert _notify(test_client, "A").status_code == 202
+    assert _notify(test_client, "A").status_code == 202  # joins A's window
+    refused = _notify(test_client, "B")  # the one low slot is A's
+    assert refused.status_code == monitor.MONITOR_QUEUE_FULL_STATUS
+    assert refused.headers["Retry-After"] == str(
+        monitor.MONITOR_QUEUE_RETRY_AFTER_SECONDS
+    )
+    assert _notify(test_client, "B", ambulanceDetected=True).status_code == 202
+
+    # A's window moves to the high class and gives its low slot back.
+    assert _notify(test_client, "A", floodRisk=True).status_code == 202
+    assert queue.stats()["classes"]["low"]["reserved"] == 0
+    assert _notify(test_client, "C").status_code == 202
+    assert queue.stats()["reserved"] == 3
+
+    deadline = time.monotonic() + 5
+    while len(runs) < 3 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    merged = {event.entity_id: event for event, _ in runs}
+    assert sorted(merged) == ["A", "B", "C"]
+    assert merged["A"].flood_risk
+    assert merged["B"].ambulance_detected
+    stats = queue.stats()
+    assert stats["reserved"] == 0 and stats["accepted"] == 3
+    assert stats["classes"]["low"]["rejected"] == 1
+    # Only admitted notifications reach the knowledge base.
+    assert sorted(observed) == ["A", "A", "A", "B", "C"]
+    coalescing = test_client.get("/monitor/coalescing").json()
+    assert coalescing["events"] == 5 and coalescing["dispatched"] == 3
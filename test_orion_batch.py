@@ -0,0 +1,74 @@
+"""Orion batch helpers split long entity lists into chunked op requests."""
+
+import os
+import sys
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
+
+from smartcity.core.models import ActionType, PlanStep
+from smartcity.infra import ngsi_client
+
+
+class _Response:
+    status_code = 200
+    content = b"[]"
+
+    def __init__(self, body):
+        self._body = body
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._body
+
+
+class _Session:
+    def __init__(self):
+        self.posts = []
+
+    def post(self, url, headers, json):
+        self.posts.append((url, json))
+        ids = [entity["id"] for entity in json["entities"]]
+        return _Response(
+            [{"id": entity_id, "type": "TrafficSignal"} for entity_id in ids]
+        )
+
+
+def test_batch_helpers_chunk_requests(monkeypatch):
+    session = _Session()
+    monkeypatch.setattr(ngsi_client, "get_session", lambda: session)
+    monkeypatch.setattr(ngsi_client, "ORION_BATCH_SIZE", 2)
+    entity_ids = [f"TrafficSignal:{index:03d}" for index in range(5)]
+
+    result = ngsi_client.update_priority_corridors(entity_ids, "emergency", "t")
+    assert result == {"result": "updated", "entities": 5, "requests": 3}
+    assert [url.rsplit("/", 1)[-1] for url, _ in session.posts] == ["update"] * 3
+    updates = [entity for _, body in session.posts for entity in body["entities"]]
+    assert [entity["id"] for entity in updates] == entity_ids
+    assert {entity["priorityCorridor"]["value"] for entity in updates} == {"emergency"}
+
+    session.posts.clear()
+    entities = ngsi_client.query_traffic_signals(entity_ids, "t")
+    assert [entity["id"] for entity in entities] == entity_ids
+    assert all(url.endswith("/v2/op/query?limit=2") for url, _ in session.posts)
+    assert len(session.posts) == 3
+
+
+def test_bulk_steps_need_entity_id_lists():
+    PlanStep(
+        id="green-wave",
+        action=ActionType.SET_PRIORITY_CORRIDORS,
+        params={"entity_ids": ["TrafficSignal:001"], "value": "emergency"},
+    )
+    for entity_ids in ([], "TrafficSignal:001", [1]):
+        try:
+            PlanStep(
+                id="read",
+                action=ActionType.GET_TRAFFIC_SIGNAL_STATES,
+                params={"entity_ids": entity_ids},
+            )
+        except ValueError:
+            continue
+        raise AssertionError(f"accepted entity_ids={entity_ids!r}")
@@ -0,0 +1,118 @@
+"""Differential test: embedded Rego evaluator vs. a running OPA server."""
+
+import os
+import sys
+
+import pytest
+import requests
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
+
+from smartcity.core import policy_engine
+from smartcity.core.models import MonitorEvent, RiskLevel
+from smartcity.core.planner import build_candidate_plan
+from smartcity.core.rego_evaluator import load_policy
+
+REGO_PATH = os.path.join(os.path.dirname(__file__), "policies", "traffic_policy.rego")
+OPA_URL = os.getenv("OPA_URL") or "http://localhost:8181"
+
+
+def _policy_inputs():
+    """Every (risk, user token, human token) combination the policy branches on."""
+    plan = build_candidate_plan(MonitorEvent(), "trace-differential")
+    for risk in ("low", "medium", "high", "LOW", "Medium"):
+        for token in (policy_engine.USER_TOKEN, "wrong-token"):
+            for human_token in (None, policy_engine.HUMAN_APPROVAL_TOKEN, "nope"):
+                wire = plan.to_wire_dict()
+                wire["risk_level"] = risk
+                wire["approval"]["human_token"] = human_token
+                yield {
+                    "plan": wire,
+                    "token": token,
+                    "expected_user_token": policy_engine.USER_TOKEN,
+                    "expected_human_token": policy_engine.HUMAN_APPROVAL_TOKEN,
+                }
+
+
+def _opa_reachable() -> bool:
+    try:
+        return requests.get(f"{OPA_URL.rstrip('/')}/health", timeout=0.5).ok
+    except requests.RequestException:
+        return False
+
+
+def test_embedded_policy_expectations():
+    policy = load_policy(REGO_PATH)
+    assert policy.package == "smartcity"
+    # The batch rule maps `allow` over a comprehension, which only OPA evaluates.
+    assert set(policy.unsupported) == {"allow_batch"}
+
+    for policy_input in _policy_inputs():
+        result = policy.evaluate("allow", policy_input)
+        risk = policy_input["plan"]["risk_level"].lower()
+        if policy_input["token"] != policy_input["expected_user_token"]:
+            assert result["approval_mode"] == "deny"
+            assert result["risk_level"] == risk
+        elif risk == "low":
+            assert result["allowed"] and result["approval_mode"] == "auto"
+        elif risk == "medium":
+            human_approved = (
+                policy_input["plan"]["approval"]["human_token"]
+                == policy_input["expected_human_token"]
+            )
+            assert result["allowed"]
+            assert result["approval_mode"] == ("human" if human_approved else "auto")
+        else:
+            assert not result["allowed"] and result["approval_mode"] == "human"
+
+
+def test_embedded_backend_decision(monkeypatch):
+    monkeypatch.setattr(policy_engine, "POLICY_BACKEND", "embedded")
+    plan = build_candidate_plan(MonitorEvent(heavy_rain=True), "trace-embedded")
+    decision = policy_engine.evaluate_plan(
+        plan.to_wire_dict(), policy_engine.USER_TOKEN, "trace-embedded"
+    )
+    assert decision.source == "embedded"
+    assert decision.allowed and decision.approval_mode == "auto"
+
+
+@pytest.mark.skipif(not _opa_reachable(), reason=f"OPA not reachable at {OPA_URL}")
+def test_embedded_matches_opa():
+    policy = load_policy(REGO_PATH)
+    url = f"{OPA_URL.rstrip('/')}/v1/data/smartcity/allow"
+    for policy_input in _policy_inputs():
+        response = requests.post(url, json={"input": policy_input}, timeout=2)
+        response.raise_for_status()
+        assert policy.evaluate("allow", policy_input) == response.json()["result"]
+
+
+@pytest.mark.skipif(not _opa_reachable(), reason=f"OPA not reachable at {OPA_URL}")
+def test_opa_batch_rule_matches_single_rule():
+    items = list(_policy_inputs())
+    base = OPA_URL.rstrip("/")
+    batch = requests.post(
+        f"{base}/v1/data/smartcity/allow_batch",
+        json={"input": {"items": items}},
+        timeout=2,
+    )
+    batch.raise_for_status()
+    singles = [
+        requests.post(
+            f"{base}/v1/data/smartcity/allow", json={"input": item}, timeout=2
+        ).json()["result"]
+        for item in items
+    ]
+    assert batch.json()["result"] == singles
+
+
+def test_wire_renderings_are_not_shared():
+    plan = build_candidate_plan(MonitorEvent(), "trace-wire")
+    plan.to_wire_dict()["approval"]["human_token"] = "tampered"
+    assert plan.to_wire_dict()["approval"]["human_token"] is None
+    assert plan.wire_dict_view() is plan.wire_dict_view()
+    assert plan.wire_dict_view() == plan.to_wire_dict()
+    before = plan.to_wire_json()
+    plan.risk_level = RiskLevel.HIGH
+    assert plan.to_wire_dict()["risk_level"] == "high"
+    assert plan.to_wire_json() != before
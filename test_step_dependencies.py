@@ -0,0 +1,113 @@
+"""Plans with step dependencies: ordering and the cut-off at the first failure."""
+
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
+
+from smartcity.core import executor
+from smartcity.core.models import ActionType, MonitorEvent, PlanStep
+from smartcity.core.planner import build_candidate_plan
+
+
+class _RecordingTransport:
+    """Answers every MCP call after `delays[method]`, failing `failing` ones."""
+
+    def __init__(self, failing=(), delays=None):
+        self.failing = set(failing)
+        self.delays = delays or {}
+        self.calls = []
+
+    def _answer(self, payload):
+        self.calls.append(payload["method"])
+        status = 500 if payload["method"] in self.failing else 200
+        return status, "{}"
+
+    def call(self, payload):
+        time.sleep(self.delays.get(payload["method"], 0))
+        return self._answer(payload)
+
+    async def acall(self, payload):
+        await asyncio.sleep(self.delays.get(payload["method"], 0))
+        return self._answer(payload)
+
+
+def _execute(plan, mode):
+    if mode == "sync":
+        return executor._execute_steps(plan, "t")
+    return asyncio.run(executor._aexecute_steps(plan, "t"))
+
+
+def _ambulance_plan():
+    return build_candidate_plan(MonitorEvent(ambulance_detected=True), "t")
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_steps_run_after_their_dependencies(monkeypatch, mode):
+    # The read answers last if it is not awaited before the later steps start.
+    transport = _RecordingTransport(
+        delays={ActionType.GET_TRAFFIC_SIGNAL_STATE.value: 0.05}
+    )
+    monkeypatch.setattr(executor, "transport", transport)
+    plan = _ambulance_plan()
+
+    results = _execute(plan, mode)
+
+    assert [step.depends_on for step in plan.steps] == [
+        [],
+        ["read-state"],
+        ["set-priority"],
+    ]
+    assert transport.calls == [step.action.value for step in plan.steps]
+    assert [result.step_id for result in results] == [
+        "read-state",
+        "set-priority",
+        "notify",
+    ]
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_failed_corridor_is_not_announced(monkeypatch, mode):
+    transport = _RecordingTransport(failing={ActionType.SET_PRIORITY_CORRIDOR.value})
+    monkeypatch.setattr(executor, "transport", transport)
+
+    with pytest.raises(executor.McpStepError) as exc_info:
+        _execute(_ambulance_plan(), mode)
+
+    assert exc_info.value.step_id == "set-priority"
+    assert ActionType.NOTIFY_TRAFFIC_AGENTS.value not in transport.calls
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_no_step_starts_after_a_failure(monkeypatch, mode):
+    # "read-state" is still in flight when the independent "set-priority"
+    # fails; "notify", which waits on the read, must never start.
+    transport = _RecordingTransport(
+        failing={ActionType.SET_PRIORITY_CORRIDOR.value},
+        delays={ActionType.GET_TRAFFIC_SIGNAL_STATE.value: 0.05},
+    )
+    monkeypatch.setattr(executor, "transport", transport)
+    plan = _ambulance_plan()
+    read, set_priority, notify = plan.steps
+    plan = plan.model_copy(
+        update={
+            "steps": [
+                read,
+                PlanStep(**{**set_priority.model_dump(), "depends_on": []}),
+                PlanStep(**{**notify.model_dump(), "depends_on": ["read-state"]}),
+            ]
+        }
+    )
+
+    started = time.monotonic()
+    with pytest.raises(executor.McpStepError):
+        _execute(plan, mode)
+
+    assert time.monotonic() - started < 0.05  # not held up by the read
+    time.sleep(0.1)
+    assert ActionType.NOTIFY_TRAFFIC_AGENTS.value not in transport.calls
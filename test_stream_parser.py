@@ -0,0 +1,88 @@
+"""Incremental parsing of plan JSON streamed token by token."""
+
+import json
+import os
+import sys
+
+import pytest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
+
+from smartcity.core.stream_parser import (
+    INVALID_STEP,
+    RISK_LEVEL,
+    STEP,
+    IncrementalPlanParser,
+)
+
+PLAN = {
+    "plan_id": "p-1",
+    "goal": 'Clear the "north" corridor {fast}',
+    "scenario": "ambulance-only",
+    "notes": "risk_level: high } ] {",
+    "risk_level": "medium",
+    "steps": [
+        {
+            "id": "s1",
+            "action": "notifyTrafficAgents",
+            "params": {"message": 'Say "hold" \\ wait } ] [ {'},
+        },
+        {
+            "id": "s2",
+            "action": "setPriorityCorridor",
+            "params": {"entity_id": "urn:ngsi-ld:TrafficSignal:1", "value": "on"},
+        },
+    ],
+    "approval": {"autonomy_level": 2, "risk_level": "low"},
+}
+
+
+def _feed(chunks):
+    parser = IncrementalPlanParser()
+    events = []
+    for chunk in chunks:
+        events.extend(parser.feed(chunk))
+    return parser, events
+
+
+def _split(text, size):
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+def _check(events):
+    assert events[0] == (RISK_LEVEL, "medium")
+    assert [kind for kind, _ in events] == [RISK_LEVEL, STEP, STEP]
+    assert events[1][1].params["message"] == 'Say "hold" \\ wait } ] [ {'
+    assert events[2][1].id == "s2"
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64])
+def test_chunks_split_mid_token(size):
+    text = json.dumps(PLAN)
+    parser, events = _feed(_split(text, size))
+    _check(events)
+    assert parser.closed and parser.text == text
+
+
+def test_escaped_quotes_and_braces_in_strings():
+    # Split right after every backslash so escapes straddle chunks.
+    text = json.dumps(PLAN)
+    parser, events = _feed(text.replace("\\", "\\\x00").split("\x00"))
+    _check(events)
+
+
+def test_fenced_output():
+    text = "Here is the plan:\n```json\n" + json.dumps(PLAN, indent=2) + "\n```\n"
+    parser, events = _feed(_split(text, 5))
+    _check(events)
+    assert parser.closed
+    # Nothing after the top-level object is scanned.
+    assert parser.feed('{"risk_level": "high"}') == []
+
+
+def test_invalid_step_is_reported():
+    plan = dict(PLAN, steps=[{"id": "s1", "action": "setPriorityCorridor"}])
+    _, events = _feed(_split(json.dumps(plan), 4))
+    assert [kind for kind, _ in events] == [RISK_LEVEL, INVALID_STEP]
+    assert "missing required params" in events[1][1]
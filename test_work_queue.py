@@ -0,0 +1,92 @@
+"""Backpressure and accounting of the monitor's bounded work queue."""
+
+import asyncio
+import logging
+import os
+import sys
+
+import pytest
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
+
+from smartcity.infra.work_queue import QueueFullError, WorkQueue
+
+
+def test_full_queue_rejects_and_workers_drain():
+    async def scenario():
+        queue = WorkQueue("test", max_size=2, workers=1, logger=logging.getLogger())
+        release = asyncio.Event()
+        done = []
+
+        async def job(name):
+            await release.wait()
+            done.append(name)
+
+        async def failing():
+            raise RuntimeError("boom")
+
+        with pytest.raises(QueueFullError):
+            queue.submit(lambda: job("early"), "t0")
+
+        queue.start()
+        queue.submit(lambda: job("a"), "t1")
+        await asyncio.sleep(0)  # the worker takes "a"; two slots remain
+        queue.submit(lambda: job("b"), "t2")
+        queue.submit(failing, "t3")
+        with pytest.raises(QueueFullError):
+            queue.submit(lambda: job("c"), "t4")
+        assert queue.stats()["depth"] == 2
+
+        release.set()
+        await queue.stop(drain_seconds=1)
+        return queue.stats(), done
+
+    stats, done = asyncio.run(scenario())
+    assert done == ["a", "b"]
+    assert stats["accepted"] == 3 and stats["rejected"] == 1
+    assert stats["completed"] == 2 and stats["failed"] == 1
+    assert stats["depth"] == 0 and not stats["running"]
+    assert stats["wait_p95_ms"] is not None
+
+
+@pytest.mark.parametrize(
+    "aging_ms, expected",
+    [(0, ["emergency", "high", "low"]), (1, ["low", "emergency", "high"])],
+)
+def test_priority_classes_and_aging(aging_ms, expected):
+    async def scenario():
+        queue = WorkQueue(
+            "test",
+            max_size=1,
+            workers=1,
+            logger=logging.getLogger(),
+            classes=("emergency", "high", "low"),
+            aging_ms=aging_ms,
+        )
+        release = asyncio.Event()
+        order = []
+
+        async def job(name):
+            await release.wait()
+            order.append(name)
+
+        queue.start()
+        queue.submit(lambda: job("blocker"), "t0", "low")
+        await asyncio.sleep(0)  # the worker takes the blocker
+        queue.submit(lambda: job("low"), "t1")
+        await asyncio.sleep(0.05)  # "low" has aged many class steps at 1 ms
+        queue.submit(lambda: job("high"), "t2", "high")
+        queue.submit(lambda: job("emergency"), "t3", "emergency")
+        with pytest.raises(QueueFullError):
+            queue.submit(lambda: job("late"), "t4", "emergency")
+
+        release.set()
+        await queue.stop(drain_seconds=1)
+        return queue.stats(), order
+
+    stats, order = asyncio.run(scenario())
+    assert order == ["blocker"] + expected
+    emergency = stats["classes"]["emergency"]
+    assert emergency["completed"] == 1 and emergency["rejected"] == 1
+    assert sum(stats["classes"]["low"]["latency_histogram_ms"].values()) == 2